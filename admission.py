@@ -0,0 +1,139 @@
+"""
+Admission control for questions that need retrieval and the LLM.
+
+Two limits protect the answer path:
+
+- Per chat session of a user, a token bucket allows ADMISSION_BURST
+  questions at once and then ADMISSION_RATE_PER_MINUTE, so one student
+  cannot flood the chat. Students who share an account each have their own
+  session and so their own bucket.
+- Per user, a larger bucket (ADMISSION_USER_BURST, then
+  ADMISSION_USER_RATE_PER_MINUTE) caps all sessions of an account together,
+  so opening new sessions does not get around the session limit.
+- Per server process, at most ADMISSION_MAX_CONCURRENT questions are
+  retrieved and answered at a time. Up to ADMISSION_QUEUE_SIZE more wait
+  for a slot for at most ADMISSION_WAIT_SECONDS; beyond that, questions are
+  turned away immediately with a "busy" message instead of piling up on
+  Groq and the embedding model.
+
+Answers served from the FAQ or the answer cache never call the LLM, so the
+chatbot serves them before either limit is checked; they neither use up a
+student's rate budget nor take a slot, and stay fast under load. A limit set
+to 0 is disabled.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import metrics
+
+ADMISSION_RATE_PER_MINUTE = float(os.getenv("ADMISSION_RATE_PER_MINUTE", "10"))
+ADMISSION_BURST = int(os.getenv("ADMISSION_BURST", "5"))
+ADMISSION_USER_RATE_PER_MINUTE = float(os.getenv("ADMISSION_USER_RATE_PER_MINUTE", "30"))
+ADMISSION_USER_BURST = int(os.getenv("ADMISSION_USER_BURST", "10"))
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "8"))
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "16"))
+ADMISSION_WAIT_SECONDS = float(os.getenv("ADMISSION_WAIT_SECONDS", "15"))
+# Buckets untouched for this long are full again and are dropped.
+BUCKET_IDLE_SECONDS = 3600
+
+class Busy(Exception):
+    """A question was turned away; retry_after is a hint in seconds."""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+class RateLimiter:
+    """One token bucket per key, e.g. a user and chat session, plus an optional bucket per user."""
+
+    def __init__(self, rate_per_minute=ADMISSION_RATE_PER_MINUTE, burst=ADMISSION_BURST,
+                 user_rate_per_minute=ADMISSION_USER_RATE_PER_MINUTE, user_burst=ADMISSION_USER_BURST):
+        self.rate = rate_per_minute / 60.0
+        self.burst = max(1, burst)
+        self.user_rate = user_rate_per_minute / 60.0
+        self.user_burst = max(1, user_burst)
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._last_prune = time.monotonic()
+
+    def acquire(self, key, user=None):
+        """
+        Takes one token from the key's bucket and, if a user is given, from that user's
+        bucket too. Takes nothing when either is empty and raises Busy with the time
+        until both have a token.
+        """
+        limits = [(key, self.rate, self.burst)]
+        if user is not None:
+            limits.append((("user", user), self.user_rate, self.user_burst))
+        limits = [limit for limit in limits if limit[1] > 0]
+        if not limits:
+            return
+        now = time.monotonic()
+        with self._lock:
+            buckets = []
+            for bucket, rate, burst in limits:
+                tokens, updated = self._buckets.get(bucket, (burst, now))
+                buckets.append((bucket, rate, min(burst, tokens + (now - updated) * rate)))
+            retry_after = max(((1 - tokens) / rate for _, rate, tokens in buckets if tokens < 1), default=None)
+            for bucket, _, tokens in buckets:
+                self._buckets[bucket] = (tokens if retry_after is not None else tokens - 1, now)
+            if now - self._last_prune > BUCKET_IDLE_SECONDS:
+                self._last_prune = now
+                self._buckets = {
+                    bucket: value for bucket, value in self._buckets.items() if now - value[1] < BUCKET_IDLE_SECONDS
+                }
+        if retry_after is not None:
+            metrics.ADMISSION_REJECTED.inc(reason="rate_limited")
+            raise Busy("rate_limited", retry_after)
+
+class ConcurrencyLimiter:
+    """A fixed number of answer slots with a bounded wait queue."""
+
+    def __init__(self, max_concurrent=ADMISSION_MAX_CONCURRENT, max_queue=ADMISSION_QUEUE_SIZE,
+                 wait_seconds=ADMISSION_WAIT_SECONDS):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.wait_seconds = wait_seconds
+        self._slots = threading.Semaphore(max(1, max_concurrent))
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.in_flight = 0
+
+    @contextmanager
+    def slot(self):
+        """Holds an answer slot for the with-block. Raises Busy when the queue is full or the wait times out."""
+        if self.max_concurrent <= 0:
+            yield
+            return
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                if self.waiting >= self.max_queue:
+                    metrics.ADMISSION_REJECTED.inc(reason="queue_full")
+                    raise Busy("queue_full", self.wait_seconds)
+                self.waiting += 1
+                metrics.ADMISSION_QUEUE_DEPTH.set(self.waiting)
+            started = time.perf_counter()
+            try:
+                acquired = self._slots.acquire(timeout=self.wait_seconds)
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+                    metrics.ADMISSION_QUEUE_DEPTH.set(self.waiting)
+            metrics.ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - started)
+            if not acquired:
+                metrics.ADMISSION_REJECTED.inc(reason="timeout")
+                raise Busy("timeout", self.wait_seconds)
+        with self._lock:
+            self.in_flight += 1
+            metrics.ADMISSION_IN_FLIGHT.set(self.in_flight)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                metrics.ADMISSION_IN_FLIGHT.set(self.in_flight)
+            self._slots.release()
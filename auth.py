@@ -0,0 +1,337 @@
+"""
+Password login and signed session tokens.
+
+Users are kept in a JSON file (AUTH_USERS_FILE) mapping each username to its
+role and a salted PBKDF2-SHA256 password hash; no plaintext password is
+stored anywhere. It is managed with:
+
+    python auth.py add-user admin --role admin
+    python auth.py remove-user student
+    python auth.py revoke student     # log the user out everywhere
+    python auth.py token student      # a token for scripts calling a headless API
+
+A successful login returns a session token: the username, role, expiry, a
+random token id and the user's token_version, signed with HMAC-SHA256. The
+chatbot keeps the token in the page URL, so a browser that reconnects, also
+to another pod, stays logged in. Tokens are verified with the shared
+AUTH_SECRET (or a secret generated once and saved next to the users file, on
+the shared volume). Verified tokens are cached in memory, so checking a token
+on every rerun is a dictionary lookup.
+
+A URL token ends up in browser history, copied links and proxy logs, so it
+must stop working when it is no longer needed. Logging out adds the token's
+id to a revocation list next to the users file (REVOKED_TOKENS_FILE), which
+every process re-reads with the users file. Changing a user's password or
+role, removing the user or revoking them gives them a new token_version,
+which invalidates all their tokens. Nothing derived from the password hash
+goes into a token.
+"""
+
+import argparse
+import base64
+import getpass
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+AUTH_USERS_FILE = os.getenv("AUTH_USERS_FILE", os.path.join("data", "users.json"))
+AUTH_SECRET = os.getenv("AUTH_SECRET")
+AUTH_TOKEN_TTL_SECONDS = int(os.getenv("AUTH_TOKEN_TTL_SECONDS", str(12 * 3600)))
+AUTH_RELOAD_SECONDS = 30
+PBKDF2_ITERATIONS = 200_000
+TOKEN_CACHE_SIZE = 10_000
+ROLES = ("admin", "user")
+REVOKED_TOKENS_FILE = "revoked_tokens"
+
+# --- Password Hashing ---
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+def hash_password(password, salt=None, iterations=PBKDF2_ITERATIONS):
+    """Returns 'pbkdf2_sha256$<iterations>$<salt>$<hash>' for storing in the users file."""
+    salt = salt if salt is not None else secrets.token_bytes(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+    return f"pbkdf2_sha256${iterations}${_b64encode(salt)}${_b64encode(digest)}"
+
+def verify_password(password, encoded):
+    try:
+        scheme, iterations, salt, expected = encoded.split("$")
+    except ValueError:
+        return False
+    if scheme != "pbkdf2_sha256":
+        return False
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), _b64decode(salt), int(iterations))
+    return hmac.compare_digest(_b64encode(digest), expected)
+
+# Checked against when the username is unknown, so a failed login takes the same time either way.
+_DUMMY_HASH = hash_password(secrets.token_hex(8))
+
+# --- Users File ---
+def load_users(path=AUTH_USERS_FILE):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def save_users(users, path=AUTH_USERS_FILE):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(users, f, indent=2, sort_keys=True)
+    os.chmod(tmp_path, 0o600)
+    os.replace(tmp_path, path)
+
+def new_token_version():
+    return secrets.token_hex(8)
+
+def load_revoked(path):
+    """Returns {token id: expiry} from the revocation list, skipping expired and partly written lines."""
+    revoked = {}
+    now = time.time()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                token_id, _, expires = line.strip().partition(" ")
+                try:
+                    if float(expires) > now:
+                        revoked[token_id] = float(expires)
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return revoked
+
+def _load_secret(users_file):
+    """The signing secret: AUTH_SECRET, or one generated once and kept next to the users file."""
+    if AUTH_SECRET:
+        return AUTH_SECRET.encode("utf-8")
+    path = os.path.join(os.path.dirname(users_file) or ".", ".auth_secret")
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    try:
+        # O_EXCL: when several pods start together, one secret wins and the others read it.
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(path, "rb") as f:
+            return f.read()
+    secret = secrets.token_hex(32).encode("ascii")
+    with os.fdopen(fd, "wb") as f:
+        f.write(secret)
+    return secret
+
+class Authenticator:
+    """Checks passwords and issues and verifies session tokens."""
+
+    def __init__(self, users_file=AUTH_USERS_FILE, secret=None, token_ttl=AUTH_TOKEN_TTL_SECONDS):
+        self.users_file = users_file
+        self.secret = secret.encode("utf-8") if isinstance(secret, str) else secret or _load_secret(users_file)
+        self.token_ttl = token_ttl
+        self.revoked_file = os.path.join(os.path.dirname(users_file) or ".", REVOKED_TOKENS_FILE)
+        self._lock = threading.Lock()
+        self._users = {}
+        self._users_mtime = None
+        self._revoked = {}
+        self._revoked_mtime = None
+        self._checked_at = 0.0
+        self._verified = OrderedDict()
+
+    def _current_users(self):
+        """
+        The users file, re-read at most every AUTH_RELOAD_SECONDS and only when it changed.
+        The revocation list is refreshed the same way, so a logout on another pod applies here too.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._users_mtime is not None and now - self._checked_at < AUTH_RELOAD_SECONDS:
+                return self._users
+            self._checked_at = now
+            mtime = _mtime(self.users_file)
+            if mtime != self._users_mtime:
+                self._users, self._users_mtime = load_users(self.users_file), mtime
+                # Tokens of changed or removed users must be checked again.
+                self._verified.clear()
+            mtime = _mtime(self.revoked_file)
+            if mtime != self._revoked_mtime:
+                self._revoked, self._revoked_mtime = load_revoked(self.revoked_file), mtime
+            return self._users
+
+    def _token_version(self, user):
+        """
+        The user's token_version. Users saved before token versions existed get an HMAC of
+        their password hash instead, which changes with the password but reveals nothing about it.
+        """
+        if user.get("token_version"):
+            return user["token_version"]
+        return _b64encode(hmac.new(self.secret, user["password"].encode("utf-8"), hashlib.sha256).digest())[:16]
+
+    def has_users(self):
+        return bool(self._current_users())
+
+    def login(self, username, password):
+        """Returns a session token for valid credentials, or None."""
+        user = self._current_users().get(username)
+        valid = verify_password(password, user["password"] if user else _DUMMY_HASH) and user is not None
+        metrics.LOGINS.inc(result="success" if valid else "failure")
+        return self.issue_token(username) if valid else None
+
+    def issue_token(self, username, ttl=None):
+        user = self._current_users()[username]
+        claims = {
+            "sub": username,
+            "role": user["role"],
+            "exp": int(time.time() + (ttl or self.token_ttl)),
+            "jti": secrets.token_hex(8),
+            # A new token_version (password change, revoke) logs the user out everywhere.
+            "ver": self._token_version(user),
+        }
+        payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+        return f"{payload}.{self._sign(payload)}"
+
+    def _sign(self, payload):
+        return _b64encode(hmac.new(self.secret, payload.encode("ascii"), hashlib.sha256).digest())
+
+    def verify(self, token):
+        """Returns {'username', 'role'} for a valid, unexpired token, or None."""
+        if not token:
+            return None
+        users = self._current_users()
+        with self._lock:
+            cached = self._verified.get(token)
+            if cached is not None:
+                self._verified.move_to_end(token)
+        if cached is None:
+            cached = self._check(token, users)
+            if cached is None:
+                return None
+            with self._lock:
+                self._verified[token] = cached
+                while len(self._verified) > TOKEN_CACHE_SIZE:
+                    self._verified.popitem(last=False)
+        expires, token_id, identity = cached
+        with self._lock:
+            revoked = token_id in self._revoked
+        return identity if time.time() < expires and not revoked else None
+
+    def _check(self, token, users):
+        """Returns (expiry, token id, identity) for a correctly signed token of a current user, or None."""
+        # Tokens come from the URL, so anything may arrive; only base64url text can be ours.
+        if not isinstance(token, str) or not token.isascii():
+            return None
+        payload, _, signature = token.partition(".")
+        if not hmac.compare_digest(self._sign(payload), signature):
+            return None
+        try:
+            claims = json.loads(_b64decode(payload))
+        except ValueError:
+            return None
+        user = users.get(claims.get("sub"))
+        if user is None or user["role"] != claims.get("role") or self._token_version(user) != claims.get("ver"):
+            return None
+        return claims["exp"], claims.get("jti"), {"username": claims["sub"], "role": claims["role"]}
+
+    def revoke(self, token):
+        """
+        Ends one session: the token's id is appended to the revocation list shared by all
+        processes. Other pods stop accepting it within AUTH_RELOAD_SECONDS.
+        """
+        checked = self._check(token, self._current_users()) if token else None
+        if checked is None:
+            return False
+        expires, token_id, _ = checked
+        directory = os.path.dirname(self.revoked_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # One short line per logout; appends from several pods do not overwrite each other.
+        with open(self.revoked_file, "a", encoding="utf-8") as f:
+            f.write(f"{token_id} {expires}\n")
+        with self._lock:
+            self._revoked[token_id] = expires
+            self._verified.pop(token, None)
+        return True
+
+    def verify_header(self, authorization):
+        """Verifies an HTTP 'Authorization: Bearer <token>' header value, for headless APIs."""
+        scheme, _, token = (authorization or "").partition(" ")
+        return self.verify(token.strip()) if scheme.lower() == "bearer" else None
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+_authenticator = None
+_authenticator_lock = threading.Lock()
+
+def get_authenticator():
+    """The process-wide authenticator."""
+    global _authenticator
+    with _authenticator_lock:
+        if _authenticator is None:
+            _authenticator = Authenticator()
+        return _authenticator
+
+# --- CLI ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage chatbot users")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add_parser = commands.add_parser("add-user", help="add a user or change their password or role")
+    add_parser.add_argument("username")
+    add_parser.add_argument("--role", choices=ROLES, default="user")
+    remove_parser = commands.add_parser("remove-user", help="remove a user")
+    remove_parser.add_argument("username")
+    revoke_parser = commands.add_parser("revoke", help="log a user out everywhere")
+    revoke_parser.add_argument("username")
+    token_parser = commands.add_parser("token", help="print a session token for a user")
+    token_parser.add_argument("username")
+    token_parser.add_argument("--ttl", type=int, default=AUTH_TOKEN_TTL_SECONDS, help="seconds")
+    commands.add_parser("list", help="list users and roles")
+    args = parser.parse_args(argv)
+
+    users = load_users()
+    if args.command == "add-user":
+        password = getpass.getpass(f"Password for {args.username}: ")
+        if password != getpass.getpass("Repeat password: "):
+            parser.error("passwords do not match")
+        users[args.username.lower()] = {"role": args.role, "password": hash_password(password),
+                                        "token_version": new_token_version()}
+        save_users(users)
+        print(f"Saved {args.username.lower()} ({args.role}) to {AUTH_USERS_FILE}")
+    elif args.command == "remove-user":
+        if users.pop(args.username.lower(), None) is None:
+            parser.error(f"no user {args.username}")
+        save_users(users)
+        print(f"Removed {args.username.lower()}")
+    elif args.command == "revoke":
+        if args.username.lower() not in users:
+            parser.error(f"no user {args.username}")
+        users[args.username.lower()]["token_version"] = new_token_version()
+        save_users(users)
+        print(f"Revoked every token of {args.username.lower()}")
+    elif args.command == "token":
+        if args.username.lower() not in users:
+            parser.error(f"no user {args.username}")
+        print(Authenticator().issue_token(args.username.lower(), ttl=args.ttl))
+    else:
+        for username, user in sorted(users.items()):
+            print(f"{username}\t{user['role']}")
+
+if __name__ == "__main__":
+    main()
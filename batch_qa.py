@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Batch question answering for offline evaluation and FAQ precomputation.
+
+Reads a JSONL file of {"topic": ..., "question": ...} records (an optional "id"
+field is kept as-is) and writes one JSONL record per question with the answer,
+its sources and per-stage timings. Questions already answered in the output
+file are skipped, so an interrupted run can simply be started again.
+
+Usage:
+    python batch_qa.py questions.jsonl answers.jsonl --concurrency 4
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import qa_engine
+
+DEFAULT_BATCH_SIZE = 32
+DEFAULT_CONCURRENCY = 4
+
+def record_id(record):
+    """Returns a stable id for an input record so reruns can be matched up."""
+    if record.get("id"):
+        return str(record["id"])
+    key = f"{record['topic']}\n{record['question'].strip()}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+def read_questions(input_path):
+    """Reads (id, topic, question) records from a JSONL file, skipping blank lines."""
+    records = []
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if not record.get("topic") or not record.get("question"):
+                raise ValueError(f"{input_path}:{line_no}: 'topic' and 'question' are required")
+            records.append({"id": record_id(record), "topic": record["topic"], "question": record["question"]})
+    return records
+
+def read_completed_ids(output_path):
+    """
+    Returns the ids already answered successfully in an existing output file.
+    A truncated last line (from an interrupted write) and failed records are ignored,
+    so those questions are retried.
+    """
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "error" not in record:
+                completed.add(record["id"])
+    return completed
+
+def _open_output(output_path):
+    """Opens the output file for appending, repairing a half-written last line first."""
+    if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+        with open(output_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            ends_with_newline = f.read(1) == b"\n"
+        out = open(output_path, "a", encoding="utf-8")
+        if not ends_with_newline:
+            out.write("\n")
+        return out
+    return open(output_path, "a", encoding="utf-8")
+
+def _answer(llm, item, docs, timings):
+    """Runs the LLM call for one question and builds its output record."""
+    started = time.perf_counter()
+    result = {"id": item["id"], "topic": item["topic"], "question": item["question"]}
+    try:
+        result["answer"] = qa_engine.generate_answer(llm, item["question"], docs)
+        result["sources"] = [qa_engine.describe_source(doc) for doc in docs]
+    except Exception as e:
+        result["error"] = str(e)
+    result["timings"] = dict(timings, llm_s=round(time.perf_counter() - started, 4))
+    return result
+
+def run_batch(input_path, output_path, k=None, concurrency=DEFAULT_CONCURRENCY,
+              batch_size=DEFAULT_BATCH_SIZE, llm=None, embeddings=None, progress=None):
+    """
+    Answers every pending question in input_path and appends the results to output_path.
+    Retrieval runs in batches per topic while up to `concurrency` LLM calls are in flight.
+    Returns a summary dict with counts.
+    """
+    records = read_questions(input_path)
+    completed = read_completed_ids(output_path)
+    pending = [r for r in records if r["id"] not in completed]
+    summary = {"total": len(records), "skipped": len(records) - len(pending), "answered": 0, "failed": 0}
+    if not pending:
+        return summary
+
+    llm = llm or qa_engine.create_llm()
+    embeddings = embeddings or qa_engine.create_embeddings()
+
+    by_topic = OrderedDict()
+    for record in pending:
+        by_topic.setdefault(record["topic"], []).append(record)
+
+    def write(future, out):
+        result = future.result()
+        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        out.flush()
+        summary["failed" if "error" in result else "answered"] += 1
+        if progress:
+            progress(result)
+
+    in_flight = set()
+    with _open_output(output_path) as out, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for topic, items in by_topic.items():
+            started = time.perf_counter()
+            try:
+                vector_store = qa_engine.load_vector_store(topic, embeddings)
+            except Exception as e:
+                for item in items:
+                    result = {"id": item["id"], "topic": topic, "question": item["question"],
+                              "error": f"Failed to load topic: {e}"}
+                    out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                    summary["failed"] += 1
+                out.flush()
+                continue
+            load_s = round(time.perf_counter() - started, 4)
+
+            for start in range(0, len(items), batch_size):
+                batch = items[start:start + batch_size]
+                started = time.perf_counter()
+                batch_docs = qa_engine.batch_retrieve(
+                    vector_store, embeddings, [item["question"] for item in batch], k=k
+                )
+                # Retrieval cost is shared by the batch; report each question's share.
+                retrieval_s = round((time.perf_counter() - started) / len(batch), 4)
+                timings = {"index_load_s": load_s, "retrieval_s": retrieval_s}
+
+                for item, docs in zip(batch, batch_docs):
+                    # Keep at most two waves of LLM calls queued so memory stays bounded.
+                    while len(in_flight) >= concurrency * 2:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            write(future, out)
+                    in_flight.add(pool.submit(_answer, llm, item, docs, timings))
+
+        for future in wait(in_flight).done:
+            write(future, out)
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of (topic, question) pairs.")
+    parser.add_argument("input", help="JSONL file with 'topic' and 'question' fields")
+    parser.add_argument("output", help="JSONL file to append answers to (reused to resume)")
+    parser.add_argument("--k", type=int, default=None,
+                        help="chunks retrieved per question (default: chosen per question by similarity)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="parallel LLM calls")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="questions embedded per batch")
+    parser.add_argument("--model", default=qa_engine.QA_MODEL_NAME, help="Groq model name")
+    args = parser.parse_args()
+
+    if not os.getenv("GROQ_API_KEY"):
+        print("❌ GROQ_API_KEY is not set.")
+        return 1
+
+    def progress(result):
+        status = "❌" if "error" in result else "✅"
+        print(f"{status} [{result['topic']}] {result['question'][:80]}")
+
+    summary = run_batch(
+        args.input, args.output, k=args.k, concurrency=args.concurrency,
+        batch_size=args.batch_size, llm=qa_engine.create_llm(args.model), progress=progress,
+    )
+    print(f"Answered {summary['answered']}, failed {summary['failed']}, "
+          f"skipped {summary['skipped']} already done (of {summary['total']}).")
+    return 0 if summary["failed"] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
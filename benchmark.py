@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Offline retrieval and QA benchmark.
+
+Measures PDF parsing, chunking, embedding throughput, index build/load time,
+index size, search latency and end-to-end answer latency over the shipped
+document_library/ PDFs. Larger corpora are synthesized from the real chunks
+(10x, 100x, ...) by jittering their vectors, so index behaviour at scale can be
+measured without re-embedding millions of chunks. Answers come from the
+deterministic FakeChatGroq, so no API key or network access is needed.
+
+Usage:
+    python benchmark.py --scales 1,10,100 --output benchmark_results/latest.json
+    python benchmark.py --compare benchmark_results/previous.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import numpy as np
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores import FAISS
+
+import chunking
+import ingestion
+import metrics
+import pdf_extraction
+import qa_engine
+from fake_llm import FakeChatGroq
+
+BENCHMARK_QUESTIONS = [
+    "What is the eligibility for MCA admission?",
+    "What documents are required at the time of admission?",
+    "What is the fee structure for the MCA course?",
+    "How many seats are available for MCA?",
+    "What is the CAP round process after the CET?",
+    "What co-curricular activities does the college offer?",
+    "What subjects are taught in the first semester?",
+    "Is there a hostel facility?",
+    "How is internal assessment carried out?",
+    "What is the last date for document verification?",
+]
+SEARCH_REPEATS = 20
+VECTOR_JITTER = 0.05
+
+def _ms(seconds):
+    return round(seconds * 1000.0, 3)
+
+def _latency_stats(samples):
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean_ms": _ms(sum(ordered) / len(ordered)) if ordered else 0.0,
+        "p50_ms": _ms(metrics.percentile(ordered, 50)),
+        "p99_ms": _ms(metrics.percentile(ordered, 99)),
+    }
+
+def _max_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux.
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1)
+
+def _dir_bytes(path):
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+def find_pdfs(library):
+    """Returns every PDF path in the document library, sorted for a stable order."""
+    pdfs = []
+    for root, dirs, files in os.walk(library):
+        # Skips document_library/.blobs, which holds a second name for every category file.
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        pdfs.extend(os.path.join(root, f) for f in files if f.lower().endswith(".pdf"))
+    return sorted(pdfs)
+
+def bench_ingest(pdf_paths, embeddings, extraction_backend=None, chunking_strategy=None):
+    """
+    Times parsing, chunking and embedding the real corpus with the same page reader
+    and chunker as ingestion.process_category. Parsing skips the extraction cache so
+    it is measured cold. Returns (results, chunks, vectors).
+    """
+    stats = {"files": 0, "pages": 0, "duplicate_files": {}, "low_text_pages": 0, "ocr_pages": 0, "ocr_errors": 0}
+    started = time.perf_counter()
+    pages = list(ingestion.iter_pages(pdf_paths, stats, extraction_backend, use_ocr=False, use_cache=False))
+    parse_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    chunks = list(ingestion.iter_chunks(pages, ingestion.make_splitter(chunking_strategy)))
+    split_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    vectors = np.asarray(embeddings.embed_documents([c.page_content for c in chunks]), dtype="float32")
+    embed_s = time.perf_counter() - started
+
+    results = {
+        "extraction": pdf_extraction.get_backend(extraction_backend).name,
+        "chunking": chunking_strategy or chunking.CHUNKING_STRATEGY,
+        "files": len(pdf_paths),
+        "pages": len(pages),
+        "chunks": len(chunks),
+        "characters": sum(len(c.page_content) for c in chunks),
+        "parse_s": round(parse_s, 4),
+        "parse_pages_per_s": round(len(pages) / parse_s, 2) if parse_s else None,
+        "split_s": round(split_s, 4),
+        "embed_s": round(embed_s, 4),
+        "embed_chunks_per_s": round(len(chunks) / embed_s, 2) if embed_s else None,
+    }
+    return results, chunks, vectors
+
+def synthesize_corpus(chunks, vectors, scale, seed=0):
+    """Repeats the real chunks `scale` times, jittering each copy's vectors so they stay distinct."""
+    if scale == 1:
+        return [c.page_content for c in chunks], [dict(c.metadata) for c in chunks], vectors
+    rng = np.random.default_rng(seed)
+    texts, metadatas, blocks = [], [], []
+    for copy in range(scale):
+        texts.extend(f"[copy {copy}] {c.page_content}" for c in chunks)
+        metadatas.extend(dict(c.metadata, copy=copy) for c in chunks)
+        jittered = vectors + rng.normal(0.0, VECTOR_JITTER, vectors.shape).astype("float32") if copy else vectors
+        blocks.append(jittered / np.linalg.norm(jittered, axis=1, keepdims=True))
+    return texts, metadatas, np.vstack(blocks).astype("float32")
+
+def bench_scale(scale, chunks, vectors, query_vectors, embeddings, work_dir, k):
+    """Builds, saves, loads and searches one corpus size."""
+    texts, metadatas, scaled_vectors = synthesize_corpus(chunks, vectors, scale)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    store = FAISS.from_embeddings(list(zip(texts, scaled_vectors.tolist())), embeddings, metadatas=metadatas)
+    build_s = time.perf_counter() - started
+    _, build_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    path = os.path.join(work_dir, f"scale_{scale}")
+    store.save_local(path)
+    del store
+
+    started = time.perf_counter()
+    store = FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+    load_s = time.perf_counter() - started
+
+    samples = []
+    for _ in range(SEARCH_REPEATS):
+        for query in query_vectors:
+            started = time.perf_counter()
+            store.similarity_search_by_vector(query, k=k)
+            samples.append(time.perf_counter() - started)
+
+    return {
+        "scale": scale,
+        "vectors": len(texts),
+        "build_s": round(build_s, 4),
+        "build_peak_python_mb": round(build_peak / (1024 * 1024), 1),
+        "load_s": round(load_s, 4),
+        "index_bytes": _dir_bytes(path),
+        "search": _latency_stats(samples),
+        "max_rss_mb": _max_rss_mb(),
+    }
+
+def bench_answers(store, llm, k):
+    """Times end-to-end answers (retrieval + fake LLM) and the per-stage breakdown."""
+    metrics.STAGE_SECONDS.reset()
+    samples = []
+    for question in BENCHMARK_QUESTIONS:
+        started = time.perf_counter()
+        qa_engine.answer_question(llm, store, question, k=k)
+        samples.append(time.perf_counter() - started)
+    stages = {
+        key[0]: {"count": s["count"], "mean_ms": _ms(s["mean"]), "p50_ms": _ms(s["p50"]), "p99_ms": _ms(s["p99"])}
+        for key, s in metrics.STAGE_SECONDS.summary().items()
+    }
+    return {"end_to_end": _latency_stats(samples), "stages": stages}
+
+def run_benchmark(library, scales, k=qa_engine.RETRIEVAL_K, fake_embeddings=False,
+                  llm_latency=0.2, tokens_per_second=250.0, answer_tokens=120):
+    """Runs the whole suite and returns the results as a JSON-friendly dict."""
+    pdf_paths = find_pdfs(library)
+    if not pdf_paths:
+        raise FileNotFoundError(f"No PDFs found under '{library}'.")
+    embeddings = DeterministicFakeEmbedding(size=384) if fake_embeddings else qa_engine.create_embeddings()
+    llm = FakeChatGroq(first_token_latency=llm_latency, tokens_per_second=tokens_per_second,
+                       answer_tokens=answer_tokens)
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "embeddings": "deterministic-fake" if fake_embeddings else qa_engine.EMBEDDING_MODEL_NAME,
+            "llm": {"first_token_latency": llm_latency, "tokens_per_second": tokens_per_second,
+                    "answer_tokens": answer_tokens},
+            "k": k,
+        },
+    }
+    results["ingest"], chunks, vectors = bench_ingest(pdf_paths, embeddings)
+    query_vectors = embeddings.embed_documents(BENCHMARK_QUESTIONS)
+
+    work_dir = tempfile.mkdtemp(prefix="chatbot_bench_")
+    try:
+        results["scales"] = [
+            bench_scale(scale, chunks, vectors, query_vectors, embeddings, work_dir, k) for scale in scales
+        ]
+        store = FAISS.load_local(os.path.join(work_dir, f"scale_{scales[0]}"), embeddings,
+                                 allow_dangerous_deserialization=True)
+        results["answers"] = bench_answers(store, llm, k)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    results["max_rss_mb"] = _max_rss_mb()
+    return results
+
+def compare(current, previous):
+    """Prints the relative change of the headline numbers between two result files."""
+    def pct(new, old):
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+    rows = [
+        ("parse pages/s", current["ingest"]["parse_pages_per_s"], previous["ingest"]["parse_pages_per_s"]),
+        ("embed chunks/s", current["ingest"]["embed_chunks_per_s"], previous["ingest"]["embed_chunks_per_s"]),
+        ("answer p50 ms", current["answers"]["end_to_end"]["p50_ms"], previous["answers"]["end_to_end"]["p50_ms"]),
+    ]
+    old_scales = {s["scale"]: s for s in previous.get("scales", [])}
+    for s in current.get("scales", []):
+        old = old_scales.get(s["scale"])
+        if old:
+            rows.append((f"{s['scale']}x build s", s["build_s"], old["build_s"]))
+            rows.append((f"{s['scale']}x load s", s["load_s"], old["load_s"]))
+            rows.append((f"{s['scale']}x search p99 ms", s["search"]["p99_ms"], old["search"]["p99_ms"]))
+    print(f"{'metric':<24}{'current':>12}{'previous':>12}{'change':>10}")
+    for name, new, old in rows:
+        if new is not None and old is not None:
+            print(f"{name:<24}{new:>12}{old:>12}{pct(new, old):>10}")
+
+def write_results(results, output=None):
+    """Writes results as JSON, by default to a timestamped file in benchmark_results/. Returns the path."""
+    output = output or os.path.join(
+        "benchmark_results", f"benchmark_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    return output
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingestion, retrieval and answering offline.")
+    parser.add_argument("--library", default=qa_engine.DOCUMENT_LIBRARY, help="folder with the PDFs to use")
+    parser.add_argument("--scales", default="1,10", help="comma-separated corpus multipliers, e.g. 1,10,100,1000")
+    parser.add_argument("--k", type=int, default=qa_engine.RETRIEVAL_K, help="chunks retrieved per question")
+    parser.add_argument("--fake-embeddings", action="store_true",
+                        help="use deterministic hash embeddings instead of the MiniLM model")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="fake LLM time to first token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=250.0, help="fake LLM generation speed")
+    parser.add_argument("--answer-tokens", type=int, default=120, help="fake LLM reply length")
+    parser.add_argument("--output", default=None, help="JSON file for the results")
+    parser.add_argument("--compare", default=None, help="previous results JSON to compare against")
+    args = parser.parse_args()
+
+    scales = sorted({int(s) for s in args.scales.split(",") if s.strip()})
+    results = run_benchmark(args.library, scales, k=args.k, fake_embeddings=args.fake_embeddings,
+                            llm_latency=args.llm_latency, tokens_per_second=args.tokens_per_second,
+                            answer_tokens=args.answer_tokens)
+
+    output = write_results(results, args.output)
+    print(f"📄 Benchmark results written to {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(results, json.load(f))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
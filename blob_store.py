@@ -0,0 +1,253 @@
+"""
+Content-addressed storage for library documents.
+
+Every distinct PDF is stored once under BLOB_DIR as <sha256>.pdf, and the
+files in category folders are hard links to it, so a brochure that belongs to
+five categories takes its disk space once while every existing reader of
+document_library/<category>/*.pdf keeps working. Where the filesystem cannot
+hard-link, the category gets a plain copy and nothing is saved, but nothing
+breaks either. A blob whose only remaining link is the store itself is no
+longer used by any category and is removed by collect_garbage().
+
+Work derived from a document is keyed by the same hash, so it is done once
+however many categories include the document: extracted page text in
+pdf_extraction's cache, and chunk embeddings in EmbeddingCache below.
+
+    python blob_store.py migrate [--dry-run]   # move an existing library into the store
+    python blob_store.py gc                    # drop blobs no category uses any more
+    python blob_store.py usage
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from array import array
+from collections import OrderedDict
+
+import metrics
+import pdf_extraction
+
+DOCUMENT_LIBRARY = "document_library"
+# Inside the library volume, so category files and blobs can be hard links to each other.
+BLOB_DIR = os.getenv("BLOB_DIR", os.path.join(DOCUMENT_LIBRARY, ".blobs"))
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "embedding_cache")
+EMBEDDING_CACHE_FILES = 8
+
+# --- Library ---
+def list_categories(root=DOCUMENT_LIBRARY):
+    """Category folder names; hidden folders such as the blob store are not categories."""
+    try:
+        return sorted(d for d in os.listdir(root) if not d.startswith(".") and os.path.isdir(os.path.join(root, d)))
+    except FileNotFoundError:
+        return []
+
+def library_files(root=DOCUMENT_LIBRARY):
+    """Yields ("category/file.pdf", path) for every PDF in the library."""
+    for category in list_categories(root):
+        folder = os.path.join(root, category)
+        for name in sorted(os.listdir(folder)):
+            if name.lower().endswith(".pdf"):
+                yield f"{category}/{name}", os.path.join(folder, name)
+
+# --- Blobs ---
+def blob_path(file_hash, blob_dir=BLOB_DIR):
+    return os.path.join(blob_dir, file_hash[:2], f"{file_hash}.pdf")
+
+def _link_or_copy(src, dst):
+    """Points dst at src's content, replacing whatever dst was, without a moment where dst is missing."""
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        # Renaming a link onto another link of the same file would do nothing and leave the temporary name.
+        return
+    tmp_path = f"{dst}.{uuid.uuid4().hex}.tmp"
+    try:
+        os.link(src, tmp_path)
+    except OSError:
+        shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dst)
+
+def store(path, file_hash, blob_dir=BLOB_DIR):
+    """Adds a file's content to the store unless it is already there. Returns the blob path."""
+    blob = blob_path(file_hash, blob_dir)
+    if not os.path.exists(blob):
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        _link_or_copy(path, blob)
+    return blob
+
+def add_to_category(path, file_hash, category, name, root=DOCUMENT_LIBRARY, blob_dir=BLOB_DIR):
+    """Stores a file's content and links it into a category as name. Returns the category path."""
+    blob = store(path, file_hash, blob_dir)
+    destination = os.path.join(root, category, name)
+    _link_or_copy(blob, destination)
+    return destination
+
+def is_linked(path, file_hash, blob_dir=BLOB_DIR):
+    """True when path already shares its storage with the blob."""
+    blob = blob_path(file_hash, blob_dir)
+    return os.path.exists(blob) and os.path.samefile(path, blob)
+
+def migrate(root=DOCUMENT_LIBRARY, blob_dir=BLOB_DIR, dry_run=False):
+    """
+    Replaces every category file by a link to its blob. Returns a report with the
+    number of files, distinct documents, and bytes before and after.
+    """
+    report = {"files": 0, "documents": 0, "linked": 0, "bytes_before": 0, "bytes_after": 0}
+    seen = set()
+    for _, path in library_files(root):
+        file_hash = pdf_extraction.file_sha256(path)
+        size = os.path.getsize(path)
+        report["files"] += 1
+        report["bytes_before"] += size
+        if file_hash not in seen:
+            seen.add(file_hash)
+            report["documents"] += 1
+            report["bytes_after"] += size
+        if is_linked(path, file_hash, blob_dir):
+            continue
+        report["linked"] += 1
+        if not dry_run:
+            store(path, file_hash, blob_dir)
+            _link_or_copy(blob_path(file_hash, blob_dir), path)
+    return report
+
+def collect_garbage(blob_dir=BLOB_DIR, dry_run=False):
+    """Removes blobs that no category links to any more. Returns (blobs removed, bytes freed)."""
+    removed, freed = 0, 0
+    if not os.path.isdir(blob_dir):
+        return removed, freed
+    for prefix in sorted(os.listdir(blob_dir)):
+        folder = os.path.join(blob_dir, prefix)
+        for name in sorted(os.listdir(folder)):
+            blob = os.path.join(folder, name)
+            stat = os.stat(blob)
+            if stat.st_nlink > 1:
+                continue
+            removed += 1
+            freed += stat.st_size
+            if not dry_run:
+                os.remove(blob)
+    return removed, freed
+
+def usage(root=DOCUMENT_LIBRARY):
+    """Bytes the library would take as separate files and bytes it takes on disk."""
+    logical, inodes = 0, {}
+    for _, path in library_files(root):
+        stat = os.stat(path)
+        logical += stat.st_size
+        inodes[(stat.st_dev, stat.st_ino)] = stat.st_size
+    return {"files_bytes": logical, "stored_bytes": sum(inodes.values())}
+
+# --- Embeddings ---
+def _encode(vector):
+    return base64.b64encode(array("f", vector).tobytes()).decode("ascii")
+
+def _decode(text):
+    return array("f", base64.b64decode(text)).tolist()
+
+def chunk_key(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """
+    Chunk embeddings per (document hash, embedding model), stored as append-only JSONL
+    of {"chunk": sha1 of the text, "vector": base64 float32}. Chunks are looked up by
+    their text, so any chunking strategy reuses whatever chunks it shares with an
+    earlier build. Only the files of the last few documents are held in memory.
+    """
+
+    def __init__(self, model_name, cache_dir=EMBEDDING_CACHE_DIR, max_files=EMBEDDING_CACHE_FILES):
+        self.model = hashlib.sha1(model_name.encode("utf-8")).hexdigest()[:12]
+        self.cache_dir = cache_dir
+        self.max_files = max_files
+        self._files = OrderedDict()
+
+    def _path(self, file_hash):
+        return os.path.join(self.cache_dir, file_hash[:2], f"{file_hash}.{self.model}.jsonl")
+
+    def _vectors(self, file_hash):
+        if file_hash in self._files:
+            self._files.move_to_end(file_hash)
+            return self._files[file_hash]
+        vectors = {}
+        try:
+            with open(self._path(file_hash), "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A line cut short by an interrupted run; that chunk is embedded again.
+                        continue
+                    vectors[record["chunk"]] = record["vector"]
+        except FileNotFoundError:
+            pass
+        self._files[file_hash] = vectors
+        while len(self._files) > self.max_files:
+            self._files.popitem(last=False)
+        return vectors
+
+    def _append(self, file_hash, records):
+        path = self._path(file_hash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            for key, encoded in records:
+                f.write(json.dumps({"chunk": key, "vector": encoded}) + "\n")
+
+    def embed(self, chunks, embeddings):
+        """
+        Returns one vector per chunk, embedding only chunks whose document has not
+        produced the same text before. Returns (vectors, number reused).
+        """
+        keys = [chunk_key(chunk.page_content) for chunk in chunks]
+        vectors = [None] * len(chunks)
+        missing = []
+        for i, chunk in enumerate(chunks):
+            file_hash = chunk.metadata.get("file_hash")
+            encoded = self._vectors(file_hash).get(keys[i]) if file_hash else None
+            if encoded is None:
+                missing.append(i)
+            else:
+                vectors[i] = _decode(encoded)
+        if missing:
+            new_vectors = embeddings.embed_documents([chunks[i].page_content for i in missing])
+            new_records = {}
+            for i, vector in zip(missing, new_vectors):
+                vectors[i] = vector
+                file_hash = chunks[i].metadata.get("file_hash")
+                if file_hash:
+                    encoded = _encode(vector)
+                    self._vectors(file_hash)[keys[i]] = encoded
+                    new_records.setdefault(file_hash, []).append((keys[i], encoded))
+            for file_hash, records in new_records.items():
+                self._append(file_hash, records)
+        reused = len(chunks) - len(missing)
+        metrics.INGEST_ITEMS.inc(reused, kind="reused_embeddings")
+        return vectors, reused
+
+# --- CLI ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Content-addressed document storage")
+    commands = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = commands.add_parser("migrate", help="store every library file once and link categories to it")
+    migrate_parser.add_argument("--dry-run", action="store_true")
+    gc_parser = commands.add_parser("gc", help="remove blobs no category uses")
+    gc_parser.add_argument("--dry-run", action="store_true")
+    commands.add_parser("usage", help="show library size with and without sharing")
+    args = parser.parse_args(argv)
+
+    if args.command == "migrate":
+        report = migrate(dry_run=args.dry_run)
+        print(f"{report['files']} files, {report['documents']} distinct documents, {report['linked']} "
+              f"{'to link' if args.dry_run else 'linked'}; {report['bytes_before'] / 1e6:.1f} MB -> "
+              f"{report['bytes_after'] / 1e6:.1f} MB")
+    elif args.command == "gc":
+        removed, freed = collect_garbage(dry_run=args.dry_run)
+        print(f"{removed} unused blobs, {freed / 1e6:.1f} MB {'to free' if args.dry_run else 'freed'}")
+    else:
+        report = usage()
+        print(f"{report['files_bytes'] / 1e6:.1f} MB in category files, {report['stored_bytes'] / 1e6:.1f} MB on disk")
+
+if __name__ == "__main__":
+    main()
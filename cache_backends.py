@@ -0,0 +1,227 @@
+"""
+Answer and query-embedding caches with pluggable storage.
+
+Backends (chosen with CACHE_BACKEND):
+  memory  in-process LRU; every replica has its own
+  sqlite  a SQLite file shared by the processes of one host; it must be on a local
+          disk or a ReadWriteOnce volume, never a network filesystem
+  redis   any Redis-compatible server (needs the redis package)
+  none    caching disabled
+
+Keys are built by make_key() from a kind and its parts, so every replica
+derives the same key for the same request. Answer keys include the topic's
+index version, so an answer is never served from an older build of the
+index; entries for old versions are simply never read again and age out
+through the LRU limit or CACHE_TTL_SECONDS.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+from langchain_core.embeddings import Embeddings
+
+import metrics
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_NAMESPACE = os.getenv("CACHE_NAMESPACE", "imcc")
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+CACHE_MEMORY_ENTRIES = int(os.getenv("CACHE_MEMORY_ENTRIES", "10000"))
+CACHE_SQLITE_PATH = os.getenv("CACHE_SQLITE_PATH", os.path.join("data", "qa_cache.sqlite3"))
+# How often the SQLite backend deletes expired entries, checked on writes.
+CACHE_PRUNE_SECONDS = int(os.getenv("CACHE_PRUNE_SECONDS", "3600"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+def make_key(kind, *parts):
+    """Builds a short, stable key from a cache kind and JSON-serializable parts."""
+    digest = hashlib.sha256(json.dumps(parts, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+    return f"{CACHE_NAMESPACE}:{kind}:{digest}"
+
+def normalize_question(question):
+    return " ".join(question.lower().split())
+
+# --- Backends ---
+class MemoryCache:
+    """Thread-safe LRU of bytes values with an optional per-entry TTL."""
+    name = "memory"
+
+    def __init__(self, max_entries=CACHE_MEMORY_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=CACHE_TTL_SECONDS):
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl if ttl else None)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+class SQLiteCache:
+    """
+    Key/value table in a SQLite file. Connections are opened per thread and per
+    process, since SQLite connections must not be shared across a fork.
+    """
+    name = "sqlite"
+
+    def __init__(self, path=CACHE_SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._last_prune = time.monotonic()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)")
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10)
+            # WAL lets readers proceed while another process writes. It relies on shared memory,
+            # so it only works between processes on one host and not on a network filesystem.
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key):
+        row = self._connection().execute(
+            "SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires >= ?)", (key, time.time())
+        ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def set(self, key, value, ttl=CACHE_TTL_SECONDS):
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                (key, sqlite3.Binary(value), time.time() + ttl if ttl else None),
+            )
+        if time.monotonic() - self._last_prune >= CACHE_PRUNE_SECONDS:
+            self._last_prune = time.monotonic()
+            self.prune()
+
+    def delete(self, key):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def prune(self):
+        """Deletes expired entries. Returns how many were removed."""
+        with self._connection() as conn:
+            return conn.execute("DELETE FROM cache WHERE expires < ?", (time.time(),)).rowcount
+
+class RedisCache:
+    """Stores entries on a Redis-compatible server; expiry is left to the server."""
+    name = "redis"
+
+    def __init__(self, url=REDIS_URL, client=None):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise ImportError("The 'redis' cache backend needs the redis package.") from e
+            client = redis.Redis.from_url(url)
+        self.client = client
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl=CACHE_TTL_SECONDS):
+        self.client.set(key, value, ex=ttl or None)
+
+    def delete(self, key):
+        self.client.delete(key)
+
+BACKENDS = {backend.name: backend for backend in (MemoryCache, SQLiteCache, RedisCache)}
+
+def create_cache(name=None):
+    """Returns a new cache for the named backend (default: CACHE_BACKEND), or None for 'none'."""
+    name = name or CACHE_BACKEND
+    if name == "none":
+        return None
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown cache backend '{name}'. Choose one of: none, {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
+
+# --- Query Embeddings ---
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Wraps an embedding model so repeated questions are not embedded again.
+    Document embedding (ingestion) is passed straight through.
+    """
+
+    def __init__(self, embeddings, cache, model_name):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model_name = model_name
+
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text):
+        key = make_key("query_embedding", self.model_name, normalize_question(text))
+        try:
+            cached = self.cache.get(key)
+        except Exception:
+            # A cache outage must not take answering down with it.
+            cached = None
+        metrics.record_cache("query_embedding", cached is not None)
+        if cached is not None:
+            return array("f", cached).tolist()
+        vector = self.embeddings.embed_query(text)
+        try:
+            self.cache.set(key, array("f", vector).tobytes())
+        except Exception:
+            pass
+        return vector
+
+# --- Answers ---
+class AnswerCache:
+    """Caches answers with their source summaries, keyed by topic index version, model and question."""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def key(self, topic, index_version, model_name, question, k):
+        return make_key("answer", topic, index_version, model_name, k, normalize_question(question))
+
+    def get(self, topic, index_version, model_name, question, k):
+        """Returns {'answer', 'sources'} or None."""
+        try:
+            cached = self.cache.get(self.key(topic, index_version, model_name, question, k))
+        except Exception:
+            cached = None
+        metrics.record_cache("answer", cached is not None)
+        return json.loads(cached) if cached is not None else None
+
+    def put(self, topic, index_version, model_name, question, k, answer, sources):
+        value = json.dumps({"answer": answer, "sources": sources}, ensure_ascii=False).encode("utf-8")
+        try:
+            self.cache.set(self.key(topic, index_version, model_name, question, k), value)
+        except Exception:
+            pass
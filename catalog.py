@@ -0,0 +1,205 @@
+"""
+In-memory catalog of document categories and processed topics.
+
+Streamlit reruns the whole page on every interaction, and listing
+document_library/ and vector_stores/ each time means several directory
+scans and stats per rerun, which are slow on a network-backed volume. The
+catalog keeps, per category, the number and size of its documents and, per
+topic, its document and chunk counts, index version, build time and index
+size. It is persisted as vector_stores/catalog.json and served from memory.
+
+Entries change only on events: a category is created or receives uploads,
+or a category is processed (ingestion.process_category) or its index is
+converted (index_compression). Changes made by another process or replica
+are picked up by checking the file's modification time at most once every
+CATALOG_REFRESH_SECONDS. Without a catalog file, the first read scans the
+folders once and saves the result.
+"""
+
+import json
+import os
+import threading
+import time
+
+import blob_store
+import qa_engine
+import sharding
+
+CATALOG_FILE = "catalog.json"
+CATALOG_REFRESH_SECONDS = float(os.getenv("CATALOG_REFRESH_SECONDS", "30"))
+# Written next to each index by ingestion.
+CHUNK_REPORT_FILE = "chunk_report.json"
+
+def _folder_size(folder):
+    total = 0
+    for dirpath, _, filenames in os.walk(folder):
+        for name in filenames:
+            try:
+                total += os.stat(os.path.join(dirpath, name)).st_size
+            except FileNotFoundError:
+                continue
+    return total
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+class Catalog:
+    """Categories and topics with their statistics, read from memory."""
+
+    def __init__(self, refresh_seconds=CATALOG_REFRESH_SECONDS):
+        self.library = qa_engine.DOCUMENT_LIBRARY
+        self.stores = qa_engine.VECTOR_STORES
+        self.path = os.path.join(self.stores, CATALOG_FILE)
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.RLock()
+        self._data = None
+        self._mtime = None
+        self._checked_at = 0.0
+
+    # --- Reading ---
+    def _current(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._data is not None and now - self._checked_at < self.refresh_seconds:
+                return self._data
+            self._checked_at = now
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if mtime is None:
+                if self._data is None:
+                    self.rebuild()
+            elif mtime != self._mtime:
+                data = _read_json(self.path)
+                if data is not None:
+                    self._data, self._mtime = data, mtime
+                elif self._data is None:
+                    self.rebuild()
+            return self._data
+
+    def categories(self):
+        return sorted(self._current()["categories"])
+
+    def topics(self):
+        return sorted(self._current()["topics"])
+
+    def category(self, name):
+        return self._current()["categories"].get(name)
+
+    def topic(self, name):
+        return self._current()["topics"].get(name)
+
+    def index_version(self, topic):
+        entry = self.topic(topic)
+        return entry["index_version"] if entry else None
+
+    def rows(self):
+        """One row per category for the admin page, with its topic statistics if it was processed."""
+        data = self._current()
+        rows = []
+        for name in sorted(set(data["categories"]) | set(data["topics"])):
+            category = data["categories"].get(name, {})
+            topic = data["topics"].get(name, {})
+            rows.append({
+                "category": name,
+                "documents": category.get("documents", 0),
+                "documents MB": round(category.get("bytes", 0) / 1e6, 1),
+                "indexed documents": topic.get("documents"),
+                "chunks": topic.get("chunks"),
+                "index MB": round(topic["size_bytes"] / 1e6, 1) if topic else None,
+                "built": time.strftime("%Y-%m-%d %H:%M", time.localtime(topic["built_at"])) if topic else None,
+            })
+        return rows
+
+    # --- Updating ---
+    def _save(self):
+        os.makedirs(self.stores, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, indent=2)
+        os.replace(tmp_path, self.path)
+        self._mtime = os.stat(self.path).st_mtime_ns
+
+    def _scan_category(self, name):
+        documents, size = 0, 0
+        with os.scandir(os.path.join(self.library, name)) as entries:
+            for entry in entries:
+                if entry.name.lower().endswith(".pdf") and entry.is_file():
+                    documents += 1
+                    size += entry.stat().st_size
+        return {"documents": documents, "bytes": size}
+
+    def _scan_topic(self, name, stats=None):
+        folder = os.path.join(self.stores, name)
+        version = qa_engine.index_version(name)
+        if version is None:
+            return None
+        report = (stats or {}).get("report") or _read_json(os.path.join(folder, CHUNK_REPORT_FILE)) or {}
+        manifest = sharding.load_manifest(folder)
+        if manifest:
+            chunks = sum(shard["chunks"] for shard in manifest["shards"].values())
+        else:
+            chunks = report.get("chunks")
+        documents = stats["files"] if stats else None
+        if documents is None:
+            documents = (self._data or {}).get("categories", {}).get(name, {}).get("documents")
+        return {
+            "documents": documents,
+            "chunks": chunks,
+            "index_version": version,
+            "built_at": time.time() if stats else version / 1e9,
+            "size_bytes": _folder_size(folder),
+            "shards": manifest["shard_count"] if manifest else 1,
+        }
+
+    def rebuild(self):
+        """Scans both folders and replaces the catalog."""
+        with self._lock:
+            self._data = {"categories": {}, "topics": {}}
+            for name in blob_store.list_categories(self.library):
+                self._data["categories"][name] = self._scan_category(name)
+            for name in qa_engine.list_topics():
+                entry = self._scan_topic(name)
+                if entry is not None:
+                    self._data["topics"][name] = entry
+            self._save()
+
+    def refresh_category(self, name):
+        """Call after a category was created or its documents changed."""
+        with self._lock:
+            # Picks up changes saved by other processes first, so they are not overwritten.
+            self._checked_at = 0.0
+            self._current()
+            if os.path.isdir(os.path.join(self.library, name)):
+                self._data["categories"][name] = self._scan_category(name)
+            else:
+                self._data["categories"].pop(name, None)
+            self._save()
+
+    def refresh_topic(self, name, stats=None):
+        """Call after a topic's index was built (with process_category's stats) or changed."""
+        with self._lock:
+            self._checked_at = 0.0
+            self._current()
+            entry = self._scan_topic(name, stats)
+            if entry is None:
+                self._data["topics"].pop(name, None)
+            else:
+                self._data["topics"][name] = entry
+            self._save()
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+def get_catalog():
+    """The process-wide catalog."""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = Catalog()
+        return _catalog
@@ -0,0 +1,94 @@
+"""
+Persistent chat history in a SQLite file.
+
+Messages are only ever inserted, one row each, so saving a message costs the
+same however long the conversation is, and nothing is rewritten. Rows carry
+an increasing id, and pages of a conversation are read by id, newest first,
+using the (conversation, id) index. The default file is under data/, the
+volume mounted from the PVC in Kubernetes, so conversations survive a pod
+restart.
+
+A chat session's conversations are named "<session>:<topic>", and the
+sessions table records which user each session belongs to. The first user to
+claim a session owns it; nobody else can claim it afterwards. Sessions whose
+messages were saved before owners were recorded belong to nobody.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+CHAT_DB_PATH = os.getenv("CHAT_DB_PATH", os.path.join("data", "chat_history.sqlite3"))
+
+class ChatStore:
+    """
+    Append-only message table. Connections are opened per thread and per
+    process, like cache_backends.SQLiteCache.
+    """
+
+    def __init__(self, path=CHAT_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "conversation TEXT NOT NULL, role TEXT NOT NULL, content TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS messages_conversation ON messages (conversation, id)")
+            if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sessions'").fetchone():
+                conn.execute("CREATE TABLE sessions (session TEXT PRIMARY KEY, owner TEXT NOT NULL, created REAL NOT NULL)")
+                # Sessions from before owners were recorded cannot be claimed by anyone.
+                conn.execute(
+                    "INSERT OR IGNORE INTO sessions SELECT substr(conversation, 1, instr(conversation, ':') - 1), '', "
+                    "MIN(created) FROM messages WHERE instr(conversation, ':') > 1 GROUP BY 1"
+                )
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def claim(self, session, owner):
+        """Records owner as the user of a session unless it already has one. True when owner owns it."""
+        conn = self._connection()
+        row = conn.execute("SELECT owner FROM sessions WHERE session = ?", (session,)).fetchone()
+        if row is None:
+            with conn:
+                conn.execute("INSERT OR IGNORE INTO sessions (session, owner, created) VALUES (?, ?, ?)",
+                             (session, owner, time.time()))
+            row = conn.execute("SELECT owner FROM sessions WHERE session = ?", (session,)).fetchone()
+        return bool(owner) and row[0] == owner
+
+    def append(self, conversation, role, content):
+        """Saves one message and returns it as a dict with its id."""
+        created = time.time()
+        with self._connection() as conn:
+            cursor = conn.execute(
+                "INSERT INTO messages (conversation, role, content, created) VALUES (?, ?, ?, ?)",
+                (conversation, role, content, created),
+            )
+        return {"id": cursor.lastrowid, "role": role, "content": content, "created": created}
+
+    def page(self, conversation, limit, before_id=None):
+        """The last `limit` messages before before_id (or the latest ones), oldest first."""
+        rows = self._connection().execute(
+            "SELECT id, role, content, created FROM messages WHERE conversation = ? AND id < ? "
+            "ORDER BY id DESC LIMIT ?",
+            (conversation, before_id if before_id is not None else 2 ** 63 - 1, limit),
+        ).fetchall()
+        return [{"id": row[0], "role": row[1], "content": row[2], "created": row[3]} for row in reversed(rows)]
+
+    def count(self, conversation, before_id=None):
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM messages WHERE conversation = ? AND id < ?",
+            (conversation, before_id if before_id is not None else 2 ** 63 - 1),
+        ).fetchone()[0]
+
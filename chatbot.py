@@ -367,17 +367,31 @@
 #     main()
 
 import streamlit as st
-from langchain_groq import ChatGroq
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
-# --- UPDATED IMPORTS FOR LANGCHAIN 0.3 ---
-from langchain.chains.retrieval import create_retrieval_chain
-from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain_core.prompts import PromptTemplate
 import os
 import shutil
+import uuid
+import pandas as pd
+
+import admission
+import auth
+import blob_store
+import cache_backends
+import catalog
+import chunking
+import faq_store
+import index_compression
+import ingestion
+import pdf_extraction
+import metrics
+import model_router
+import ocr
+import prefetch
+import prompts
+import qa_engine
+import retrieval_pool
+import sessions
+import sharding
+import uploads
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -396,64 +410,311 @@ def setup_directories():
 def get_qa_llm():
     """Initializes and caches the Language Model."""
     try:
-        return ChatGroq(model_name="llama-3.3-70b-versatile", temperature=0.3)
+        return qa_engine.create_llm()
     except Exception as e:
         st.error(f"Failed to initialize the language model: {e}")
         return None
 
+@st.cache_resource
+def get_model_router():
+    """Routes simple questions to the small model (MODEL_ROUTER=0 always uses the large one)."""
+    llm = get_qa_llm()
+    if llm is None:
+        return None
+    try:
+        return model_router.create_router(llm)
+    except Exception as e:
+        st.warning(f"Model router unavailable, using {qa_engine.QA_MODEL_NAME} for every question: {e}")
+        return None
+
+@st.cache_resource
+def get_cache():
+    """Creates the answer/query-embedding cache backend (CACHE_BACKEND) once per process."""
+    try:
+        return cache_backends.create_cache()
+    except Exception as e:
+        st.warning(f"Cache backend unavailable, answering without a cache: {e}")
+        return None
+
 @st.cache_resource
 def get_embeddings():
-    """Initializes and caches the text embedding model."""
+    """Initializes and caches the text embedding model; repeated questions reuse cached query embeddings."""
     try:
-        return HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2",
-            model_kwargs={'device': 'cpu'},
-            encode_kwargs={'normalize_embeddings': True}
-        )
+        embeddings = qa_engine.create_embeddings()
     except Exception as e:
         st.error(f"Failed to initialize embeddings model: {e}")
         return None
+    cache = get_cache()
+    if cache is None:
+        return embeddings
+    return cache_backends.CachedQueryEmbeddings(embeddings, cache, qa_engine.EMBEDDING_MODEL_NAME)
 
-# --- Prompt Template (Updated for New Chain) ---
-# Note: The new chain expects 'input' instead of 'question'
-qa_prompt = PromptTemplate(
-    input_variables=["context", "input"],
-    template="""
-    You are an expert document analysis assistant. Your primary responsibility is to provide accurate, comprehensive, and helpful responses based solely on the provided document context.
-
-    IMPORTANT INSTRUCTIONS:
-    1. ANSWER ONLY from the provided context - never invent, assume, or use external knowledge
-    2. If the context contains the answer, provide it completely and accurately
-    3. If the context partially answers the question, clearly state what information is available and what is missing
-    4. If the context doesn't contain relevant information, respond with: "I cannot find this information in the provided document."
-    5. Always cite specific parts of the context when possible
-    6. Maintain professional tone and clarity
-    
-    CONTEXT INFORMATION:
-    {context}
+@st.cache_resource
+def get_faq_matchers():
+    """One FAQ matcher per topic, for its current FAQ version only."""
+    return faq_store.FaqMatchers(get_embeddings())
 
-    USER QUESTION:
-    {input}
+def match_faq(topic, question):
+    """Returns the stored FAQ entry that confidently matches the question, or None."""
+    if get_embeddings() is None or faq_store.faq_version(topic) is None:
+        return None
+    with metrics.time_stage("faq_match"):
+        hit = get_faq_matchers().match(topic, question)
+    metrics.record_cache("faq", hit is not None)
+    return hit[0] if hit else None
+
+@st.cache_resource
+def start_metrics_endpoint():
+    """Starts the Prometheus /metrics endpoint once per process (METRICS_PORT=0 disables it)."""
+    if metrics.METRICS_PORT:
+        return metrics.start_metrics_server(metrics.METRICS_PORT)
+    return None
 
-    RESPONSE:
+@st.cache_resource
+def get_retrieval_pool():
+    """Starts the retrieval worker processes once per server (RETRIEVAL_WORKERS=0 keeps retrieval in-process)."""
+    try:
+        return retrieval_pool.create_pool()
+    except Exception as e:
+        st.warning(f"Retrieval workers could not be started, answering in-process instead: {e}")
+        return None
+
+@st.cache_resource
+def get_index_queue():
+    """Background indexing of categories that received new uploads, one per server."""
+    return uploads.IndexQueue(get_embeddings())
+
+@st.cache_resource
+def get_prefetcher():
+    """Loads topic indexes in the background, shared by all sessions."""
+    return prefetch.TopicPrefetcher(get_embeddings(), version_of=catalog.get_catalog().index_version)
+
+@st.cache_resource
+def get_rate_limiter():
+    """Question rate limits per user and chat session for this server."""
+    return admission.RateLimiter()
+
+@st.cache_resource
+def get_answer_slots():
+    """Caps how many questions this server retrieves and answers with the LLM at once."""
+    return admission.ConcurrencyLimiter()
+
+@st.cache_resource
+def get_session_registry():
+    """Chat histories and memory accounting for all sessions of this server."""
+    return sessions.SessionRegistry()
+
+def session_history():
     """
-)
+    This browser session's chat history; session state only holds the session id.
+    The id is also kept in the page URL, so a reconnect after a restart resumes the conversation.
+    The session belongs to the first user who used it: anyone else opening its link gets a new session.
+    """
+    registry = get_session_registry()
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = st.query_params.get("chat") or uuid.uuid4().hex
+    if not registry.store.claim(st.session_state.session_id, st.session_state.username):
+        st.session_state.session_id = uuid.uuid4().hex
+        registry.store.claim(st.session_state.session_id, st.session_state.username)
+    if st.query_params.get("chat") != st.session_state.session_id:
+        st.query_params["chat"] = st.session_state.session_id
+    return registry.touch(st.session_state.session_id, dict(st.session_state))
+
+def render_chat(history, conversation):
+    """Renders the latest page of messages, with a button that loads earlier pages from the store."""
+    shown = st.session_state.get("chat_pages", 1) * sessions.CHAT_PAGE_SIZE
+    messages = history.latest(conversation, shown)
+    hidden = history.total(conversation) - len(messages)
+    if hidden and st.button(f"Show earlier messages ({hidden} more)"):
+        st.session_state.chat_pages = st.session_state.get("chat_pages", 1) + 1
+        st.rerun()
+    for message in messages:
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
+
+def cached_answer(topic, question, pool):
+    """
+    Looks the question up in the answer cache for the topic's current index version,
+    model setup and retrieval settings. Returns (cache key, cached answer or None);
+    the key is passed on to answer_from_documents when there is no cached answer.
+    """
+    cache = get_cache()
+    # Workers always search the newest index; otherwise the prefetched index is searched.
+    version = catalog.get_catalog().index_version(topic) if pool is not None else get_prefetcher().prefetch(topic)[0]
+    router = get_model_router()
+    model = f"{router.name if router is not None else qa_engine.QA_MODEL_NAME}|{qa_engine.QA_PROMPT.label}"
+    key = (topic, version, model, question, qa_engine.retrieval_settings())
+    cached = cache_backends.AnswerCache(cache).get(*key) if cache is not None else None
+    return key, cached
+
+def answer_from_documents(topic, question, llm, pool, key):
+    """
+    Answers from the topic's documents and stores the answer in the answer cache under key
+    (from cached_answer). The answer is streamed into the page as it arrives. Questions wait
+    for an answer slot and raise admission.Busy when none is free in time.
+    Returns (answer, source summaries).
+    """
+    cache = get_cache()
+    router = get_model_router()
+    version = key[1]
+    with get_answer_slots().slot():
+        with st.spinner("Searching the documents..."):
+            if pool is not None:
+                source_docs = pool.retrieve(topic, question)
+            else:
+                source_docs, version = get_prefetcher().retrieve(topic, question)
+        # The LLM request starts as soon as retrieval returns and its reply is shown token by token.
+        if router is not None:
+            pieces = router.stream(question, source_docs)
+        else:
+            pieces = qa_engine.stream_answer(llm, question, source_docs)
+        answer = st.write_stream(pieces)
+    sources = [qa_engine.describe_source(doc) for doc in source_docs]
+    if cache is not None:
+        cache_backends.AnswerCache(cache).put(topic, version, *key[2:], answer, sources)
+    return answer, sources
+
+def render_sources(sources):
+    """Shows source summaries (as produced by qa_engine.describe_source) in an expander."""
+    with st.expander("📄 View Sources"):
+        if sources:
+            for i, source in enumerate(sources):
+                st.info(f"**Source {i+1}** (Page {source['page']}):\n\n{source['snippet']}...")
+                if source.get("also_in"):
+                    st.caption("Also found in: " + "; ".join(source["also_in"]))
+        else:
+            st.write("No source documents found.")
+
+def render_performance_panel():
+    """Shows per-stage latency percentiles, cache hit ratios, token counts and ingestion totals."""
+    stages = metrics.STAGE_SECONDS.summary()
+    if stages:
+        st.subheader("Answer path latency (seconds)")
+        st.dataframe(pd.DataFrame([
+            {"stage": key[0], "count": stats["count"], "mean": stats["mean"],
+             "p50": stats["p50"], "p95": stats["p95"], "p99": stats["p99"]}
+            for key, stats in sorted(stages.items())
+        ]), use_container_width=True)
+    else:
+        st.write("No questions answered by this process yet.")
+
+    columns = st.columns(3)
+    for column, (cache, label) in zip(columns, (("faq", "FAQ"), ("answer", "Answer cache"),
+                                                ("query_embedding", "Embedding cache"))):
+        lookups = metrics.CACHE_REQUESTS.value(cache=cache, result="hit") + metrics.CACHE_REQUESTS.value(cache=cache, result="miss")
+        column.metric(f"{label} hit ratio", f"{metrics.cache_hit_ratio(cache):.0%}", help=f"{lookups} lookups")
+
+    token_rows = [
+        {"model": model, "direction": direction, "tokens": metrics.LLM_TOKENS.value(model=model, direction=direction)}
+        for model, direction in metrics.LLM_TOKENS.label_sets()
+    ]
+    if token_rows:
+        st.subheader("LLM tokens")
+        st.dataframe(pd.DataFrame(token_rows), use_container_width=True)
+
+    model_latency = metrics.LLM_SECONDS.summary()
+    if model_latency:
+        st.subheader("Per-model latency and cost")
+        st.dataframe(pd.DataFrame([
+            {"model": key[0], "answers": stats["count"], "p50 s": stats["p50"], "p95 s": stats["p95"],
+             "cost $": round(metrics.LLM_COST_DOLLARS.value(model=key[0]), 4)}
+            for key, stats in sorted(model_latency.items())
+        ]), use_container_width=True)
+    st.subheader("Prompt templates")
+    st.dataframe(pd.DataFrame([
+        dict(row, **{
+            "fixed tokens sent": metrics.PROMPT_TOKENS.value(prompt=row["prompt"], part="fixed"),
+            "context/question tokens sent": metrics.PROMPT_TOKENS.value(prompt=row["prompt"], part="variable"),
+        })
+        for row in prompts.prompt_report()
+    ]), use_container_width=True)
+    routing_rows = [
+        {"model": model, "reason": reason, "questions": metrics.ROUTER_DECISIONS.value(model=model, reason=reason)}
+        for model, reason in metrics.ROUTER_DECISIONS.label_sets()
+    ]
+    if routing_rows:
+        st.subheader("Model routing")
+        st.dataframe(pd.DataFrame(routing_rows), use_container_width=True)
+
+    ingest = metrics.INGEST_SECONDS.summary().get(("total",))
+    if ingest:
+        chunks = metrics.INGEST_ITEMS.value(kind="chunks")
+        st.metric("Ingestion throughput", f"{chunks / ingest['sum']:.1f} chunks/s",
+                  help=f"{ingest['count']} categories processed, {chunks} chunks")
+    pool = get_retrieval_pool()
+    if pool is not None:
+        st.subheader("Retrieval workers")
+        st.caption("Workers share the embedding model and the memory-mapped index vectors. Resident memory "
+                   "counts shared pages in every worker; proportional memory splits them, so it adds up.")
+        st.dataframe(pd.DataFrame([
+            {"worker pid": pid, "resident MB": round(memory["rss"] / 1e6, 1),
+             "proportional MB": round(memory["pss"] / 1e6, 1) if memory["pss"] is not None else None}
+            for pid, memory in sorted(pool.worker_memory().items())
+        ]), use_container_width=True)
+
+    st.subheader("Admission control")
+    slots = get_answer_slots()
+    columns = st.columns(4)
+    columns[0].metric("Answering", f"{slots.in_flight}/{slots.max_concurrent}")
+    columns[1].metric("Waiting", f"{slots.waiting}/{slots.max_queue}")
+    columns[2].metric("Rate limited", int(metrics.ADMISSION_REJECTED.value(reason="rate_limited")))
+    columns[3].metric("Turned away busy", int(metrics.ADMISSION_REJECTED.value(reason="queue_full")
+                                              + metrics.ADMISSION_REJECTED.value(reason="timeout")))
+
+    registry = get_session_registry()
+    session_rows = registry.report()
+    if session_rows:
+        st.subheader("Sessions")
+        st.caption(f"At most {sessions.SESSION_MAX_MESSAGES} messages per session are kept in memory; "
+                   f"sessions idle for {sessions.SESSION_IDLE_SECONDS / 60:.0f} minutes are evicted.")
+        st.dataframe(pd.DataFrame(session_rows), use_container_width=True)
+        if st.button("Evict idle sessions now"):
+            st.info(f"Evicted {registry.evict_idle()} idle sessions.")
+    st.caption(f"Prometheus metrics are served on port {metrics.METRICS_PORT} at /metrics.")
+
+def render_chunk_report(report, previous=None):
+    """Shows chunk count and token size distribution, compared with the previous build if there was one."""
+    nested = ("histogram", "duplicate_files", "duplicate_chunks", "settings")
+    rows = [dict(build="this build", **{k: v for k, v in report.items() if k not in nested})]
+    if previous:
+        rows.append(dict(build="previous build", **{k: v for k, v in previous.items() if k not in nested}))
+    st.dataframe(pd.DataFrame(rows), use_container_width=True)
+    st.bar_chart(pd.Series(report.get("histogram", {}), name="chunks"))
+    duplicate_chunks = report.get("duplicate_chunks", {})
+    if any(duplicate_chunks.values()):
+        st.caption(f"Skipped {duplicate_chunks.get('exact', 0)} exact and {duplicate_chunks.get('near', 0)} "
+                   "near-duplicate chunks; their locations are listed on the chunk that was kept.")
+    for copy, original in report.get("duplicate_files", {}).items():
+        st.caption(f"'{copy}' is identical to '{original}' and was not indexed again.")
+    if report.get("compression_fallbacks"):
+        st.warning(f"{report['compression_fallbacks']} index(es) kept float32 because {report['compression']} "
+                   f"recall ({report['min_recall']}) was below {index_compression.MIN_RECALL}.")
+    low_text_pages = report.get("low_text_pages", 0)
+    if low_text_pages:
+        st.caption(f"{low_text_pages} pages had almost no extractable text; "
+                   f"{report.get('ocr_pages', 0)} of them were read with OCR.")
+        if not ocr.available():
+            st.warning("OCR is not available (it needs pytesseract and the tesseract binary), "
+                       "so scanned pages may be missing from the index.")
 
 # ADMIN PAGE
 def admin_page():
     st.sidebar.title("Admin Panel")
     if st.sidebar.button("Logout"):
-        st.session_state.authenticated = False
-        st.session_state.role = None
+        logout()
         st.rerun()
 
     st.title("📄 Admin Document Management")
     st.write("Create categories and upload PDFs.")
 
-    try:
-        categories = [d for d in os.listdir("document_library") if os.path.isdir(os.path.join("document_library", d))]
-    except FileNotFoundError:
-        categories = []
+    library = catalog.get_catalog()
+    categories = library.categories()
+    if categories:
+        st.dataframe(pd.DataFrame(library.rows()), use_container_width=True)
+    if st.button("Rescan folders", help="The list above is kept in memory and updated when documents are "
+                                        "uploaded or processed. Rescan after changing the folders by hand."):
+        library.rebuild()
+        st.rerun()
 
     st.markdown("---")
     st.header("1. Create a New Category")
@@ -463,6 +724,7 @@ def admin_page():
             category_path = os.path.join("document_library", new_category)
             if not os.path.exists(category_path):
                 os.makedirs(category_path)
+                library.refresh_category(new_category)
                 st.success(f"Category '{new_category}' created!")
                 st.rerun()
             else:
@@ -473,58 +735,166 @@ def admin_page():
     if categories:
         selected_category = st.selectbox("Select Category", options=categories)
         uploaded_files = st.file_uploader("Choose PDF files", type="pdf", accept_multiple_files=True, key=f"uploader_{selected_category}")
+        auto_index = st.checkbox("Index new files automatically", value=uploads.UPLOAD_AUTO_INDEX,
+                                 help="Re-processes the category in the background with the settings of its last build "
+                                      "(extraction, chunking, deduplication, shards, compression and OCR).")
 
         if st.button("Upload and Save"):
             if uploaded_files and selected_category:
-                save_path = os.path.join("document_library", selected_category)
-                for uploaded_file in uploaded_files:
-                    with open(os.path.join(save_path, uploaded_file.name), "wb") as f:
-                        f.write(uploaded_file.getbuffer())
-                st.success(f"Saved {len(uploaded_files)} files.")
+                results = uploads.save_uploads(uploaded_files, selected_category)
+                saved = [r for r in results if r["status"] in ("saved", "linked")]
+                for result in results:
+                    if result["status"] == "duplicate":
+                        st.info(f"'{result['name']}' is already in this category as '{result['duplicate_of']}' and was skipped.")
+                    elif result["status"] == "linked":
+                        st.info(f"'{result['name']}' is the same document as '{result['duplicate_of']}'; it was added "
+                                "without storing it again and its extracted text and embeddings are reused.")
+                    elif result["status"] == "rejected":
+                        st.error(f"'{result['name']}' was rejected: {result['error']}.")
+                if saved:
+                    library.refresh_category(selected_category)
+                    st.success(f"Saved {len(saved)} files.")
+                    if auto_index and get_embeddings() is not None:
+                        get_index_queue().enqueue(selected_category)
+                        st.info(f"'{selected_category}' was queued for indexing.")
+                    storage = blob_store.usage()
+                    if storage["files_bytes"] > storage["stored_bytes"]:
+                        st.caption(f"Documents shared between categories are stored once: "
+                                   f"{storage['stored_bytes'] / 1e6:.1f} MB on disk for "
+                                   f"{storage['files_bytes'] / 1e6:.1f} MB of category files.")
     else:
         st.info("Create a category first.")
+    index_status = get_index_queue().status() if get_embeddings() is not None else {}
+    if index_status:
+        st.dataframe(pd.DataFrame([dict(category=c, **{k: v for k, v in status.items() if not k.endswith("_at")})
+                                   for c, status in index_status.items()]), use_container_width=True)
 
     st.markdown("---")
     st.header("3. Process Category")
     if categories:
         process_cat = st.selectbox("Select Category to Process", options=categories, key="process_select")
+        backends = list(pdf_extraction.BACKENDS)
+        extraction_backend = st.selectbox(
+            "PDF text extraction",
+            options=backends,
+            index=backends.index(pdf_extraction.EXTRACTION_BACKEND) if pdf_extraction.EXTRACTION_BACKEND in backends else 0,
+            help="pymupdf is faster and keeps the reading order of multi-column pages; "
+                 "pymupdf-tables also keeps tables as one row per line. Already extracted pages are reused.",
+        )
+        strategies = list(ingestion.CHUNKING_STRATEGIES)
+        chunking_strategy = st.selectbox(
+            "Chunking",
+            options=strategies,
+            index=strategies.index(chunking.CHUNKING_STRATEGY) if chunking.CHUNKING_STRATEGY in strategies else 0,
+            help="structure keeps headings, lists and tables together and sizes chunks in tokens; "
+                 "recursive is the original fixed 1500-character split with 300 characters of overlap.",
+        )
+        shard_col, strategy_col = st.columns(2)
+        shard_count = shard_col.number_input(
+            "Index shards", min_value=1, max_value=64, value=max(1, sharding.SHARD_COUNT),
+            help="Split very large categories into several indexes that are searched in parallel.",
+        )
+        shard_strategy = strategy_col.selectbox(
+            "Shard by",
+            options=list(sharding.SHARD_STRATEGIES),
+            index=sharding.SHARD_STRATEGIES.index(sharding.SHARD_STRATEGY) if sharding.SHARD_STRATEGY in sharding.SHARD_STRATEGIES else 0,
+            disabled=shard_count == 1,
+            help="document keeps each PDF in one shard, so re-processing only rebuilds shards whose PDFs changed; "
+                 "hash spreads chunks evenly across shards.",
+        )
+        compressions = list(index_compression.COMPRESSIONS)
+        compression = st.selectbox(
+            "Index storage",
+            options=compressions,
+            index=compressions.index(index_compression.INDEX_COMPRESSION) if index_compression.INDEX_COMPRESSION in compressions else 0,
+            help="fp16 halves and sq8 quarters the index memory; the report shows recall against full precision.",
+        )
+        use_ocr = st.checkbox(
+            "OCR scanned pages", value=ocr.OCR_ENABLED,
+            help=f"Pages with fewer than {ocr.OCR_MIN_CHARS} characters of text are read with Tesseract "
+                 f"in {ocr.OCR_WORKERS} background processes. Text pages are not affected.",
+        )
         if st.button("Process Category"):
             with st.spinner("Processing..."):
                 try:
-                    doc_path = os.path.join("document_library", process_cat)
-                    pdf_files = [f for f in os.listdir(doc_path) if f.endswith(".pdf")]
-                    if not pdf_files:
-                        st.error("No PDFs found.")
-                        st.stop()
-
-                    all_documents = []
-                    for pdf in pdf_files:
-                        loader = PyPDFLoader(os.path.join(doc_path, pdf))
-                        all_documents.extend(loader.load())
-
-                    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1500, chunk_overlap=300)
-                    chunks = text_splitter.split_documents(all_documents)
-                    embeddings = get_embeddings()
-                    vector_store = FAISS.from_documents(chunks, embeddings)
-                    vector_store.save_local(os.path.join("vector_stores", process_cat))
+                    previous_report = ingestion.load_chunk_report(process_cat)
+                    status = st.empty()
+                    stats = ingestion.process_category(
+                        process_cat,
+                        get_embeddings(),
+                        progress=lambda p: status.write(f"Indexed {p['chunks']} chunks from {p['pages']} pages..."),
+                        extraction_backend=extraction_backend,
+                        chunking_strategy=chunking_strategy,
+                        shard_count=int(shard_count),
+                        shard_strategy=shard_strategy,
+                        compression=compression,
+                        use_ocr=use_ocr,
+                    )
+                    status.info(f"{stats['pages']} pages, {stats['chunks']} chunks in {stats['seconds']:.1f}s "
+                                f"({stats['chunks'] / stats['seconds']:.1f} chunks/s).")
+                    render_chunk_report(stats["report"], previous_report)
                     st.success("Processed successfully!")
                 except Exception as e:
                     st.error(f"Error: {e}")
 
+    st.markdown("---")
+    st.header("4. FAQ Answers")
+    st.write("Questions matching an FAQ entry are answered instantly, without searching the documents or calling the LLM.")
+    processed_topics = catalog.get_catalog().topics()
+    if processed_topics:
+        faq_topic = st.selectbox("Select Processed Category", options=processed_topics, key="faq_select")
+        faq_count = st.number_input("Questions to generate", min_value=1, max_value=100, value=20)
+        if st.button("Generate FAQ with LLM"):
+            with st.spinner("Generating FAQ..."):
+                try:
+                    embeddings = get_embeddings()
+                    vector_store = qa_engine.load_vector_store(faq_topic, embeddings)
+                    generated = faq_store.generate_faqs(get_qa_llm(), vector_store, embeddings, count=int(faq_count))
+                    known = {e["question"] for e in generated}
+                    entries = [e for e in faq_store.load_faqs(faq_topic) if e["question"] not in known] + generated
+                    faq_store.save_faqs(faq_topic, entries, embeddings)
+                    st.success(f"Generated {len(generated)} FAQ entries.")
+                except Exception as e:
+                    st.error(f"Error: {e}")
+
+        entries = faq_store.load_faqs(faq_topic)
+        edited = st.data_editor(
+            pd.DataFrame([{"question": e["question"], "answer": e["answer"]} for e in entries], columns=["question", "answer"]),
+            num_rows="dynamic",
+            use_container_width=True,
+            key=f"faq_editor_{faq_topic}",
+            column_config={"question": "Question", "answer": "Answer"},
+        )
+        if st.button("Save FAQ"):
+            # Keep the sources of entries whose question was not edited.
+            previous = {e["question"]: e for e in entries}
+            curated = []
+            for row in edited.to_dict("records"):
+                if not isinstance(row["question"], str) or not isinstance(row["answer"], str):
+                    continue
+                entry = dict(previous.get(row["question"], {"sources": [], "origin": "curated"}))
+                entry.update(question=row["question"], answer=row["answer"])
+                curated.append(entry)
+            faq_store.save_faqs(faq_topic, curated, get_embeddings())
+            st.success(f"Saved {len(curated)} FAQ entries.")
+    else:
+        st.info("Process a category first.")
+
+    st.markdown("---")
+    st.header("5. Performance")
+    with st.expander("Show latency and cache statistics for this server process"):
+        render_performance_panel()
+
 # USER PAGE
 def user_page():
     st.sidebar.title("Navigation")
     if st.sidebar.button("Logout"):
-        st.session_state.authenticated = False
-        st.session_state.role = None
+        logout()
         st.rerun()
 
     st.title("👉 📘 IMCC Student Information Hub")
 
-    try:
-        processed_topics = [d for d in os.listdir("vector_stores") if os.path.isdir(os.path.join("vector_stores", d))]
-    except FileNotFoundError:
-        processed_topics = []
+    processed_topics = catalog.get_catalog().topics()
 
     if not processed_topics:
         st.info("No topics available yet.")
@@ -533,75 +903,84 @@ def user_page():
     selected_topic = st.selectbox("Select a topic:", options=processed_topics)
 
     if selected_topic:
+        pool = get_retrieval_pool()
+        if pool is None:
+            # Starts loading the index in the background; the page does not wait for it.
+            get_prefetcher().prefetch(selected_topic)
+        history = session_history()
         if 'active_topic' not in st.session_state or st.session_state.active_topic != selected_topic:
-            with st.spinner(f"Loading '{selected_topic}'..."):
-                embeddings = get_embeddings()
-                vector_store_path = os.path.join("vector_stores", selected_topic)
-                st.session_state.vector_store = FAISS.load_local(
-                    vector_store_path, embeddings, allow_dangerous_deserialization=True
-                )
-                st.session_state.active_topic = selected_topic
-                st.session_state.qa_messages = []
-
-        for message in st.session_state.qa_messages:
-            with st.chat_message(message["role"]):
-                st.markdown(message["content"])
+            st.session_state.active_topic = selected_topic
+            st.session_state.chat_pages = 1
+        # One conversation per topic; coming back to a topic continues it.
+        conversation = f"{st.session_state.session_id}:{selected_topic}"
+        render_chat(history, conversation)
 
         if question := st.chat_input("Ask a question..."):
-            st.session_state.qa_messages.append({"role": "user", "content": question})
             with st.chat_message("user"):
                 st.markdown(question)
 
             with st.chat_message("assistant"):
-                with st.spinner("Thinking..."):
-                    try:
-                        llm = get_qa_llm()
-                        if llm and 'vector_store' in st.session_state:
-                            # --- NEW CHAIN LOGIC ---
-                            retriever = st.session_state.vector_store.as_retriever(search_kwargs={"k": 3})
-                            
-                            # 1. Create the document combining chain
-                            combine_docs_chain = create_stuff_documents_chain(llm, qa_prompt)
-                            
-                            # 2. Create the retrieval chain
-                            retrieval_chain = create_retrieval_chain(retriever, combine_docs_chain)
-                            
-                            # 3. Invoke (use "input" key)
-                            response = retrieval_chain.invoke({"input": question})
-                            
-                            # Extract answer and sources
-                            answer = response["answer"]
+                try:
+                    # FAQ and cached answers cost no LLM call, so only the rest count against the rate limit.
+                    faq_entry = match_faq(st.session_state.active_topic, question)
+                    llm = get_qa_llm()
+                    if faq_entry:
+                        answer = faq_entry["answer"]
+                        st.markdown(answer)
+                        render_sources(faq_entry.get("sources", []))
+                        history.append(conversation, "user", question)
+                        history.append(conversation, "assistant", answer)
+                    elif llm and get_embeddings() is not None:
+                        key, cached = cached_answer(st.session_state.active_topic, question, pool)
+                        if cached is not None:
+                            answer, sources = cached["answer"], cached["sources"]
                             st.markdown(answer)
-
-                            with st.expander("📄 View Sources"):
-                                # Source docs are now in response["context"]
-                                source_docs = response.get("context", [])
-                                if source_docs:
-                                    for i, doc in enumerate(source_docs):
-                                        st.info(f"**Source {i+1}** (Page {doc.metadata.get('page', 'N/A')}):\n\n{doc.page_content[:350]}...")
-                                else:
-                                    st.write("No source documents found.")
-
-                            st.session_state.qa_messages.append({"role": "assistant", "content": answer})
-                    except Exception as e:
-                        st.error(f"Error: {e}")
+                        else:
+                            # Per user and chat session, so students sharing an account do not slow each other down.
+                            get_rate_limiter().acquire(f"{st.session_state.username}:{st.session_state.session_id}",
+                                                       user=st.session_state.username)
+                            answer, sources = answer_from_documents(
+                                st.session_state.active_topic, question, llm, pool, key
+                            )
+                        render_sources(sources)
+                        # Saved only once answered, so questions turned away do not stay in the conversation.
+                        history.append(conversation, "user", question)
+                        history.append(conversation, "assistant", answer)
+                except admission.Busy as busy:
+                    if busy.reason == "rate_limited":
+                        st.warning(f"You are asking questions too quickly. Please wait {busy.retry_after:.0f} "
+                                   "seconds and ask again.")
+                    else:
+                        st.warning("The assistant is busy answering other students. Please try again in a moment.")
+                except Exception as e:
+                    st.error(f"Error: {e}")
 
 # LOGIN & MAIN
 def login_page():
     st.title("🔐 Login")
+    authenticator = auth.get_authenticator()
+    if not authenticator.has_users():
+        st.warning("No users are configured yet. Add one with: python auth.py add-user <name> --role admin")
     with st.form("login_form"):
         username = st.text_input("Username").lower()
         password = st.text_input("Password", type="password")
         submitted = st.form_submit_button("Login")
         if submitted:
-            credentials = {"admin": "admin_password", "student": "student_password"} 
-            if username in credentials and credentials[username] == password:
-                st.session_state.authenticated = True
-                st.session_state.role = "admin" if username == "admin" else "user"
+            token = authenticator.login(username, password)
+            if token:
+                # Kept in the URL so a reconnect, also to another pod, stays logged in.
+                st.query_params["token"] = token
                 st.rerun()
             else:
                 st.error("Invalid credentials")
 
+def logout():
+    # The token may still be in browser history or a copied link, so it is revoked, not just dropped.
+    auth.get_authenticator().revoke(st.query_params.get("token"))
+    st.query_params.pop("token", None)
+    st.session_state.authenticated = False
+    st.session_state.role = None
+
 def main():
     grok_api_key = os.getenv("GROQ_API_KEY")
     if not grok_api_key:
@@ -613,9 +992,13 @@ def main():
     
     os.environ["GROQ_API_KEY"] = grok_api_key
     setup_directories()
+    start_metrics_endpoint()
 
-    if 'authenticated' not in st.session_state:
-        st.session_state.authenticated = False
+    # Checked on every rerun; verified tokens are cached, so this is a dictionary lookup.
+    identity = auth.get_authenticator().verify(st.query_params.get("token"))
+    st.session_state.authenticated = identity is not None
+    st.session_state.role = identity["role"] if identity else None
+    st.session_state.username = identity["username"] if identity else None
 
     if st.session_state.authenticated:
         if st.session_state.role == 'admin': admin_page()
@@ -0,0 +1,235 @@
+"""
+Structure-aware chunking sized in tokens.
+
+Page text is first parsed into blocks (headings, paragraphs, list items and
+table rows). Blocks are then packed into chunks of at most CHUNK_MAX_TOKENS
+tokens without ever cutting through a block, so tables, lists and sections end
+on natural boundaries and need no overlap. Only a single block that is too
+large on its own is split further: tables by rows (repeating the header row),
+lists by items and paragraphs by sentences, and only the sentence split adds a
+small overlap. Each chunk starts with its section heading so it still makes
+sense when retrieved on its own.
+"""
+
+import os
+import re
+
+from metrics import percentile
+
+CHUNKING_STRATEGY = os.getenv("CHUNKING_STRATEGY", "structure")
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "350"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "30"))
+# Sections shorter than this are merged with the following section.
+CHUNK_MIN_TOKENS = int(os.getenv("CHUNK_MIN_TOKENS", "80"))
+TOKEN_ENCODING = "cl100k_base"
+
+_LIST_ITEM = re.compile(r"^\s*(?:[-•*▪●◦‣]|\(?\d{1,2}[.)]|\(?[a-zA-Z][.)]|\(?[ivxIVX]{1,4}[.)])\s+")
+_NUMBERED_HEADING = re.compile(r"^\s*(?:\d{1,2}(?:\.\d{1,2})*\.?|[A-Z][.)])\s+\S")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+# --- Token Counting ---
+_token_counter = None
+
+def count_tokens(text):
+    """Counts tokens with tiktoken, or estimates ~4 characters per token if it is unavailable."""
+    global _token_counter
+    if _token_counter is None:
+        try:
+            import tiktoken
+            encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+            _token_counter = lambda t: len(encoding.encode(t, disallowed_special=()))
+        except Exception:
+            _token_counter = lambda t: (len(t) + 3) // 4
+    return _token_counter(text)
+
+# --- Block Parsing ---
+def _is_heading(line):
+    words = line.split()
+    if not words or len(line) > 80 or len(words) > 10 or line.endswith((".", ",", ";")):
+        return False
+    letters = [c for c in line if c.isalpha()]
+    if len(letters) >= 3 and all(c.isupper() for c in letters):
+        return True
+    if line.endswith(":") and len(words) <= 6:
+        return True
+    # "2.1 Fee Structure" style headings; numbered list items were already matched as lists.
+    return len(words) > 1 and bool(_NUMBERED_HEADING.match(line)) and words[1][:1].isupper()
+
+def parse_blocks(text):
+    """
+    Splits page text into (kind, text) blocks where kind is 'heading', 'paragraph',
+    'list' or 'table'. Consecutive list items and table rows are grouped together.
+    """
+    blocks = []
+    current_kind, current_lines = None, []
+
+    def flush():
+        nonlocal current_kind, current_lines
+        if current_lines:
+            blocks.append((current_kind, "\n".join(current_lines)))
+        current_kind, current_lines = None, []
+
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if not line:
+            if current_kind == "paragraph":
+                flush()
+            continue
+        if line.startswith("|") and line.endswith("|"):
+            kind = "table"
+        elif _LIST_ITEM.match(line):
+            kind = "list"
+        elif _is_heading(line):
+            flush()
+            blocks.append(("heading", line))
+            continue
+        elif current_kind == "list" and not raw_line[:1].isalnum():
+            # An indented line inside a list continues the previous item.
+            current_lines[-1] += " " + line
+            continue
+        else:
+            kind = "paragraph"
+        if kind != current_kind:
+            flush()
+            current_kind = kind
+        current_lines.append(line)
+    flush()
+    return blocks
+
+# --- Splitting Oversized Blocks ---
+def _split_units(units, max_tokens, prefix="", overlap_tokens=0, joiner="\n"):
+    """Packs units (rows, items or sentences) into pieces of at most max_tokens."""
+    pieces, current = [], []
+    budget = max_tokens - count_tokens(prefix)
+    for unit in units:
+        candidate = current + [unit]
+        if current and count_tokens(joiner.join(candidate)) > budget:
+            pieces.append(prefix + joiner.join(current))
+            carry = []
+            if overlap_tokens:
+                for previous in reversed(current):
+                    overlap = [previous] + carry
+                    if (count_tokens(joiner.join(overlap)) > overlap_tokens
+                            or count_tokens(joiner.join(overlap + [unit])) > budget):
+                        break
+                    carry = overlap
+            current = carry + [unit]
+        else:
+            current = candidate
+    if current:
+        pieces.append(prefix + joiner.join(current))
+    return pieces
+
+def split_block(kind, text, max_tokens=CHUNK_MAX_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+    """Splits one block that is larger than max_tokens along its own structure."""
+    if kind == "table":
+        rows = text.split("\n")
+        header = rows[0] + "\n"
+        return [rows[0]] if len(rows) == 1 else _split_units(rows[1:], max_tokens, prefix=header)
+    if kind == "list":
+        return _split_units(text.split("\n"), max_tokens)
+    sentences = [s for s in _SENTENCE_END.split(text) if s]
+    pieces = _split_units(sentences, max_tokens, overlap_tokens=overlap_tokens, joiner=" ")
+    # A single sentence longer than the limit is cut by words as a last resort.
+    result = []
+    for piece in pieces:
+        if count_tokens(piece) <= max_tokens:
+            result.append(piece)
+        else:
+            result.extend(_split_units(piece.split(" "), max_tokens, joiner=" "))
+    return result
+
+# --- Chunker ---
+class StructureChunker:
+    """
+    Drop-in replacement for a LangChain text splitter's split_documents().
+    The current section heading of each source file is carried across pages.
+    """
+
+    def __init__(self, max_tokens=CHUNK_MAX_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS, min_tokens=CHUNK_MIN_TOKENS):
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.min_tokens = min_tokens
+        self._headings = {}
+
+    def split_text(self, text, heading=""):
+        """Returns ([(chunk text, section heading)], heading in effect at the end of the text)."""
+        chunks = []
+        parts, parts_tokens, chunk_heading = [], 0, heading
+        merged_heading = False
+
+        def prefix(section):
+            return section + "\n" if section else ""
+
+        def flush():
+            nonlocal parts, parts_tokens, merged_heading
+            if merged_heading:
+                # A merged heading left at the very end belongs to the next chunk instead.
+                parts.pop()
+            if parts:
+                chunks.append((prefix(chunk_heading) + "\n\n".join(parts), chunk_heading))
+            parts, parts_tokens, merged_heading = [], 0, False
+
+        for kind, block in parse_blocks(text):
+            if kind == "heading":
+                if parts and parts_tokens < self.min_tokens:
+                    # Keep a short section together with the next one instead of emitting a tiny chunk.
+                    parts.append(block)
+                    parts_tokens += count_tokens(block)
+                    merged_heading = True
+                else:
+                    flush()
+                heading = block
+                continue
+            if not parts:
+                chunk_heading = heading
+            budget = self.max_tokens - count_tokens(prefix(chunk_heading))
+            block_tokens = count_tokens(block)
+            if block_tokens > budget:
+                flush()
+                chunk_heading = heading
+                budget = self.max_tokens - count_tokens(prefix(heading))
+                for piece in split_block(kind, block, budget, self.overlap_tokens):
+                    chunks.append((prefix(heading) + piece, heading))
+                continue
+            if parts and parts_tokens + block_tokens > budget:
+                flush()
+                chunk_heading = heading
+            parts.append(block)
+            parts_tokens += block_tokens
+            merged_heading = False
+        flush()
+        return chunks, heading
+
+    def split_documents(self, documents):
+        """Splits page Documents into chunk Documents, adding 'section' and 'tokens' metadata."""
+        result = []
+        for doc in documents:
+            source = doc.metadata.get("source")
+            chunks, self._headings[source] = self.split_text(doc.page_content, self._headings.get(source, ""))
+            for text, section in chunks:
+                metadata = dict(doc.metadata, section=section, tokens=count_tokens(text))
+                result.append(type(doc)(page_content=text, metadata=metadata))
+        return result
+
+# --- Reporting ---
+def chunk_report(token_counts):
+    """Summarizes chunk sizes in tokens: count, total, min/mean/percentiles/max and a histogram."""
+    ordered = sorted(token_counts)
+    if not ordered:
+        return {"chunks": 0, "total_tokens": 0}
+    edges = [64, 128, 256, 384, 512, 768, 1024]
+    histogram = {}
+    for count in ordered:
+        label = next((f"<={edge}" for edge in edges if count <= edge), f">{edges[-1]}")
+        histogram[label] = histogram.get(label, 0) + 1
+    return {
+        "chunks": len(ordered),
+        "total_tokens": sum(ordered),
+        "min": ordered[0],
+        "mean": round(sum(ordered) / len(ordered), 1),
+        "p50": percentile(ordered, 50),
+        "p95": percentile(ordered, 95),
+        "max": ordered[-1],
+        "histogram": histogram,
+    }
@@ -0,0 +1,121 @@
+"""
+Exact and near-duplicate detection for chunks at ingestion time.
+
+Exact duplicates are found by hashing whitespace- and case-normalized text.
+Near duplicates are found with MinHash signatures over word shingles, bucketed
+by locality-sensitive hashing so each new chunk is only compared with a few
+likely candidates. The estimated Jaccard similarity must reach
+NEAR_DUPLICATE_THRESHOLD for a chunk to count as a duplicate.
+"""
+
+import hashlib
+import os
+import re
+import struct
+
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.85"))
+SHINGLE_WORDS = 5
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16
+# Headers and footers repeated on every page would otherwise collect hundreds of references.
+MAX_SOURCE_REFS = 20
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+def _permutations(count, seed=1):
+    """Fixed (a, b) pairs for the universal hash family, so signatures are stable across runs."""
+    pairs = []
+    for i in range(count):
+        digest = hashlib.sha256(f"minhash-{seed}-{i}".encode("utf-8")).digest()
+        a, b = struct.unpack("<QQ", digest[:16])
+        pairs.append((a % (_MERSENNE_PRIME - 1) + 1, b % _MERSENNE_PRIME))
+    return pairs
+
+_PERMUTATIONS = _permutations(NUM_PERMUTATIONS)
+
+def normalize(text):
+    """Lowercases and collapses whitespace and punctuation runs."""
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+def exact_key(text):
+    return hashlib.sha1(normalize(text).encode("utf-8")).hexdigest()
+
+def shingles(text, size=SHINGLE_WORDS):
+    """Returns the set of word n-gram hashes for a text."""
+    words = normalize(text).split()
+    if len(words) < size:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = (" ".join(words[i:i + size]) for i in range(len(words) - size + 1))
+    return {struct.unpack("<I", hashlib.blake2b(g.encode("utf-8"), digest_size=4).digest())[0] for g in grams}
+
+def minhash(shingle_set):
+    """MinHash signature of a shingle set (a tuple of NUM_PERMUTATIONS ints)."""
+    if not shingle_set:
+        return tuple([_MAX_HASH] * NUM_PERMUTATIONS)
+    return tuple(
+        min(((a * s + b) % _MERSENNE_PRIME) & _MAX_HASH for s in shingle_set)
+        for a, b in _PERMUTATIONS
+    )
+
+def estimated_jaccard(sig_a, sig_b):
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+def source_ref(metadata):
+    """The part of a chunk's metadata that identifies where it came from."""
+    return {"source": metadata.get("source"), "page": metadata.get("page")}
+
+def add_source(metadata, ref, limit=MAX_SOURCE_REFS):
+    """Records another location of a canonical chunk, keeping the list bounded for boilerplate text."""
+    refs = metadata.setdefault("sources", [source_ref(metadata)])
+    metadata["duplicates"] = metadata.get("duplicates", 0) + 1
+    if ref not in refs and len(refs) < limit:
+        refs.append(ref)
+
+class Deduplicator:
+    """
+    Remembers canonical chunks and reports whether a new chunk duplicates one of them.
+    Canonical ids are whatever the caller uses to find the chunk later (e.g. docstore ids).
+    """
+
+    def __init__(self, threshold=NEAR_DUPLICATE_THRESHOLD, bands=LSH_BANDS):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = NUM_PERMUTATIONS // bands
+        self._exact = {}
+        self._signatures = {}
+        self._buckets = {}
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def find(self, text):
+        """
+        Returns (canonical_id, kind) if text duplicates a known chunk, where kind is
+        'exact' or 'near'. Otherwise returns (None, fingerprint); pass the fingerprint
+        to add() to make the text canonical.
+        """
+        key = exact_key(text)
+        if key in self._exact:
+            return self._exact[key], "exact"
+        signature = minhash(shingles(text))
+        candidates = set()
+        for band_key in self._band_keys(signature):
+            candidates.update(self._buckets.get(band_key, ()))
+        best_id, best_score = None, 0.0
+        for candidate in candidates:
+            score = estimated_jaccard(signature, self._signatures[candidate])
+            if score > best_score:
+                best_id, best_score = candidate, score
+        if best_id is not None and best_score >= self.threshold:
+            return best_id, "near"
+        return None, (key, signature)
+
+    def add(self, canonical_id, fingerprint):
+        """Registers a new canonical chunk using the fingerprint returned by find()."""
+        key, signature = fingerprint
+        self._exact[key] = canonical_id
+        self._signatures[canonical_id] = signature
+        for band_key in self._band_keys(signature):
+            self._buckets.setdefault(band_key, []).append(canonical_id)
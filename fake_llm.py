@@ -0,0 +1,73 @@
+"""
+Deterministic stand-in for ChatGroq used by benchmarks and load tests.
+
+The reply depends only on the prompt text and the seed, and its timing is
+controlled by a fixed time-to-first-token plus a tokens-per-second rate, so
+runs are reproducible without network access or an API key.
+"""
+
+import hashlib
+import random
+import re
+import time
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+def fake_reply_tokens(prompt_text, answer_tokens, seed=0):
+    """Builds a deterministic reply by sampling words from the prompt itself."""
+    words = re.findall(r"\w+", prompt_text) or ["answer"]
+    digest = hashlib.sha256(f"{seed}\n{prompt_text}".encode("utf-8")).hexdigest()
+    rng = random.Random(int(digest[:16], 16))
+    return [rng.choice(words) + " " for _ in range(answer_tokens)]
+
+class FakeChatGroq(BaseChatModel):
+    """Chat model with ChatGroq's interface, a deterministic reply and configurable latency."""
+
+    model_name: str = "fake-groq"
+    first_token_latency: float = 0.2
+    tokens_per_second: float = 250.0
+    answer_tokens: int = 120
+    seed: int = 0
+
+    @property
+    def _llm_type(self):
+        return "fake-groq"
+
+    @property
+    def _identifying_params(self):
+        return {"model_name": self.model_name, "seed": self.seed}
+
+    def _prompt_text(self, messages):
+        return "\n".join(str(message.content) for message in messages)
+
+    def _usage(self, prompt_text):
+        return {
+            "input_tokens": len(prompt_text) // 4,
+            "output_tokens": self.answer_tokens,
+            "total_tokens": len(prompt_text) // 4 + self.answer_tokens,
+        }
+
+    def _token_delay(self):
+        return 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt_text = self._prompt_text(messages)
+        tokens = fake_reply_tokens(prompt_text, self.answer_tokens, self.seed)
+        time.sleep(self.first_token_latency + self._token_delay() * max(0, len(tokens) - 1))
+        message = AIMessage(content="".join(tokens).strip(), usage_metadata=self._usage(prompt_text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt_text = self._prompt_text(messages)
+        delay = self._token_delay()
+        time.sleep(self.first_token_latency)
+        for i, token in enumerate(fake_reply_tokens(prompt_text, self.answer_tokens, self.seed)):
+            if i:
+                time.sleep(delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(prompt_text)))
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Precomputed FAQ answers per topic.
+
+Each topic's canonical question/answer pairs live in data/faq_store/<topic>/faq.json,
+next to a tiny FAISS index over the questions. Incoming questions that are close
+enough to a stored question are answered from the store without retrieval or an
+LLM call.
+
+Usage (import answers produced by batch_qa.py):
+    python faq_store.py import-batch answers.jsonl
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+
+import prompts
+import qa_engine
+
+# Under data/, the persisted volume (/app/data), so FAQs survive a restart.
+FAQ_STORE = os.getenv("FAQ_STORE", os.path.join("data", "faq_store"))
+# Cosine similarity a question must reach to be served from the FAQ.
+FAQ_MATCH_THRESHOLD = float(os.getenv("FAQ_MATCH_THRESHOLD", "0.9"))
+FAQ_GENERATION_CHUNKS = 12
+
+def _faq_dir(topic):
+    return os.path.join(FAQ_STORE, topic)
+
+def _faq_file(topic):
+    return os.path.join(_faq_dir(topic), "faq.json")
+
+def faq_version(topic):
+    """Returns a value that changes whenever the topic's FAQ is saved (None if there is no FAQ)."""
+    try:
+        return os.path.getmtime(_faq_file(topic))
+    except FileNotFoundError:
+        return None
+
+def load_faqs(topic):
+    """Returns the topic's FAQ entries as a list of dicts."""
+    try:
+        with open(_faq_file(topic), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+def save_faqs(topic, entries, embeddings):
+    """Writes the topic's FAQ entries and rebuilds the question index."""
+    entries = [e for e in entries if e.get("question", "").strip() and e.get("answer", "").strip()]
+    faq_dir = _faq_dir(topic)
+    index_dir = os.path.join(faq_dir, "index")
+    os.makedirs(faq_dir, exist_ok=True)
+    if os.path.exists(index_dir):
+        shutil.rmtree(index_dir)
+    if entries:
+        # Embeddings are normalized, so inner product is the cosine similarity.
+        index = FAISS.from_texts(
+            [e["question"] for e in entries],
+            embeddings,
+            metadatas=[{"entry": i} for i in range(len(entries))],
+            distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
+        )
+        index.save_local(index_dir)
+    # The JSON file is written last because its mtime is the FAQ version.
+    with open(_faq_file(topic), "w", encoding="utf-8") as f:
+        json.dump(entries, f, ensure_ascii=False, indent=2)
+    return entries
+
+class FaqMatcher:
+    """Matches questions against one topic's FAQ entries."""
+
+    def __init__(self, topic, embeddings, threshold=FAQ_MATCH_THRESHOLD):
+        self.entries = load_faqs(topic)
+        self.threshold = threshold
+        self.index = None
+        index_dir = os.path.join(_faq_dir(topic), "index")
+        if self.entries and os.path.exists(index_dir):
+            self.index = FAISS.load_local(
+                index_dir,
+                embeddings,
+                allow_dangerous_deserialization=True,
+                distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
+            )
+
+    def match(self, question):
+        """Returns (entry, score) for a confident hit, or None."""
+        if self.index is None:
+            return None
+        doc, score = self.index.similarity_search_with_score(question, k=1)[0]
+        if score < self.threshold:
+            return None
+        return self.entries[doc.metadata["entry"]], float(score)
+
+class FaqMatchers:
+    """
+    The matcher for each topic's current FAQ version. Saving a FAQ changes its version,
+    and the next question replaces the old matcher, so old versions are not kept around.
+    """
+
+    def __init__(self, embeddings, matcher=FaqMatcher):
+        self.embeddings = embeddings
+        self._matcher = matcher
+        self._matchers = {}
+        self._lock = threading.Lock()
+
+    def match(self, topic, question):
+        """Returns (entry, score) for a confident hit, or None (also without a FAQ or embeddings)."""
+        version = faq_version(topic)
+        if version is None or self.embeddings is None:
+            return None
+        with self._lock:
+            cached = self._matchers.get(topic)
+        if cached is None or cached[0] != version:
+            cached = (version, self._matcher(topic, self.embeddings))
+            with self._lock:
+                self._matchers[topic] = cached
+        return cached[1].match(question)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._matchers)
+
+# --- Building FAQs ---
+def generate_faqs(llm, vector_store, embeddings, count=20, concurrency=4):
+    """
+    Asks the LLM for likely student questions about a processed category,
+    then answers each of them through the normal retrieval path.
+    """
+    docs = qa_engine.all_documents(vector_store)
+    step = max(1, len(docs) // FAQ_GENERATION_CHUNKS)
+    sample = docs[::step][:FAQ_GENERATION_CHUNKS]
+    template = prompts.get_prompt("faq_generation").template
+    reply = llm.invoke(template.format(count=count, context=qa_engine.format_context(sample)))
+    questions = []
+    for line in reply.content.splitlines():
+        line = line.strip().lstrip("-*0123456789.) ").strip()
+        if line.endswith("?") and line not in questions:
+            questions.append(line)
+    questions = questions[:count]
+    if not questions:
+        return []
+
+    retrieved = qa_engine.batch_retrieve(vector_store, embeddings, questions)
+
+    def answer(question, docs):
+        return {
+            "question": question,
+            "answer": qa_engine.generate_answer(llm, question, docs),
+            "sources": [qa_engine.describe_source(doc) for doc in docs],
+            "origin": "generated",
+        }
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        # Questions the documents do not cover would only become "cannot find" FAQ entries.
+        return [entry for entry in pool.map(answer, questions, retrieved) if entry["sources"]]
+
+def entries_from_batch(output_path):
+    """Groups successful batch_qa.py results into FAQ entries per topic."""
+    by_topic = {}
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "error" in record:
+                continue
+            by_topic.setdefault(record["topic"], []).append({
+                "question": record["question"],
+                "answer": record["answer"],
+                "sources": record.get("sources", []),
+                "origin": "batch",
+            })
+    return by_topic
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage precomputed FAQ answers.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    import_cmd = sub.add_parser("import-batch", help="add batch_qa.py answers to the FAQ store")
+    import_cmd.add_argument("answers", help="JSONL output of batch_qa.py")
+    args = parser.parse_args()
+
+    if args.command == "import-batch":
+        embeddings = qa_engine.create_embeddings()
+        for topic, new_entries in entries_from_batch(args.answers).items():
+            known = {e["question"] for e in new_entries}
+            entries = [e for e in load_faqs(topic) if e["question"] not in known] + new_entries
+            save_faqs(topic, entries, embeddings)
+            print(f"✅ {topic}: {len(entries)} FAQ entries")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""
+Compressed index storage for FAISS vector stores.
+
+MiniLM vectors are 384 float32 values (1.5 KiB each). An index can instead
+store them as float16 ("fp16", half the size, practically lossless) or 8-bit
+scalar quantized ("sq8", a quarter of the size), optionally after a PCA
+projection to fewer dimensions. Only the index changes: vector ids, the
+docstore and the rest of the store stay as they are.
+
+New categories are compressed when they are processed (INDEX_COMPRESSION),
+and existing ones are converted with:
+
+    python index_compression.py migrate --compression sq8 [--pca 192] [--topic MCA] [--dry-run]
+
+Every conversion measures recall@k against the float32 original and refuses
+to replace an index whose recall falls below --min-recall.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+
+import faiss
+import numpy as np
+
+import catalog
+import qa_engine
+import sharding
+
+INDEX_COMPRESSION = os.getenv("INDEX_COMPRESSION", "none")
+INDEX_PCA_DIM = int(os.getenv("INDEX_PCA_DIM", "0"))
+COMPRESSIONS = ("none", "fp16", "sq8")
+COMPRESSION_REPORT_FILE = "compression.json"
+RECALL_SAMPLE = 200
+RECALL_KS = (qa_engine.RETRIEVAL_K, 10)
+MIN_RECALL = 0.9
+
+_QUANTIZERS = {
+    "fp16": faiss.ScalarQuantizer.QT_fp16,
+    "sq8": faiss.ScalarQuantizer.QT_8bit,
+}
+
+def is_uncompressed(index):
+    return isinstance(faiss.downcast_index(index), faiss.IndexFlat)
+
+def index_bytes(index):
+    return int(faiss.serialize_index(index).size)
+
+def stored_vectors(index):
+    """Returns every vector of an uncompressed index as a float32 matrix."""
+    return index.reconstruct_n(0, index.ntotal)
+
+def compress_index(index, compression=INDEX_COMPRESSION, pca_dim=INDEX_PCA_DIM):
+    """
+    Returns a compressed copy of a flat index with the vectors in the same order,
+    or the index itself for compression 'none' without PCA.
+    """
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown index compression '{compression}'. Choose one of: {', '.join(COMPRESSIONS)}")
+    if compression == "none" and not pca_dim:
+        return index
+    if not is_uncompressed(index):
+        raise ValueError("Only uncompressed (flat float32) indexes can be compressed.")
+    vectors = stored_vectors(index)
+    dim = index.d
+    if pca_dim:
+        if pca_dim >= dim:
+            raise ValueError(f"PCA dimension must be below {dim}.")
+        if index.ntotal < pca_dim:
+            raise ValueError(f"PCA to {pca_dim} dimensions needs at least {pca_dim} vectors, the index has {index.ntotal}.")
+        dim = pca_dim
+    if compression == "none":
+        inner = faiss.IndexFlat(dim, index.metric_type)
+    else:
+        inner = faiss.IndexScalarQuantizer(dim, _QUANTIZERS[compression], index.metric_type)
+    compressed = faiss.IndexPreTransform(faiss.PCAMatrix(index.d, pca_dim), inner) if pca_dim else inner
+    compressed.train(vectors)
+    compressed.add(vectors)
+    return compressed
+
+def recall_report(original, compressed, queries=None, ks=RECALL_KS, sample=RECALL_SAMPLE, seed=0):
+    """
+    Measures how many of the float32 top-k neighbours the compressed index also returns.
+    Without queries, a random sample of the stored vectors is used as queries. Each one
+    would find itself first in both indexes, which inflates recall, so its own id is
+    dropped from both result lists and the k neighbours after it are compared.
+    """
+    ids = None
+    if queries is None:
+        rng = random.Random(seed)
+        ids = rng.sample(range(original.ntotal), min(sample, original.ntotal))
+        queries = np.vstack([original.reconstruct(i) for i in ids]) if ids else np.zeros((0, original.d), "float32")
+    queries = np.asarray(queries, dtype="float32")
+    report = {
+        "queries": len(queries),
+        "vectors": original.ntotal,
+        "original_bytes": index_bytes(original),
+        "compressed_bytes": index_bytes(compressed),
+    }
+    report["size_ratio"] = round(report["compressed_bytes"] / max(1, report["original_bytes"]), 3)
+    for k in ks:
+        k = min(k, original.ntotal - 1 if ids is not None else original.ntotal)
+        if not len(queries) or k < 1:
+            continue
+        extra = 1 if ids is not None else 0
+        _, truth = original.search(queries, k + extra)
+        _, found = compressed.search(queries, k + extra)
+        if ids is not None:
+            truth = [[j for j in row if j != i][:k] for i, row in zip(ids, truth)]
+            found = [[j for j in row if j != i][:k] for i, row in zip(ids, found)]
+        hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+        report[f"recall@{k}"] = round(hits / (len(queries) * k), 4)
+    return report
+
+def min_recall(report):
+    values = [v for key, v in report.items() if key.startswith("recall@")]
+    return min(values) if values else 1.0
+
+def compress_vector_store(vector_store, compression=INDEX_COMPRESSION, pca_dim=INDEX_PCA_DIM, threshold=MIN_RECALL):
+    """
+    Compresses a FAISS store's index in place. Returns the recall report, or None if nothing changed.
+    Like the migration, the float32 index is kept (and the report marked skipped) when recall is below threshold.
+    """
+    original = vector_store.index
+    compressed = compress_index(original, compression, pca_dim)
+    if compressed is original:
+        return None
+    report = recall_report(original, compressed)
+    report.update(compression=compression, pca_dim=pca_dim or None)
+    if min_recall(report) < threshold:
+        report["skipped"] = f"recall below {threshold}"
+        return report
+    vector_store.index = compressed
+    return report
+
+# --- Migration ---
+def _index_folders(topic):
+    """Yields the folders holding an index.faiss for a topic (one per shard if it is sharded)."""
+    folder = os.path.join(qa_engine.VECTOR_STORES, topic)
+    manifest = sharding.load_manifest(folder)
+    if manifest is None:
+        yield folder
+        return
+    for shard, entry in sorted(manifest["shards"].items(), key=lambda item: int(item[0])):
+        if entry["chunks"]:
+            yield sharding.shard_path(folder, shard)
+
+def migrate_topic(topic, compression, pca_dim=0, threshold=MIN_RECALL, dry_run=False):
+    """
+    Converts every index of a topic and returns a list of per-index reports.
+    An index is only replaced when its recall reaches threshold.
+    """
+    reports = []
+    for folder in _index_folders(topic):
+        path = os.path.join(folder, "index.faiss")
+        original = faiss.read_index(path)
+        report = {"index": path}
+        if not is_uncompressed(original):
+            report["skipped"] = "already compressed"
+            reports.append(report)
+            continue
+        compressed = compress_index(original, compression, pca_dim)
+        report.update(recall_report(original, compressed), compression=compression, pca_dim=pca_dim or None)
+        if min_recall(report) < threshold:
+            report["skipped"] = f"recall below {threshold}"
+        elif not dry_run:
+            tmp_path = path + ".tmp"
+            faiss.write_index(compressed, tmp_path)
+            os.replace(tmp_path, path)
+            with open(os.path.join(folder, COMPRESSION_REPORT_FILE), "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            report["replaced"] = True
+        reports.append(report)
+    manifest_path = os.path.join(qa_engine.VECTOR_STORES, topic, sharding.MANIFEST_FILE)
+    if os.path.exists(manifest_path) and any(r.get("replaced") for r in reports):
+        # Bumps the topic's index version so caches and retrieval workers pick up the new shards.
+        os.utime(manifest_path)
+    if any(r.get("replaced") for r in reports):
+        catalog.get_catalog().refresh_topic(topic)
+    return reports
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert saved vector stores to compressed index storage.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate = subparsers.add_parser("migrate", help="Compress the indexes of one or all topics")
+    migrate.add_argument("--compression", choices=COMPRESSIONS, default="sq8")
+    migrate.add_argument("--pca", type=int, default=0, help="Reduce vectors to this many dimensions first")
+    migrate.add_argument("--topic", action="append", help="Topic to convert (repeatable, default: all)")
+    migrate.add_argument("--min-recall", type=float, default=MIN_RECALL)
+    migrate.add_argument("--dry-run", action="store_true", help="Only report recall and size")
+    migrate.add_argument("--output", help="Also write the reports to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for topic in args.topic or qa_engine.list_topics():
+        results[topic] = migrate_topic(topic, args.compression, args.pca, args.min_recall, args.dry_run)
+        for report in results[topic]:
+            recalls = ", ".join(f"{k}={v}" for k, v in report.items() if k.startswith("recall@"))
+            status = report.get("skipped") or ("replaced" if report.get("replaced") else "dry run")
+            size = f"{report['original_bytes']:,} -> {report['compressed_bytes']:,} bytes" if "original_bytes" in report else ""
+            print(f"{report['index']}: {status} {size} {recalls}".rstrip())
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,485 @@
+"""
+Streaming ingestion of a document category into a FAISS vector store.
+
+Pages are read lazily, split one page at a time and grouped into bounded
+batches. A producer thread does the parsing and splitting while the caller's
+thread embeds each batch and appends it to the index with add_embeddings. The
+queue between them holds only a few batches, so parsing pauses whenever
+embedding falls behind and the amount of text in flight stays under
+INGEST_MAX_BATCH_MB per batch instead of growing with the category.
+
+Byte-identical PDFs within a category are parsed only once, and chunks that
+repeat (exactly or nearly) text already indexed are not embedded again; the
+canonical chunk's metadata lists every place the text was found instead.
+Chunk vectors are stored per document hash (blob_store.EmbeddingCache), so a
+document shared by several categories is embedded only once. Pages with
+almost no extractable text, such as scans, are sent to OCR (see ocr.py).
+"""
+
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from langchain_community.vectorstores import FAISS
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+import blob_store
+import catalog
+import chunking
+import dedup
+import index_compression
+import metrics
+import ocr
+import pdf_extraction
+import qa_engine
+import sharding
+
+# Character sizes used by the original "recursive" chunking strategy.
+CHUNK_SIZE = 1500
+CHUNK_OVERLAP = 300
+CHUNKING_STRATEGIES = ("structure", "recursive")
+CHUNK_REPORT_FILE = "chunk_report.json"
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+INGEST_MAX_BATCH_BYTES = int(float(os.getenv("INGEST_MAX_BATCH_MB", "4")) * 1024 * 1024)
+INGEST_QUEUE_BATCHES = int(os.getenv("INGEST_QUEUE_BATCHES", "2"))
+INGEST_DEDUP = os.getenv("INGEST_DEDUP", "1") == "1"
+INGEST_REUSE_EMBEDDINGS = os.getenv("INGEST_REUSE_EMBEDDINGS", "1") == "1"
+
+_DONE = object()
+_category_locks = {}
+_category_locks_guard = threading.Lock()
+
+def list_pdfs(category):
+    """Returns the paths of the PDFs in a category folder."""
+    doc_path = os.path.join(qa_engine.DOCUMENT_LIBRARY, category)
+    return [os.path.join(doc_path, f) for f in sorted(os.listdir(doc_path)) if f.lower().endswith(".pdf")]
+
+def iter_pages(pdf_paths, stats, extraction_backend=None, skip_duplicate_files=False, use_ocr=None, use_cache=True):
+    """
+    Yields one page Document at a time across all PDFs, reusing cached page text
+    unless use_cache is False (benchmark.py measures cold parsing that way).
+    With skip_duplicate_files, a file whose bytes match an earlier one is recorded in
+    stats["duplicate_files"] as {copy: original} and not read again.
+    With use_ocr (default ocr.OCR_ENABLED), pages with almost no text are OCRed.
+    """
+    pages = _extract_pages(pdf_paths, stats, extraction_backend, skip_duplicate_files, use_cache)
+    if ocr.OCR_ENABLED if use_ocr is None else use_ocr:
+        return ocr.fill_low_text_pages(pages, stats)
+    return pages
+
+def _extract_pages(pdf_paths, stats, extraction_backend, skip_duplicate_files, use_cache=True):
+    seen = {}
+    for path in pdf_paths:
+        file_hash = pdf_extraction.file_sha256(path)
+        if skip_duplicate_files and file_hash in seen:
+            stats["duplicate_files"][os.path.basename(path)] = os.path.basename(seen[file_hash])
+            continue
+        seen.setdefault(file_hash, path)
+        for page in pdf_extraction.iter_pages(path, backend=extraction_backend, use_cache=use_cache,
+                                              file_hash=file_hash):
+            stats["pages"] += 1
+            yield page
+        stats["files"] += 1
+
+def make_splitter(strategy=None):
+    """Returns the chunker for a strategy: 'structure' (token-sized, structure-aware) or 'recursive'."""
+    strategy = strategy or chunking.CHUNKING_STRATEGY
+    if strategy == "structure":
+        return chunking.StructureChunker()
+    if strategy == "recursive":
+        return RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    raise ValueError(f"Unknown chunking strategy '{strategy}'. Choose one of: {', '.join(CHUNKING_STRATEGIES)}")
+
+def iter_chunks(pages, text_splitter):
+    """Splits each page as it arrives. Chunks never span pages, matching split_documents()."""
+    for page in pages:
+        yield from text_splitter.split_documents([page])
+
+def iter_batches(chunks, batch_size=INGEST_BATCH_SIZE, max_bytes=INGEST_MAX_BATCH_BYTES):
+    """Groups chunks into lists capped both by count and by total text size."""
+    batch, batch_bytes = [], 0
+    for chunk in chunks:
+        size = len(chunk.page_content.encode("utf-8"))
+        if batch and (len(batch) >= batch_size or batch_bytes + size > max_bytes):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append(chunk)
+        batch_bytes += size
+    if batch:
+        yield batch
+
+def _produce(batches, out_queue, stop):
+    """Runs the parse/split side of the pipeline in a background thread."""
+    def put(item):
+        # Blocks while the queue is full (backpressure) but gives up once the consumer has stopped.
+        while not stop.is_set():
+            try:
+                out_queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    try:
+        for batch in batches:
+            if not put(batch):
+                return
+        put(_DONE)
+    except Exception as e:
+        put(e)
+
+def drop_duplicates(batch, deduplicator, find_document, stats):
+    """
+    Removes chunks that repeat an already kept chunk and records their location on it.
+    find_document(id) returns a chunk that is already indexed.
+    Returns (kept chunks, their docstore ids).
+    """
+    kept, ids, pending = [], [], {}
+    for chunk in batch:
+        canonical_id, found = deduplicator.find(chunk.page_content)
+        if canonical_id is None:
+            doc_id = str(uuid.uuid4())
+            deduplicator.add(doc_id, found)
+            pending[doc_id] = chunk
+            kept.append(chunk)
+            ids.append(doc_id)
+            continue
+        stats["duplicate_chunks"][found] += 1
+        # The canonical chunk is either still in this batch or already in the docstore.
+        canonical = pending.get(canonical_id) or find_document(canonical_id)
+        dedup.add_source(canonical.metadata, dedup.source_ref(chunk.metadata))
+    return kept, ids
+
+def build_vector_store(batches, embeddings, stats, queue_batches=INGEST_QUEUE_BATCHES, progress=None, deduplicator=None,
+                       shard_of=None, embedding_cache=None):
+    """
+    Embeds batches as they are produced and appends them to a single FAISS index.
+    With a deduplicator, repeated chunks are skipped before embedding. With an
+    embedding_cache (blob_store.EmbeddingCache), chunks a document produced in an
+    earlier build, in any category, reuse their stored vectors.
+    With shard_of(chunk) -> shard number, chunks are routed to one index per shard
+    and a {shard: vector store} dict is returned instead.
+    Returns None (or an empty dict) when there were no chunks at all.
+    """
+    pending = queue.Queue(maxsize=max(1, queue_batches))
+    stop = threading.Event()
+    producer = threading.Thread(target=_produce, args=(batches, pending, stop), name="ingest-producer", daemon=True)
+    producer.start()
+
+    stores = {}
+    owners = {}
+
+    def find_document(doc_id):
+        return stores[owners[doc_id]].docstore.search(doc_id)
+
+    try:
+        while True:
+            item = pending.get()
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            ids = None
+            if deduplicator is not None:
+                with metrics.INGEST_SECONDS.time(stage="dedup"):
+                    item, ids = drop_duplicates(item, deduplicator, find_document, stats)
+                if not item:
+                    continue
+            texts = [chunk.page_content for chunk in item]
+            with metrics.INGEST_SECONDS.time(stage="embed_batch"):
+                if embedding_cache is not None:
+                    vectors, reused = embedding_cache.embed(item, embeddings)
+                    stats["reused_embeddings"] += reused
+                else:
+                    vectors = embeddings.embed_documents(texts)
+            groups = {}
+            for i, chunk in enumerate(item):
+                groups.setdefault(shard_of(chunk) if shard_of else None, []).append(i)
+            for shard, rows in groups.items():
+                pairs = [(texts[i], vectors[i]) for i in rows]
+                metadatas = [item[i].metadata for i in rows]
+                shard_ids = [ids[i] for i in rows] if ids else None
+                if shard not in stores:
+                    stores[shard] = FAISS.from_embeddings(pairs, embeddings, metadatas=metadatas, ids=shard_ids)
+                else:
+                    stores[shard].add_embeddings(pairs, metadatas=metadatas, ids=shard_ids)
+                if shard_ids:
+                    owners.update((doc_id, shard) for doc_id in shard_ids)
+            stats["chunks"] += len(texts)
+            stats["chunk_tokens"].extend(
+                chunk.metadata.get("tokens") or chunking.count_tokens(chunk.page_content) for chunk in item
+            )
+            if progress:
+                progress(stats)
+    finally:
+        stop.set()
+        producer.join()
+    return stores if shard_of else stores.get(None)
+
+def _staging_paths(category):
+    final_path = os.path.join(qa_engine.VECTOR_STORES, category)
+    tmp_path = os.path.join(qa_engine.VECTOR_STORES, f".{category}.tmp")
+    old_path = os.path.join(qa_engine.VECTOR_STORES, f".{category}.old")
+    for path in (tmp_path, old_path):
+        if os.path.exists(path):
+            shutil.rmtree(path)
+    return final_path, tmp_path, old_path
+
+def _swap_into_place(final_path, tmp_path, old_path, report):
+    if report is not None:
+        with open(os.path.join(tmp_path, CHUNK_REPORT_FILE), "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if os.path.exists(final_path):
+        os.rename(final_path, old_path)
+    os.rename(tmp_path, final_path)
+    if os.path.exists(old_path):
+        shutil.rmtree(old_path)
+
+def save_vector_store(vector_store, category, report=None):
+    """Saves next to the live store and swaps it in, so readers never see a half-written index."""
+    final_path, tmp_path, old_path = _staging_paths(category)
+    vector_store.save_local(tmp_path)
+    _swap_into_place(final_path, tmp_path, old_path, report)
+
+def _link_or_copy(src, dst):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+def save_sharded_vector_store(stores, category, manifest, reused=(), report=None):
+    """
+    Saves rebuilt shards, carries reused shards over from the live index and swaps
+    the result in like save_vector_store().
+    """
+    final_path, tmp_path, old_path = _staging_paths(category)
+    os.makedirs(os.path.join(tmp_path, sharding.SHARDS_DIR))
+    for shard, store in stores.items():
+        store.save_local(sharding.shard_path(tmp_path, shard))
+    for shard in reused:
+        # Hard links make carrying an unchanged shard over almost free.
+        shutil.copytree(sharding.shard_path(final_path, shard), sharding.shard_path(tmp_path, shard),
+                        copy_function=_link_or_copy)
+    sharding.save_manifest(tmp_path, manifest)
+    _swap_into_place(final_path, tmp_path, old_path, report)
+
+def load_chunk_report(category):
+    """Returns the chunk size report saved with a category's index, or None."""
+    try:
+        with open(os.path.join(qa_engine.VECTOR_STORES, category, CHUNK_REPORT_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def _build_shards(pdf_paths, category, embeddings, stats, progress, extraction_backend, chunking_strategy,
+                  deduplicate, shard_count, shard_strategy, compression, embedding_cache=None, use_ocr=False):
+    """
+    Builds the shards of a category that need rebuilding.
+    Returns ({shard: vector store}, manifest, reused shard numbers).
+    """
+    file_hashes = {}
+    unique_paths = []
+    for path in pdf_paths:
+        file_hash = pdf_extraction.file_sha256(path)
+        original = next((p for p, h in file_hashes.items() if h == file_hash), None)
+        if deduplicate and original:
+            stats["duplicate_files"][os.path.basename(path)] = os.path.basename(original)
+            continue
+        file_hashes[path] = file_hash
+        unique_paths.append(path)
+
+    manifest = {
+        "strategy": shard_strategy,
+        "shard_count": shard_count,
+        "settings": {
+            "extraction": pdf_extraction.get_backend(extraction_backend).name,
+            "chunking": chunking_strategy or chunking.CHUNKING_STRATEGY,
+            "dedup": bool(deduplicate),
+            "compression": compression,
+            "ocr": bool(use_ocr),
+        },
+        "shards": {str(shard): {"files": {}, "chunks": 0} for shard in range(shard_count)},
+    }
+    if shard_strategy == "document":
+        groups = sharding.assign_files(unique_paths, shard_count)
+        for shard, paths in groups.items():
+            manifest["shards"][str(shard)]["files"] = {os.path.basename(p): file_hashes[p] for p in paths}
+    previous = sharding.load_manifest(os.path.join(qa_engine.VECTOR_STORES, category))
+    reused = sharding.reusable_shards(previous, manifest)
+    for shard in reused:
+        manifest["shards"][str(shard)]["chunks"] = previous["shards"][str(shard)]["chunks"]
+
+    def batches_for(paths):
+        pages = iter_pages(paths, stats, extraction_backend, use_ocr=use_ocr)
+        return iter_batches(iter_chunks(pages, make_splitter(chunking_strategy)))
+
+    if shard_strategy == "document":
+        # Duplicates are detected within a shard, since each shard is built on its own.
+        stores = {}
+        for shard, paths in groups.items():
+            if shard in reused or not paths:
+                continue
+            store = build_vector_store(batches_for(paths), embeddings, stats, progress=progress,
+                                       deduplicator=dedup.Deduplicator() if deduplicate else None,
+                                       embedding_cache=embedding_cache)
+            if store is not None:
+                stores[shard] = store
+    else:
+        stores = build_vector_store(
+            batches_for(unique_paths), embeddings, stats, progress=progress,
+            deduplicator=dedup.Deduplicator() if deduplicate else None,
+            shard_of=lambda chunk: sharding.shard_for_chunk(chunk, shard_count),
+            embedding_cache=embedding_cache,
+        )
+    for shard, store in stores.items():
+        manifest["shards"][str(shard)]["chunks"] = store.index.ntotal
+    return stores, manifest, reused
+
+@contextmanager
+def category_lock(category):
+    """
+    Held while a category is built, so a manual build and a background rebuild
+    (uploads.IndexQueue) never clear each other's staging folders or swap in an
+    index built from the other's half-read files; the second one waits. A thread
+    lock covers this process, and an flock on .<category>.lock in the vector
+    store folder covers the other processes and pods sharing the volume.
+    """
+    with _category_locks_guard:
+        lock = _category_locks.setdefault(category, threading.Lock())
+    with lock:
+        try:
+            import fcntl
+        except ImportError:
+            yield
+            return
+        os.makedirs(qa_engine.VECTOR_STORES, exist_ok=True)
+        with open(os.path.join(qa_engine.VECTOR_STORES, f".{category}.lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def process_category(category, embeddings, progress=None, extraction_backend=None, chunking_strategy=None,
+                     deduplicate=None, shard_count=None, shard_strategy=None, compression=None, pca_dim=None,
+                     reuse_embeddings=None, use_ocr=None):
+    """
+    Reads, splits, embeds and indexes every PDF in a category, then saves the index
+    together with a chunk size report. Returns a stats dict with files, pages, chunks,
+    duplicate_files, duplicate_chunks, seconds and the report.
+
+    With shard_count > 1 the category is saved as shards (see sharding.py); under
+    document sharding only shards whose files changed are rebuilt, and the report
+    covers the rebuilt shards. compression and pca_dim select the index storage
+    (see index_compression.py); the report then includes recall against float32.
+    With reuse_embeddings (default INGEST_REUSE_EMBEDDINGS), chunk vectors are kept
+    per document hash and reused by later builds of any category with that document.
+    With use_ocr (default ocr.OCR_ENABLED), pages with almost no extractable text
+    are read with OCR; the report counts low_text_pages and ocr_pages.
+    Only one build of a category runs at a time (see category_lock).
+    """
+    with category_lock(category):
+        return _process_category(category, embeddings, progress, extraction_backend, chunking_strategy,
+                                 deduplicate, shard_count, shard_strategy, compression, pca_dim,
+                                 reuse_embeddings, use_ocr)
+
+def _process_category(category, embeddings, progress, extraction_backend, chunking_strategy, deduplicate,
+                      shard_count, shard_strategy, compression, pca_dim, reuse_embeddings, use_ocr):
+    pdf_paths = list_pdfs(category)
+    if not pdf_paths:
+        raise ValueError("No PDFs found.")
+    if deduplicate is None:
+        deduplicate = INGEST_DEDUP
+    shard_count = shard_count or sharding.SHARD_COUNT
+    shard_strategy = shard_strategy or sharding.SHARD_STRATEGY
+    compression = compression or index_compression.INDEX_COMPRESSION
+    pca_dim = index_compression.INDEX_PCA_DIM if pca_dim is None else pca_dim
+    if shard_strategy not in sharding.SHARD_STRATEGIES:
+        raise ValueError(f"Unknown shard strategy '{shard_strategy}'. Choose one of: {', '.join(sharding.SHARD_STRATEGIES)}")
+
+    if reuse_embeddings is None:
+        reuse_embeddings = INGEST_REUSE_EMBEDDINGS
+    if use_ocr is None:
+        use_ocr = ocr.OCR_ENABLED
+    embedding_cache = None
+    if reuse_embeddings and getattr(embeddings, "model_name", None):
+        embedding_cache = blob_store.EmbeddingCache(embeddings.model_name)
+
+    stats = {"files": 0, "pages": 0, "chunks": 0, "chunk_tokens": [], "seconds": 0.0,
+             "duplicate_files": {}, "duplicate_chunks": {"exact": 0, "near": 0}, "reused_embeddings": 0,
+             "low_text_pages": 0, "ocr_pages": 0, "ocr_errors": 0}
+    started = time.perf_counter()
+    if shard_count > 1:
+        stores, manifest, reused = _build_shards(pdf_paths, category, embeddings, stats, progress, extraction_backend,
+                                                 chunking_strategy, deduplicate, shard_count, shard_strategy,
+                                                 {"type": compression, "pca_dim": pca_dim or None}, embedding_cache,
+                                                 use_ocr)
+        if not stores and not reused:
+            raise ValueError("No text could be extracted from the PDFs.")
+    else:
+        text_splitter = make_splitter(chunking_strategy)
+        pages = iter_pages(pdf_paths, stats, extraction_backend, skip_duplicate_files=deduplicate, use_ocr=use_ocr)
+        batches = iter_batches(iter_chunks(pages, text_splitter))
+        deduplicator = dedup.Deduplicator() if deduplicate else None
+        vector_store = build_vector_store(batches, embeddings, stats, progress=progress, deduplicator=deduplicator,
+                                          embedding_cache=embedding_cache)
+        if vector_store is None:
+            raise ValueError("No text could be extracted from the PDFs.")
+    report = chunking.chunk_report(stats.pop("chunk_tokens"))
+    report["strategy"] = chunking_strategy or chunking.CHUNKING_STRATEGY
+    # Every build argument, resolved, so an automatic rebuild (uploads.IndexQueue) repeats this build
+    report["settings"] = {
+        "extraction_backend": pdf_extraction.get_backend(extraction_backend).name,
+        "chunking_strategy": report["strategy"],
+        "deduplicate": deduplicate,
+        "shard_count": shard_count,
+        "shard_strategy": shard_strategy,
+        "compression": compression,
+        "pca_dim": pca_dim,
+        "reuse_embeddings": reuse_embeddings,
+        "use_ocr": use_ocr,
+    }
+    report["duplicate_files"] = stats["duplicate_files"]
+    report["duplicate_chunks"] = stats["duplicate_chunks"]
+    report["reused_embeddings"] = stats["reused_embeddings"]
+    report["low_text_pages"] = stats["low_text_pages"]
+    report["ocr_pages"] = stats["ocr_pages"]
+    with metrics.INGEST_SECONDS.time(stage="compress"):
+        compression_reports = [
+            index_compression.compress_vector_store(store, compression, pca_dim)
+            for store in (stores.values() if shard_count > 1 else [vector_store])
+        ]
+    compression_reports = [r for r in compression_reports if r]
+    if compression_reports:
+        # Indexes whose recall was too low stay float32, so they count at their original size
+        report["compression"] = compression
+        report["min_recall"] = min(index_compression.min_recall(r) for r in compression_reports)
+        report["compression_fallbacks"] = sum(1 for r in compression_reports if r.get("skipped"))
+        report["index_size_ratio"] = round(
+            sum(r["original_bytes"] if r.get("skipped") else r["compressed_bytes"] for r in compression_reports)
+            / max(1, sum(r["original_bytes"] for r in compression_reports)), 3)
+    if shard_count > 1:
+        report["shards"] = shard_count
+        report["shards_rebuilt"] = len(stores)
+        report["shards_reused"] = len(reused)
+    stats["report"] = report
+    with metrics.INGEST_SECONDS.time(stage="save"):
+        if shard_count > 1:
+            save_sharded_vector_store(stores, category, manifest, reused, report)
+        else:
+            save_vector_store(vector_store, category, report)
+
+    stats["seconds"] = time.perf_counter() - started
+    metrics.INGEST_SECONDS.observe(stats["seconds"], stage="total")
+    metrics.INGEST_ITEMS.inc(stats["pages"], kind="pages")
+    metrics.INGEST_ITEMS.inc(stats["chunks"], kind="chunks")
+    metrics.INGEST_ITEMS.inc(len(stats["duplicate_files"]), kind="duplicate_files")
+    metrics.INGEST_ITEMS.inc(sum(stats["duplicate_chunks"].values()), kind="duplicate_chunks")
+    metrics.INGEST_ITEMS.inc(stats["ocr_pages"], kind="ocr_pages")
+    catalog.get_catalog().refresh_topic(category, stats)
+    return stats
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Load generator simulating concurrent student sessions.
+
+Each simulated session logs in, picks a topic and asks a few questions drawn
+from a question bank, with think time between turns. Sessions run as threads,
+optionally spread over several worker processes so per-process memory growth
+can be compared with the number of sessions each process serves.
+
+Two targets are supported:
+  --target qa   calls the question answering path directly (qa_engine)
+  --target app  drives chatbot.py through Streamlit's AppTest harness, exercising
+                login_page()/user_page() exactly as a browser session would
+
+The LLM is a local mock of the Groq API (mock_llm_server.py), started
+automatically unless --llm-url points at one that is already running.
+
+Usage:
+    python load_test.py --sessions 200 --processes 4 --questions-per-session 3
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import metrics
+
+DEFAULT_QUESTION_BANK = [
+    "What is the eligibility for MCA admission?",
+    "What documents are required at the time of admission?",
+    "What is the fee structure for the MCA course?",
+    "How many seats are available for MCA?",
+    "What is the CAP round process after the CET?",
+    "What co-curricular activities does the college offer?",
+    "What subjects are taught in the first semester?",
+    "Is there a hostel facility?",
+]
+# A user added with: python auth.py add-user <name> --role user
+STUDENT_CREDENTIALS = (os.getenv("LOAD_TEST_USER", "student"), os.getenv("LOAD_TEST_PASSWORD", "student_password"))
+
+def current_rss_mb():
+    """Resident set size of this process in MB (Linux), falling back to peak RSS elsewhere."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    except ImportError:
+        return 0.0
+
+def load_question_bank(path):
+    """Returns {topic or '*': [questions]} from a JSON file, or the default bank for every topic."""
+    if not path:
+        return {"*": DEFAULT_QUESTION_BANK}
+    with open(path, "r", encoding="utf-8") as f:
+        bank = json.load(f)
+    return bank if isinstance(bank, dict) else {"*": bank}
+
+def _pick_questions(rng, bank, topic, count):
+    questions = bank.get(topic) or bank.get("*") or DEFAULT_QUESTION_BANK
+    return rng.sample(questions, k=min(count, len(questions)))
+
+def _think(rng, config):
+    if config["think_time"]:
+        time.sleep(rng.expovariate(1.0 / config["think_time"]))
+
+class _Recorder:
+    """Collects per-event latencies and errors from the session threads of one process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, kind, seconds=None, error=None):
+        with self._lock:
+            if error is None:
+                self.latencies.setdefault(kind, []).append(seconds)
+            else:
+                self.errors.setdefault(kind, []).append(str(error)[:200])
+
+    def timed(self, kind, func, *args):
+        """Runs func, recording its latency or error. Returns (succeeded, result)."""
+        started = time.perf_counter()
+        try:
+            result = func(*args)
+        except Exception as e:
+            self.record(kind, error=e)
+            return False, None
+        self.record(kind, time.perf_counter() - started)
+        return True, result
+
+# --- Session Scripts ---
+def _qa_session(rng, config, recorder, topics, bank):
+    """One student session against qa_engine, mirroring what user_page() does per session."""
+    import qa_engine
+
+    llm, embeddings = _shared_models()
+    topic = rng.choice(topics)
+    loaded, store = recorder.timed("topic_load", qa_engine.load_vector_store, topic, embeddings)
+    if not loaded:
+        return
+    for question in _pick_questions(rng, bank, topic, config["questions"]):
+        _think(rng, config)
+        recorder.timed("question", qa_engine.answer_question, llm, store, question)
+
+def _app_session(rng, config, recorder, topics, bank):
+    """One student session driving chatbot.py through Streamlit's AppTest."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(config["app_path"], default_timeout=config["timeout"])
+
+    def run(step):
+        step()
+        at.run()
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+
+    def login():
+        at.run()
+        inputs = {w.label: w for w in at.text_input}
+        inputs["Username"].input(STUDENT_CREDENTIALS[0])
+        inputs["Password"].input(STUDENT_CREDENTIALS[1])
+        run(at.button[0].click)
+
+    if not recorder.timed("login", login)[0]:
+        return
+    topic = rng.choice(topics)
+    if not recorder.timed("topic_load", run, lambda: at.selectbox[0].select(topic))[0]:
+        return
+    for question in _pick_questions(rng, bank, topic, config["questions"]):
+        _think(rng, config)
+        recorder.timed("question", run, lambda q=question: at.chat_input[0].set_value(q))
+
+_models = None
+_models_lock = threading.Lock()
+
+def _shared_models():
+    """Loads the LLM client and embedding model once per worker process, like st.cache_resource."""
+    global _models
+    with _models_lock:
+        if _models is None:
+            import qa_engine
+            _models = (qa_engine.create_llm(), qa_engine.create_embeddings())
+    return _models
+
+# --- Worker Process ---
+def run_worker(worker_id, session_count, config):
+    """Runs `session_count` concurrent sessions in this process and returns its raw results."""
+    import qa_engine
+
+    rng = random.Random(config["seed"] + worker_id)
+    topics = config["topics"] or qa_engine.list_topics()
+    bank = load_question_bank(config["question_bank"])
+    recorder = _Recorder()
+    script = _app_session if config["target"] == "app" else _qa_session
+
+    rss_start = current_rss_mb()
+    if config["target"] == "qa":
+        _shared_models()
+    rss_warm = current_rss_mb()
+
+    def session(index):
+        session_rng = random.Random(rng.random())
+        time.sleep(config["ramp_up"] * index / max(1, session_count))
+        try:
+            script(session_rng, config, recorder, topics, bank)
+        except Exception as e:
+            recorder.record("session", error=e)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=session_count) as pool:
+        list(pool.map(session, range(session_count)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "worker": worker_id,
+        "pid": os.getpid(),
+        "sessions": session_count,
+        "elapsed_s": elapsed,
+        "latencies": recorder.latencies,
+        "errors": recorder.errors,
+        "rss_start_mb": round(rss_start, 1),
+        "rss_warm_mb": round(rss_warm, 1),
+        "rss_end_mb": round(current_rss_mb(), 1),
+    }
+
+def _worker_entry(args):
+    return run_worker(*args)
+
+# --- Reporting ---
+def summarize(workers, wall_s):
+    """Combines worker results into throughput, latency percentiles, error rates and memory growth."""
+    kinds = sorted({k for w in workers for k in list(w["latencies"]) + list(w["errors"])})
+    report = {"wall_s": round(wall_s, 2), "sessions": sum(w["sessions"] for w in workers), "events": {}}
+    for kind in kinds:
+        samples = sorted(s for w in workers for s in w["latencies"].get(kind, []))
+        errors = [e for w in workers for e in w["errors"].get(kind, [])]
+        total = len(samples) + len(errors)
+        report["events"][kind] = {
+            "ok": len(samples),
+            "errors": len(errors),
+            "error_rate": round(len(errors) / total, 4) if total else 0.0,
+            "throughput_per_s": round(len(samples) / wall_s, 3) if wall_s else None,
+            "p50_ms": round(metrics.percentile(samples, 50) * 1000, 1),
+            "p90_ms": round(metrics.percentile(samples, 90) * 1000, 1),
+            "p99_ms": round(metrics.percentile(samples, 99) * 1000, 1),
+            "max_ms": round(samples[-1] * 1000, 1) if samples else 0.0,
+            "sample_errors": sorted(set(errors))[:5],
+        }
+    report["processes"] = [{
+        "pid": w["pid"],
+        "sessions": w["sessions"],
+        "rss_start_mb": w["rss_start_mb"],
+        "rss_warm_mb": w["rss_warm_mb"],
+        "rss_end_mb": w["rss_end_mb"],
+        "rss_growth_mb": round(w["rss_end_mb"] - w["rss_warm_mb"], 1),
+        "rss_growth_per_session_mb": round((w["rss_end_mb"] - w["rss_warm_mb"]) / max(1, w["sessions"]), 2),
+    } for w in workers]
+    return report
+
+def print_report(report):
+    print(f"\n{report['sessions']} sessions in {report['wall_s']}s")
+    print(f"{'event':<12}{'ok':>7}{'err%':>8}{'per s':>9}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}")
+    for kind, e in report["events"].items():
+        print(f"{kind:<12}{e['ok']:>7}{e['error_rate'] * 100:>7.1f}%{e['throughput_per_s'] or 0:>9}"
+              f"{e['p50_ms']:>10}{e['p90_ms']:>10}{e['p99_ms']:>10}")
+    for p in report["processes"]:
+        print(f"pid {p['pid']}: {p['sessions']} sessions, RSS {p['rss_warm_mb']} -> {p['rss_end_mb']} MB "
+              f"({p['rss_growth_per_session_mb']} MB/session)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent student sessions.")
+    parser.add_argument("--target", choices=["qa", "app"], default="qa")
+    parser.add_argument("--sessions", type=int, default=50, help="total simulated sessions")
+    parser.add_argument("--processes", type=int, default=1, help="worker processes to spread sessions over")
+    parser.add_argument("--questions-per-session", type=int, default=3)
+    parser.add_argument("--think-time", type=float, default=2.0, help="mean seconds between questions")
+    parser.add_argument("--ramp-up", type=float, default=10.0, help="seconds over which sessions start")
+    parser.add_argument("--topics", default="", help="comma-separated topics (default: all processed)")
+    parser.add_argument("--question-bank", default=None, help="JSON list, or {topic: [questions]}")
+    parser.add_argument("--llm-url", default=None, help="running mock/real Groq-compatible base URL")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="mock LLM time to first token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="mock LLM generation speed")
+    parser.add_argument("--app-path", default="chatbot.py")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-step timeout for --target app")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="JSON file for the report")
+    args = parser.parse_args()
+
+    mock = None
+    if not args.llm_url:
+        from mock_llm_server import start_mock_server
+        mock = start_mock_server(first_token_latency=args.llm_latency, tokens_per_second=args.tokens_per_second)
+        args.llm_url = mock.base_url
+    # Worker processes inherit these, so every Groq client talks to the mock server.
+    os.environ["GROQ_BASE_URL"] = args.llm_url
+    os.environ.setdefault("GROQ_API_KEY", "mock")
+    os.environ.setdefault("METRICS_PORT", "0")
+
+    config = {
+        "target": args.target,
+        "questions": args.questions_per_session,
+        "think_time": args.think_time,
+        "ramp_up": args.ramp_up,
+        "topics": [t.strip() for t in args.topics.split(",") if t.strip()],
+        "question_bank": args.question_bank,
+        "app_path": args.app_path,
+        "timeout": args.timeout,
+        "seed": args.seed,
+    }
+    processes = max(1, min(args.processes, args.sessions))
+    shares = [args.sessions // processes + (1 if i < args.sessions % processes else 0) for i in range(processes)]
+
+    started = time.perf_counter()
+    if processes == 1:
+        workers = [run_worker(0, shares[0], config)]
+    else:
+        with multiprocessing.get_context("spawn").Pool(processes) as pool:
+            workers = pool.map(_worker_entry, [(i, n, config) for i, n in enumerate(shares)])
+    report = summarize(workers, time.perf_counter() - started)
+    report["config"] = dict(config, sessions=args.sessions, processes=processes, llm_url=args.llm_url,
+                            timestamp=datetime.now().isoformat(timespec="seconds"))
+    if mock:
+        report["llm_requests"] = mock.requests_served
+        mock.shutdown()
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"📄 Report written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
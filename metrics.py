@@ -0,0 +1,332 @@
+"""
+Lightweight in-process metrics with a Prometheus text-format endpoint.
+
+Counters and histograms are process-wide and thread-safe. Histograms also keep a
+window of recent observations so the admin page can show percentiles without a
+Prometheus server.
+"""
+
+import bisect
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+RECENT_SAMPLES = 1000
+
+_registry = []
+_registry_lock = threading.Lock()
+
+def _label_key(labelnames, labels):
+    if set(labels) != set(labelnames):
+        raise ValueError(f"Expected labels {labelnames}, got {sorted(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labelnames, key, extra=None):
+    pairs = list(zip(labelnames, key)) + (extra or [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        with _registry_lock:
+            _registry.append(self)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key in sorted(self._values):
+                lines.extend(self._render_series(key, self._values[key]))
+        return lines
+
+    def label_sets(self):
+        """Returns the label value tuples that have been recorded so far."""
+        with self._lock:
+            return sorted(self._values)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+class Counter(_Metric):
+    """A monotonically increasing count."""
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def _render_series(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+class Gauge(Counter):
+    """A value that can go up and down."""
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+class _HistogramSeries:
+    def __init__(self, bucket_count):
+        self.bucket_counts = [0] * bucket_count
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+class Histogram(_Metric):
+    """Distribution of observed values, e.g. latencies in seconds."""
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = _HistogramSeries(len(self.buckets))
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series.bucket_counts[index] += 1
+            series.count += 1
+            series.sum += value
+            series.recent.append(value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observes the wall-clock duration of the with-block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def summary(self):
+        """Returns {label values: {count, sum, mean, p50, p95, p99}} using recent samples for percentiles."""
+        result = {}
+        with self._lock:
+            for key, series in self._values.items():
+                recent = sorted(series.recent)
+                result[key] = {
+                    "count": series.count,
+                    "sum": series.sum,
+                    "mean": series.sum / series.count if series.count else 0.0,
+                    "p50": percentile(recent, 50),
+                    "p95": percentile(recent, 95),
+                    "p99": percentile(recent, 99),
+                }
+        return result
+
+    def _render_series(self, key, series):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, series.bucket_counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key, [("le", "+Inf")])
+        lines.append(f"{self.name}_bucket{labels} {series.count}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(series.sum)}")
+        lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {series.count}")
+        return lines
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list (0.0 for an empty list)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def render_prometheus():
+    """Renders every registered metric in the Prometheus text exposition format."""
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# --- Application Metrics ---
+STAGE_SECONDS = Histogram(
+    "chatbot_stage_seconds",
+    "Time spent in each stage of answering a question.",
+    ["stage"],
+)
+CACHE_REQUESTS = Counter(
+    "chatbot_cache_requests_total",
+    "Cache lookups by cache and result (hit or miss).",
+    ["cache", "result"],
+)
+LLM_TOKENS = Counter(
+    "chatbot_llm_tokens_total",
+    "Tokens sent to (in) and received from (out) the LLM.",
+    ["model", "direction"],
+)
+PROMPT_TOKENS = Counter(
+    "chatbot_prompt_tokens_total",
+    "Prompt tokens by template version and part (fixed template text or variable context and question).",
+    ["prompt", "part"],
+)
+LLM_SECONDS = Histogram(
+    "chatbot_llm_seconds",
+    "Time from sending a prompt to the end of the streamed reply, by model.",
+    ["model"],
+)
+LLM_COST_DOLLARS = Counter(
+    "chatbot_llm_cost_dollars_total",
+    "Estimated LLM spend from token counts and list prices, by model.",
+    ["model"],
+)
+ROUTER_DECISIONS = Counter(
+    "chatbot_router_decisions_total",
+    "Model chosen by the router and why.",
+    ["model", "reason"],
+)
+RETRIEVED_CHUNKS = Histogram(
+    "chatbot_retrieved_chunks",
+    "Chunks passed to the LLM per question.",
+    [],
+    buckets=(0, 1, 2, 3, 4, 5, 6, 8, 10),
+)
+LLM_CALLS_SKIPPED = Counter(
+    "chatbot_llm_calls_skipped_total",
+    "Questions answered without calling the LLM, by reason.",
+    ["reason"],
+)
+INGEST_SECONDS = Histogram(
+    "chatbot_ingest_seconds",
+    "Time spent in each stage of processing a category.",
+    ["stage"],
+    buckets=(0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0),
+)
+INGEST_ITEMS = Counter(
+    "chatbot_ingest_items_total",
+    "Pages and chunks processed into vector stores.",
+    ["kind"],
+)
+RETRIEVAL_WORKER_RSS_BYTES = Gauge(
+    "chatbot_retrieval_worker_rss_bytes",
+    "Resident memory of each retrieval worker process, as last reported.",
+    ["worker"],
+)
+RETRIEVAL_WORKER_PSS_BYTES = Gauge(
+    "chatbot_retrieval_worker_pss_bytes",
+    "Proportional memory of each retrieval worker process (shared pages split between sharers), as last reported.",
+    ["worker"],
+)
+UPLOADS = Counter(
+    "chatbot_uploads_total",
+    "Uploaded files by outcome (saved, duplicate or rejected).",
+    ["status"],
+)
+UPLOAD_BYTES = Counter(
+    "chatbot_upload_bytes_total",
+    "Bytes of uploaded files saved to the document library.",
+)
+
+SESSIONS_ACTIVE = Gauge(
+    "chatbot_sessions_active",
+    "Chat sessions held in memory.",
+)
+SESSION_MEMORY_BYTES = Gauge(
+    "chatbot_session_memory_bytes",
+    "Approximate memory held by chat sessions (recent messages and session state).",
+)
+SESSIONS_EVICTED = Counter(
+    "chatbot_sessions_evicted_total",
+    "Idle chat sessions dropped from memory.",
+)
+LOGINS = Counter(
+    "chatbot_logins_total",
+    "Login attempts by result (success or failure).",
+    ["result"],
+)
+ADMISSION_REJECTED = Counter(
+    "chatbot_admission_rejected_total",
+    "Questions turned away by admission control, by reason (rate_limited, queue_full or timeout).",
+    ["reason"],
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "chatbot_admission_queue_depth",
+    "Questions waiting for an answer slot.",
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "chatbot_admission_in_flight",
+    "Questions being retrieved and answered by the LLM.",
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "chatbot_admission_wait_seconds",
+    "Time queued questions waited for an answer slot.",
+    [],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0, 30.0),
+)
+
+def time_stage(stage):
+    """Context manager timing one stage of the answer path."""
+    return STAGE_SECONDS.time(stage=stage)
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+def cache_hit_ratio(cache):
+    """Fraction of lookups in a cache that were hits (0.0 before any lookup)."""
+    hits = CACHE_REQUESTS.value(cache=cache, result="hit")
+    total = hits + CACHE_REQUESTS.value(cache=cache, result="miss")
+    return hits / total if total else 0.0
+
+# --- HTTP Endpoint ---
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_server(port=METRICS_PORT, host="0.0.0.0"):
+    """Serves /metrics from a daemon thread. Returns the server, or None if the port is unavailable."""
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError:
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
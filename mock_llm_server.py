@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Local mock of the Groq chat completions API for load tests.
+
+Implements POST /openai/v1/chat/completions (streaming and non-streaming) with
+the same deterministic replies and timing model as FakeChatGroq. Point the app
+at it with:
+
+    GROQ_BASE_URL=http://127.0.0.1:8765 GROQ_API_KEY=mock streamlit run chatbot.py
+
+Usage:
+    python mock_llm_server.py --port 8765 --latency 0.3 --tokens-per-second 200
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fake_llm import fake_reply_tokens
+
+COMPLETIONS_PATH = "/openai/v1/chat/completions"
+
+class MockLLMServer(ThreadingHTTPServer):
+    """HTTP server holding the timing settings shared by all request handlers."""
+
+    daemon_threads = True
+
+    def __init__(self, address, first_token_latency=0.2, tokens_per_second=250.0, answer_tokens=120):
+        super().__init__(address, _CompletionsHandler)
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = tokens_per_second
+        self.answer_tokens = answer_tokens
+        self.requests_served = 0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count_request(self):
+        with self._lock:
+            self.requests_served += 1
+
+class _CompletionsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        if self.path.split("?")[0] != COMPLETIONS_PATH:
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        self.server.count_request()
+
+        prompt_text = "\n".join(str(m.get("content", "")) for m in request.get("messages", []))
+        tokens = fake_reply_tokens(prompt_text, self.server.answer_tokens, request.get("seed") or 0)
+        usage = {
+            "prompt_tokens": len(prompt_text) // 4,
+            "completion_tokens": len(tokens),
+            "total_tokens": len(prompt_text) // 4 + len(tokens),
+        }
+        model = request.get("model", "mock")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        delay = 1.0 / self.server.tokens_per_second if self.server.tokens_per_second > 0 else 0.0
+
+        if request.get("stream"):
+            self._stream(completion_id, model, tokens, usage, delay)
+        else:
+            time.sleep(self.server.first_token_latency + delay * max(0, len(tokens) - 1))
+            self._send_json({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens).strip()},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+
+    def _stream(self, completion_id, model, tokens, usage, delay):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        def event(delta, finish_reason=None, extra=None):
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            payload.update(extra or {})
+            self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        time.sleep(self.server.first_token_latency)
+        event({"role": "assistant", "content": ""})
+        for i, token in enumerate(tokens):
+            if i:
+                time.sleep(delay)
+            event({"content": token})
+        event({}, finish_reason="stop", extra={"x_groq": {"usage": usage}})
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+    def _send_json(self, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_mock_server(port=0, host="127.0.0.1", **timing):
+    """Starts the mock server in a daemon thread and returns it (port 0 picks a free port)."""
+    server = MockLLMServer((host, port), **timing)
+    threading.Thread(target=server.serve_forever, name="mock-llm", daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local mock of the Groq chat completions API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="time to first token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=250.0)
+    parser.add_argument("--answer-tokens", type=int, default=120)
+    args = parser.parse_args()
+
+    server = MockLLMServer((args.host, args.port), first_token_latency=args.latency,
+                           tokens_per_second=args.tokens_per_second, answer_tokens=args.answer_tokens)
+    print(f"Mock Groq API listening on {server.base_url} (set GROQ_BASE_URL to this address)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
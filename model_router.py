@@ -0,0 +1,130 @@
+"""
+Per-question choice between a small, fast model and the large model.
+
+Most student questions are direct lookups ("What is the MCA tuition fee?")
+that the 8B model answers as well as the 70B one in a fraction of the time.
+The router sends a question to the small model when the retrieved context is
+short, the best chunk matches the question well and the question itself looks
+simple. Everything else goes to the large model. If the small model replies
+with qa_engine.NOT_FOUND_ANSWER despite relevant context, or with nothing at
+all, the question is answered again by the large model. Questions without any
+context never reach a model. Decisions and fallbacks are counted in
+metrics.ROUTER_DECISIONS, and latency and cost are recorded per model by
+qa_engine.generate_answer and qa_engine.stream_answer.
+"""
+
+import os
+import re
+
+import metrics
+import qa_engine
+from chunking import count_tokens
+
+ROUTER_ENABLED = os.getenv("MODEL_ROUTER", "1") == "1"
+# Both names are listed in llm_config.AVAILABLE_MODELS.
+ROUTER_SMALL_MODEL = os.getenv("ROUTER_SMALL_MODEL", "llama-3.1-8b-instant")
+ROUTER_LARGE_MODEL = os.getenv("ROUTER_LARGE_MODEL", qa_engine.QA_MODEL_NAME)
+ROUTER_MAX_CONTEXT_TOKENS = int(os.getenv("ROUTER_MAX_CONTEXT_TOKENS", "900"))
+ROUTER_MIN_SIMILARITY = float(os.getenv("ROUTER_MIN_SIMILARITY", "0.55"))
+ROUTER_MAX_QUESTION_WORDS = int(os.getenv("ROUTER_MAX_QUESTION_WORDS", "25"))
+
+# Words that signal reasoning over several facts rather than a lookup.
+_COMPLEX_QUESTION = re.compile(
+    r"\b(compare|comparison|difference|differ|versus|vs|why|explain|calculate|total|sum|"
+    r"summari[sz]e|analy[sz]e|pros|cons|advantages?|disadvantages?|better|best|recommend|should i)\b",
+    re.IGNORECASE,
+)
+
+def is_complex_question(question):
+    words = question.split()
+    return (len(words) > ROUTER_MAX_QUESTION_WORDS
+            or question.count("?") > 1
+            or bool(_COMPLEX_QUESTION.search(question)))
+
+def route(question, docs):
+    """Returns ('small' or 'large', reason) for a question and its retrieved chunks."""
+    if not docs:
+        return "large", "no_context"
+    context_tokens = sum(doc.metadata.get("tokens") or count_tokens(doc.page_content) for doc in docs)
+    if context_tokens > ROUTER_MAX_CONTEXT_TOKENS:
+        return "large", "long_context"
+    best_score = max((doc.metadata.get("score", 0.0) for doc in docs), default=0.0)
+    if best_score < ROUTER_MIN_SIMILARITY:
+        return "large", "low_confidence_retrieval"
+    if is_complex_question(question):
+        return "large", "complex_question"
+    return "small", "simple_lookup"
+
+def looks_unsure(answer):
+    """
+    True when the small model gave the prompt's "cannot find" reply or nothing at all.
+    Answers that merely say a detail is not mentioned are real answers and are kept.
+    """
+    answer = answer.strip().rstrip(".")
+    return not answer or answer == qa_engine.NOT_FOUND_ANSWER.rstrip(".")
+
+def _may_become_unsure(text):
+    """True while the text streamed so far could still turn out to be the "cannot find" reply."""
+    return qa_engine.NOT_FOUND_ANSWER.startswith(text.strip())
+
+class ModelRouter:
+    """Answers with the small or the large model, falling back to the large one on unsure answers."""
+
+    def __init__(self, small_llm, large_llm):
+        self.small_llm = small_llm
+        self.large_llm = large_llm
+
+    @property
+    def name(self):
+        """Identifies the routing setup, e.g. in answer cache keys."""
+        return f"router:{self.small_llm.model_name}|{self.large_llm.model_name}"
+
+    def stream(self, question, docs):
+        """
+        Yields the answer as it arrives, from either model. The small model's first
+        pieces are held back only while they could still be the "cannot find" reply;
+        if it is, the large model's answer is streamed instead.
+        """
+        if not docs:
+            yield from qa_engine.stream_answer(self.large_llm, question, docs)
+            return
+        size, reason = route(question, docs)
+        if size == "large":
+            metrics.ROUTER_DECISIONS.inc(model=self.large_llm.model_name, reason=reason)
+            yield from qa_engine.stream_answer(self.large_llm, question, docs)
+            return
+        metrics.ROUTER_DECISIONS.inc(model=self.small_llm.model_name, reason=reason)
+        held = ""
+        pieces = qa_engine.stream_answer(self.small_llm, question, docs)
+        for piece in pieces:
+            held += piece
+            if not _may_become_unsure(held):
+                yield held
+                yield from pieces
+                return
+        if looks_unsure(held):
+            metrics.ROUTER_DECISIONS.inc(model=self.large_llm.model_name, reason="fallback")
+            yield from qa_engine.stream_answer(self.large_llm, question, docs)
+            return
+        yield held
+
+    def answer(self, question, docs):
+        """Returns (answer, name of the model that produced it, or None when no model was asked)."""
+        if not docs:
+            return qa_engine.generate_answer(self.large_llm, question, docs), None
+        size, reason = route(question, docs)
+        llm = self.small_llm if size == "small" else self.large_llm
+        metrics.ROUTER_DECISIONS.inc(model=llm.model_name, reason=reason)
+        answer = qa_engine.generate_answer(llm, question, docs)
+        if size == "small" and looks_unsure(answer):
+            metrics.ROUTER_DECISIONS.inc(model=self.large_llm.model_name, reason="fallback")
+            llm = self.large_llm
+            answer = qa_engine.generate_answer(llm, question, docs)
+        return answer, llm.model_name
+
+def create_router(large_llm=None):
+    """Returns a ModelRouter, or None when MODEL_ROUTER=0 and every question uses the large model."""
+    if not ROUTER_ENABLED:
+        return None
+    large_llm = large_llm or qa_engine.create_llm(ROUTER_LARGE_MODEL)
+    return ModelRouter(qa_engine.create_llm(ROUTER_SMALL_MODEL), large_llm)
@@ -0,0 +1,133 @@
+"""
+OCR fallback for scanned pages.
+
+Text extraction returns little or nothing for pages that are images, such as
+scanned brochures. fill_low_text_pages() passes pages through unchanged
+unless their text is shorter than OCR_MIN_CHARS; only those pages are
+rendered with PyMuPDF and read by Tesseract in a process pool of OCR_WORKERS
+processes, so text PDFs never pay for OCR. At most two pages per worker are
+in flight and pages come out in their original order, so the ingestion
+pipeline's backpressure still holds.
+
+OCR results are cached per page under the extraction cache, keyed by the
+file's SHA-256, the OCR language and the resolution, so re-processing a
+category (or another category with the same document) does not OCR again.
+
+OCR needs the pymupdf, pytesseract and Pillow packages and the tesseract
+binary. Without them low-text pages are only counted and reported.
+"""
+
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import get_context
+
+import metrics
+import pdf_extraction
+
+OCR_ENABLED = os.getenv("OCR_ENABLED", "1") == "1"
+OCR_MIN_CHARS = int(os.getenv("OCR_MIN_CHARS", "50"))
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "2"))
+OCR_DPI = int(os.getenv("OCR_DPI", "200"))
+OCR_LANGUAGE = os.getenv("OCR_LANGUAGE", "eng")
+
+_available = None
+_executor = None
+_worker_document = None
+
+def available():
+    """True when the OCR packages and the tesseract binary are installed."""
+    global _available
+    if _available is None:
+        try:
+            import fitz  # noqa: F401
+            import pytesseract
+            from PIL import Image  # noqa: F401
+            pytesseract.get_tesseract_version()
+            _available = True
+        except Exception:
+            _available = False
+    return _available
+
+def needs_ocr(text, min_chars=OCR_MIN_CHARS):
+    return len("".join(text.split())) < min_chars
+
+def _pool(workers):
+    global _executor
+    if _executor is None:
+        # Spawned rather than forked: ingestion runs inside the threaded Streamlit server.
+        _executor = ProcessPoolExecutor(max_workers=max(1, workers), mp_context=get_context("spawn"))
+    return _executor
+
+# --- Worker Side ---
+def ocr_page(path, page_number, dpi=OCR_DPI, language=OCR_LANGUAGE):
+    """Renders one page and returns (recognized text, seconds). Keeps the last PDF open between pages."""
+    global _worker_document
+    import fitz
+    import pytesseract
+    from PIL import Image
+
+    started = time.perf_counter()
+    if _worker_document is None or _worker_document[0] != path:
+        if _worker_document is not None:
+            _worker_document[1].close()
+        _worker_document = (path, fitz.open(path))
+    pixmap = _worker_document[1][page_number].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+    image = Image.frombytes("L", (pixmap.width, pixmap.height), pixmap.samples)
+    text = pytesseract.image_to_string(image, lang=language)
+    return text, time.perf_counter() - started
+
+# --- Pipeline ---
+def _ocr_cache(file_hash):
+    return pdf_extraction.PageCache(file_hash, f"ocr-{OCR_LANGUAGE}-{OCR_DPI}")
+
+def _ready(pending):
+    return not isinstance(pending, Future) or pending.done()
+
+def _finish(page, pending, cache, stats):
+    if pending is None:
+        return page
+    if isinstance(pending, Future):
+        try:
+            text, seconds = pending.result()
+        except Exception:
+            stats["ocr_errors"] += 1
+            return page
+        metrics.INGEST_SECONDS.observe(seconds, stage="ocr_page")
+        cache.add(page.metadata["page"], text)
+    else:
+        text = pending
+    if len(text.strip()) <= len(page.page_content.strip()):
+        return page
+    stats["ocr_pages"] += 1
+    return type(page)(page_content=text, metadata=dict(page.metadata, ocr=True))
+
+def fill_low_text_pages(pages, stats, min_chars=OCR_MIN_CHARS, workers=OCR_WORKERS):
+    """
+    Yields the pages in order, with the text of low-text pages replaced by OCR text
+    (and metadata["ocr"] set) when OCR finds more. Counts low_text_pages, ocr_pages
+    and ocr_errors in stats.
+    """
+    for key in ("low_text_pages", "ocr_pages", "ocr_errors"):
+        stats.setdefault(key, 0)
+    window = deque()
+    limit = max(1, workers) * 2
+    cache = None
+    for page in pages:
+        pending = None
+        if needs_ocr(page.page_content, min_chars):
+            stats["low_text_pages"] += 1
+            file_hash = page.metadata["file_hash"]
+            if cache is None or cache.file_hash != file_hash:
+                cache = _ocr_cache(file_hash)
+            page_number = page.metadata["page"]
+            if page_number in cache.pages:
+                pending = cache.pages[page_number]
+            elif available():
+                pending = _pool(workers).submit(ocr_page, page.metadata["source"], page_number)
+        window.append((page, pending, cache))
+        while window and (len(window) > limit or _ready(window[0][1])):
+            yield _finish(*window.popleft(), stats)
+    while window:
+        yield _finish(*window.popleft(), stats)
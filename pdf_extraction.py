@@ -0,0 +1,183 @@
+"""
+Pluggable PDF text extraction with a per-page cache.
+
+Backends:
+  pypdf           pure-Python extraction (same text as PyPDFLoader)
+  pymupdf         native MuPDF extraction, much faster and sorted into reading order
+                  so multi-column brochures are not interleaved
+  pymupdf-tables  like pymupdf, but detected tables are emitted as "| a | b |" rows
+                  so fee tables stay one row per line
+
+Extracted pages are cached under EXTRACTION_CACHE_DIR keyed by the file's SHA-256
+and the backend name, so re-processing a category only parses pages it has not
+seen before, even if the file was renamed or copied to another category.
+"""
+
+import hashlib
+import json
+import os
+
+from langchain_core.documents import Document
+
+EXTRACTION_BACKEND = os.getenv("PDF_EXTRACTION_BACKEND", "pypdf")
+EXTRACTION_CACHE_DIR = os.getenv("EXTRACTION_CACHE_DIR", "extraction_cache")
+HASH_CHUNK_BYTES = 1024 * 1024
+
+def file_sha256(path):
+    """Hashes a file in fixed-size chunks so large PDFs are never fully read into memory."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+# --- Backends ---
+class PypdfBackend:
+    name = "pypdf"
+
+    def open(self, path):
+        from pypdf import PdfReader
+        return PdfReader(path)
+
+    def page_count(self, doc):
+        return len(doc.pages)
+
+    def extract(self, doc, page_number):
+        return doc.pages[page_number].extract_text() or ""
+
+    def close(self, doc):
+        pass
+
+class PyMuPDFBackend:
+    name = "pymupdf"
+
+    def open(self, path):
+        try:
+            import fitz
+        except ImportError as e:
+            raise ImportError("The 'pymupdf' extraction backend needs the pymupdf package.") from e
+        return fitz.open(path)
+
+    def page_count(self, doc):
+        return doc.page_count
+
+    def extract(self, doc, page_number):
+        return doc[page_number].get_text("text", sort=True)
+
+    def close(self, doc):
+        doc.close()
+
+class PyMuPDFTableBackend(PyMuPDFBackend):
+    name = "pymupdf-tables"
+
+    def extract(self, doc, page_number):
+        page = doc[page_number]
+        tables = page.find_tables().tables
+        if not tables:
+            return super().extract(doc, page_number)
+
+        def inside_table(bbox):
+            x0, y0, x1, y1 = bbox
+            cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+            return any(t.bbox[0] <= cx <= t.bbox[2] and t.bbox[1] <= cy <= t.bbox[3] for t in tables)
+
+        # Place text blocks and tables by their top edge so the reading order is kept.
+        items = [(b[1], b[4].strip()) for b in page.get_text("blocks", sort=True)
+                 if b[6] == 0 and b[4].strip() and not inside_table(b[:4])]
+        for table in tables:
+            items.append((table.bbox[1], format_table_rows(table.extract())))
+        items.sort(key=lambda item: item[0])
+        return "\n\n".join(text for _, text in items if text)
+
+def format_table_rows(rows):
+    """Formats extracted table cells as one '| a | b |' line per row."""
+    lines = []
+    for row in rows:
+        cells = [" ".join(str(cell or "").split()) for cell in row]
+        if any(cells):
+            lines.append("| " + " | ".join(cells) + " |")
+    return "\n".join(lines)
+
+BACKENDS = {backend.name: backend for backend in (PypdfBackend(), PyMuPDFBackend(), PyMuPDFTableBackend())}
+
+def get_backend(name=None):
+    """Returns the backend registered under name (default: PDF_EXTRACTION_BACKEND)."""
+    name = name or EXTRACTION_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown PDF extraction backend '{name}'. Choose one of: {', '.join(BACKENDS)}")
+    return BACKENDS[name]
+
+# --- Page Cache ---
+class PageCache:
+    """Append-only JSONL cache of extracted page text for one (file hash, backend) pair."""
+
+    def __init__(self, file_hash, backend_name, cache_dir=EXTRACTION_CACHE_DIR):
+        self.file_hash = file_hash
+        self.path = os.path.join(cache_dir, file_hash[:2], f"{file_hash}.{backend_name}.jsonl")
+        self.page_count = None
+        self.pages = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A line cut short by an interrupted run; that page is simply parsed again.
+                    continue
+                if "page_count" in record:
+                    self.page_count = record["page_count"]
+                else:
+                    self.pages[record["page"]] = record["text"]
+
+    @property
+    def complete(self):
+        return self.page_count is not None and len(self.pages) >= self.page_count
+
+    def _append(self, record):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def set_page_count(self, page_count):
+        if self.page_count != page_count:
+            self.page_count = page_count
+            self._append({"page_count": page_count})
+
+    def add(self, page_number, text):
+        self.pages[page_number] = text
+        self._append({"page": page_number, "text": text})
+
+def iter_pages(path, backend=None, use_cache=True, file_hash=None):
+    """
+    Yields one Document per page with 'source' and 'page' metadata like PyPDFLoader.
+    Cached pages are served without opening the PDF; only missing pages are parsed.
+    """
+    backend = get_backend(backend)
+    file_hash = file_hash or file_sha256(path)
+    cache = PageCache(file_hash, backend.name) if use_cache else None
+    metadata = {"source": path, "file_hash": file_hash, "extraction": backend.name}
+
+    if cache is not None and cache.complete:
+        for page_number in range(cache.page_count):
+            yield Document(page_content=cache.pages[page_number], metadata=dict(metadata, page=page_number))
+        return
+
+    doc = backend.open(path)
+    try:
+        page_count = backend.page_count(doc)
+        if cache is not None:
+            cache.set_page_count(page_count)
+        for page_number in range(page_count):
+            if cache is not None and page_number in cache.pages:
+                text = cache.pages[page_number]
+            else:
+                text = backend.extract(doc, page_number)
+                if cache is not None:
+                    cache.add(page_number, text)
+            yield Document(page_content=text, metadata=dict(metadata, page=page_number))
+    finally:
+        backend.close(doc)
@@ -0,0 +1,85 @@
+"""
+Background loading of topic indexes for the answer path.
+
+The chatbot used to load a topic's index under a spinner when the topic was
+selected, then embed the question after it was submitted. The prefetcher
+starts loading the index in a background thread as soon as the topic is
+selected, without blocking the page. When the question arrives, it is
+embedded while any remaining part of the load finishes, and the search runs
+as soon as both are ready. Loaded indexes are shared by all sessions in the
+process (FAISS searches are read-only) and the least recently used topics
+are dropped beyond PREFETCH_MAX_TOPICS.
+
+Stages recorded in metrics.STAGE_SECONDS:
+  embed             embedding the question
+  index_wait        time the question waited for the index after embedding
+  prefetch_overlap  index loading time hidden behind the user (choosing a
+                    topic, typing) or behind the embedding
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+import qa_engine
+
+PREFETCH_THREADS = int(os.getenv("PREFETCH_THREADS", "2"))
+PREFETCH_MAX_TOPICS = int(os.getenv("PREFETCH_MAX_TOPICS", "4"))
+
+class TopicPrefetcher:
+    """Loads topic indexes in the background and retrieves from them once ready."""
+
+    def __init__(self, embeddings, max_topics=PREFETCH_MAX_TOPICS, threads=PREFETCH_THREADS, version_of=None):
+        self.embeddings = embeddings
+        # The chatbot passes the catalog's lookup, so selecting a topic does not stat the index.
+        self.version_of = version_of or qa_engine.index_version
+        self.max_topics = max_topics
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="index-prefetch")
+        self._loads = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load(self, topic):
+        started = time.perf_counter()
+        vector_store = qa_engine.load_vector_store(topic, self.embeddings)
+        return {"vector_store": vector_store, "seconds": time.perf_counter() - started, "reported": False}
+
+    def prefetch(self, topic):
+        """
+        Starts loading a topic's index unless it is already loaded or loading.
+        Returns (index version, future). A rebuilt index or a failed load is loaded again.
+        """
+        version = self.version_of(topic)
+        with self._lock:
+            entry = self._loads.get(topic)
+            stale = entry is None or entry[0] != version or (entry[1].done() and entry[1].exception() is not None)
+            if stale:
+                entry = (version, self._executor.submit(self._load, topic))
+                self._loads[topic] = entry
+            self._loads.move_to_end(topic)
+            while len(self._loads) > self.max_topics:
+                self._loads.popitem(last=False)
+        return entry
+
+    def retrieve(self, topic, question, k=None):
+        """
+        Returns (chunks, index version) for a question, embedding it while the
+        topic's index finishes loading.
+        """
+        version, load = self.prefetch(topic)
+        with metrics.time_stage("embed"):
+            query_vector = self.embeddings.embed_query(question)
+        embedded = time.perf_counter()
+        loaded = load.result()
+        waited = time.perf_counter() - embedded
+        metrics.STAGE_SECONDS.observe(waited, stage="index_wait")
+        with self._lock:
+            # The overlap is reported by the first question that used this load.
+            first_use, loaded["reported"] = not loaded["reported"], True
+        if first_use:
+            metrics.STAGE_SECONDS.observe(max(0.0, loaded["seconds"] - waited), stage="prefetch_overlap")
+        with metrics.time_stage("search"):
+            docs = qa_engine.search_vector(loaded["vector_store"], query_vector, k)
+        return docs, version
@@ -12,3 +12,12 @@ except Exception as e:
     print(f"❌ Error pre-loading model: {e}")
     # Fail the build if the model can't be downloaded
     exit(1)
+
+print("Pre-loading tiktoken cl100k_base encoding used for chunk sizing...")
+try:
+    import tiktoken
+    tiktoken.get_encoding("cl100k_base")
+    print("✅ Encoding downloaded and cached successfully.")
+except Exception as e:
+    # Chunking falls back to a character-based estimate, so this is not fatal.
+    print(f"⚠️ Could not pre-load tiktoken encoding: {e}")
@@ -0,0 +1,143 @@
+"""
+Versioned prompt templates.
+
+Every template is registered under a name and a version, so a change to the
+wording is a new version that can be compared with the old one (and rolled
+back with an environment variable) instead of an edit in place. The registry
+also reports how many tokens each template adds to every request.
+
+The current question answering prompt (qa v2) is a chat prompt. A system
+message holds all the instructions and contains no variables, so its bytes
+are identical on every request and providers can serve it from their prompt
+prefix cache. Only the human message with the context and the question
+changes.
+"""
+
+import hashlib
+import os
+
+from langchain_core.messages import SystemMessage
+from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
+
+from chunking import count_tokens
+
+# Active version per prompt name, e.g. QA_PROMPT_VERSION=1 restores the original flat prompt.
+ACTIVE_VERSIONS = {
+    "qa": os.getenv("QA_PROMPT_VERSION", "2"),
+    "faq_generation": os.getenv("FAQ_GENERATION_PROMPT_VERSION", "1"),
+}
+
+class PromptVersion:
+    """One registered template together with its name, version and description."""
+
+    def __init__(self, name, version, template, description=""):
+        self.name = name
+        self.version = str(version)
+        self.template = template
+        self.description = description
+        self._fixed_tokens = None
+
+    @property
+    def label(self):
+        return f"{self.name}/v{self.version}"
+
+    def _empty_values(self):
+        return {variable: "" for variable in self.template.input_variables}
+
+    def prefix(self):
+        """The leading text that is the same on every request."""
+        if isinstance(self.template, ChatPromptTemplate):
+            prefix = []
+            for message in self.template.format_messages(**self._empty_values()):
+                if not isinstance(message, SystemMessage):
+                    break
+                prefix.append(message.content)
+            return "\n".join(prefix)
+        return self.template.template.split("{", 1)[0]
+
+    def prefix_hash(self):
+        return hashlib.sha256(self.prefix().encode("utf-8")).hexdigest()[:16]
+
+    def fixed_tokens(self):
+        """Tokens the template itself adds to every request, with all variables empty."""
+        if self._fixed_tokens is None:
+            if isinstance(self.template, ChatPromptTemplate):
+                text = "\n".join(m.content for m in self.template.format_messages(**self._empty_values()))
+            else:
+                text = self.template.format(**self._empty_values())
+            self._fixed_tokens = count_tokens(text)
+        return self._fixed_tokens
+
+_REGISTRY = {}
+
+def register(name, version, template, description=""):
+    prompt = PromptVersion(name, version, template, description)
+    _REGISTRY[(name, prompt.version)] = prompt
+    return prompt
+
+def get_prompt(name, version=None):
+    """Returns the PromptVersion registered under name (default: its active version)."""
+    version = str(version or ACTIVE_VERSIONS.get(name, "1"))
+    if (name, version) not in _REGISTRY:
+        known = sorted(v for n, v in _REGISTRY if n == name)
+        raise ValueError(f"Unknown prompt '{name}' version '{version}'. Registered versions: {', '.join(known) or 'none'}")
+    return _REGISTRY[(name, version)]
+
+def prompt_report():
+    """Lists every registered template with its fixed token cost and prefix fingerprint."""
+    return [
+        {
+            "prompt": prompt.label,
+            "active": ACTIVE_VERSIONS.get(prompt.name) == prompt.version,
+            "fixed_tokens": prompt.fixed_tokens(),
+            "stable_prefix_tokens": count_tokens(prompt.prefix()),
+            "prefix_hash": prompt.prefix_hash(),
+            "description": prompt.description,
+        }
+        for _, prompt in sorted(_REGISTRY.items())
+    ]
+
+# --- Question Answering ---
+register("qa", 1, PromptTemplate(
+    input_variables=["context", "input"],
+    template="""
+    You are an expert document analysis assistant. Your primary responsibility is to provide accurate, comprehensive, and helpful responses based solely on the provided document context.
+
+    IMPORTANT INSTRUCTIONS:
+    1. ANSWER ONLY from the provided context - never invent, assume, or use external knowledge
+    2. If the context contains the answer, provide it completely and accurately
+    3. If the context partially answers the question, clearly state what information is available and what is missing
+    4. If the context doesn't contain relevant information, respond with: "I cannot find this information in the provided document."
+    5. Always cite specific parts of the context when possible
+    6. Maintain professional tone and clarity
+
+    CONTEXT INFORMATION:
+    {context}
+
+    USER QUESTION:
+    {input}
+
+    RESPONSE:
+    """
+), "Original single-block prompt with instructions before the context.")
+
+QA_SYSTEM_MESSAGE = """You are a document analysis assistant for students. Answer only from the context in the user's message; never invent, assume or use outside knowledge.
+- If the context answers the question, answer completely and accurately.
+- If it answers only part, say what is available and what is missing.
+- If it has nothing relevant, reply exactly: "I cannot find this information in the provided document."
+- Cite the relevant part of the context where possible. Be clear and professional."""
+
+register("qa", 2, ChatPromptTemplate.from_messages([
+    ("system", QA_SYSTEM_MESSAGE),
+    ("human", "Context:\n{context}\n\nQuestion: {input}"),
+]), "Constant system message for prefix caching; context and question in the user message.")
+
+# --- FAQ Generation ---
+register("faq_generation", 1, PromptTemplate.from_template("""
+You are helping prepare an FAQ for students. Read the document passages below and write
+{count} distinct questions that students are likely to ask and that these passages answer.
+Write one question per line with no numbering and no other text.
+
+DOCUMENT PASSAGES:
+{context}
+"""), "Asks for likely student questions about a sample of a category's chunks.")
@@ -0,0 +1,285 @@
+"""
+Question answering core shared by the Streamlit chatbot and the offline tools.
+Nothing in here depends on Streamlit, so it can be imported from CLI scripts.
+"""
+
+import os
+import pickle
+import time
+
+import numpy as np
+from langchain_groq import ChatGroq
+from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_community.vectorstores import FAISS
+
+import metrics
+import prompts
+import sharding
+from chunking import count_tokens
+
+# --- Configuration ---
+DOCUMENT_LIBRARY = "document_library"
+VECTOR_STORES = "vector_stores"
+QA_MODEL_NAME = "llama-3.3-70b-versatile"
+# Groq list prices in dollars per million (input, output) tokens, used for cost metrics.
+MODEL_PRICES = {
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+    "llama-3.1-8b-instant": (0.05, 0.08),
+}
+QA_TEMPERATURE = 0.3
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+RETRIEVAL_K = 3
+# Dynamic k: keep the best chunks until similarity drops below a floor, falls off
+# by more than a gap, or the context token budget is used up.
+RETRIEVAL_DYNAMIC_K = os.getenv("RETRIEVAL_DYNAMIC_K", "1") == "1"
+RETRIEVAL_MIN_K = int(os.getenv("RETRIEVAL_MIN_K", "1"))
+RETRIEVAL_MAX_K = int(os.getenv("RETRIEVAL_MAX_K", "6"))
+RETRIEVAL_MIN_SIMILARITY = float(os.getenv("RETRIEVAL_MIN_SIMILARITY", "0.35"))
+RETRIEVAL_SCORE_GAP = float(os.getenv("RETRIEVAL_SCORE_GAP", "0.08"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+NOT_FOUND_ANSWER = "I cannot find this information in the provided document."
+SOURCE_SNIPPET_CHARS = 350
+
+# --- Prompt Template ---
+# The active question answering prompt from the registry (see prompts.py).
+QA_PROMPT = prompts.get_prompt("qa")
+qa_prompt = QA_PROMPT.template
+
+# --- Model and Index Loading ---
+def create_llm(model_name=QA_MODEL_NAME, temperature=QA_TEMPERATURE):
+    """Creates the Groq chat model. Reads GROQ_API_KEY from the environment."""
+    return ChatGroq(model_name=model_name, temperature=temperature)
+
+def create_embeddings():
+    """Creates the sentence-transformers embedding model used for every index."""
+    return HuggingFaceEmbeddings(
+        model_name=EMBEDDING_MODEL_NAME,
+        model_kwargs={'device': 'cpu'},
+        encode_kwargs={'normalize_embeddings': True}
+    )
+
+def list_topics():
+    """Returns the names of all processed topics (categories with a vector store)."""
+    try:
+        # Dot-folders are indexes still being written by the ingestion pipeline.
+        return [d for d in os.listdir(VECTOR_STORES)
+                if not d.startswith(".") and os.path.isdir(os.path.join(VECTOR_STORES, d))]
+    except FileNotFoundError:
+        return []
+
+def index_version(topic):
+    """Returns the modification time of a topic's index, which changes whenever it is rebuilt."""
+    folder = os.path.join(VECTOR_STORES, topic)
+    for name in (sharding.MANIFEST_FILE, "index.faiss"):
+        try:
+            return os.stat(os.path.join(folder, name)).st_mtime_ns
+        except FileNotFoundError:
+            continue
+    return None
+
+def read_index_mmap(path):
+    """
+    Reads a FAISS index with the vectors of flat and scalar-quantized indexes (also behind
+    PCA) mapped read-only from the file, so every process that opens it shares one copy in
+    the OS page cache. Other index types are read into memory as usual.
+    """
+    import faiss
+    try:
+        return faiss.read_index(path, faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        return faiss.read_index(path)
+
+def _load_folder(folder, embeddings, mmap=False):
+    if not mmap:
+        return FAISS.load_local(folder, embeddings, allow_dangerous_deserialization=True)
+    index = read_index_mmap(os.path.join(folder, "index.faiss"))
+    with open(os.path.join(folder, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    return FAISS(embeddings, index, docstore, index_to_docstore_id)
+
+def load_vector_store(topic, embeddings, mmap=False):
+    """
+    Loads the FAISS vector store saved for a topic, or a ShardedVectorStore if it was sharded.
+    With mmap=True the vectors are memory-mapped (see read_index_mmap) instead of copied in.
+    """
+    folder = os.path.join(VECTOR_STORES, topic)
+    with metrics.time_stage("index_load"):
+        if sharding.is_sharded(folder):
+            return sharding.load_sharded(folder, lambda path: _load_folder(path, embeddings, mmap))
+        return _load_folder(folder, embeddings, mmap)
+
+def all_documents(vector_store):
+    """Returns every chunk stored in a vector store."""
+    if isinstance(vector_store, sharding.ShardedVectorStore):
+        return list(vector_store.documents())
+    return list(vector_store.docstore._dict.values())
+
+# --- Retrieval ---
+def retrieval_settings(k=None):
+    """The settings that decide which chunks a question gets; part of answer cache keys."""
+    if k is None and RETRIEVAL_DYNAMIC_K:
+        return {"min_k": RETRIEVAL_MIN_K, "max_k": RETRIEVAL_MAX_K, "min_similarity": RETRIEVAL_MIN_SIMILARITY,
+                "gap": RETRIEVAL_SCORE_GAP, "token_budget": CONTEXT_TOKEN_BUDGET}
+    return {"k": k or RETRIEVAL_K}
+
+def similarity(distance):
+    """Cosine similarity from the squared L2 distance FAISS reports for normalized vectors."""
+    return 1.0 - distance / 2.0
+
+def select_chunks(scored, min_k=RETRIEVAL_MIN_K, max_k=RETRIEVAL_MAX_K, min_similarity=RETRIEVAL_MIN_SIMILARITY,
+                  gap=RETRIEVAL_SCORE_GAP, token_budget=CONTEXT_TOKEN_BUDGET):
+    """
+    Picks a variable number of chunks from (doc, distance) pairs sorted best first.
+    The best chunk must reach min_similarity, otherwise nothing is returned. Up to
+    min_k chunks are then kept unconditionally; after that, selection stops at the
+    first chunk below min_similarity or more than gap below the previous one. The
+    token budget and max_k always apply.
+    """
+    selected, used_tokens, previous = [], 0, None
+    for doc, distance in scored[:max_k]:
+        score = similarity(distance)
+        if not selected or len(selected) >= min_k:
+            if score < min_similarity or (previous is not None and previous - score > gap):
+                break
+        tokens = doc.metadata.get("tokens") or count_tokens(doc.page_content)
+        if selected and used_tokens + tokens > token_budget:
+            break
+        selected.append(doc)
+        used_tokens += tokens
+        previous = score
+    return selected
+
+def _choose(scored, k):
+    if k is None and RETRIEVAL_DYNAMIC_K:
+        docs = select_chunks(scored)
+    else:
+        docs = [doc for doc, _ in scored[:k or RETRIEVAL_K]]
+    metrics.RETRIEVED_CHUNKS.observe(len(docs))
+    # Copies carry the similarity in their metadata without touching the shared docstore entries.
+    scores = {id(doc): similarity(distance) for doc, distance in scored}
+    return [type(doc)(page_content=doc.page_content, metadata=dict(doc.metadata, score=round(scores[id(doc)], 4)))
+            for doc in docs]
+
+def search_vector(vector_store, query_vector, k=None):
+    """
+    Returns the chunks for an embedded question: exactly k when k is given,
+    otherwise a score-dependent number (see select_chunks) unless RETRIEVAL_DYNAMIC_K is off.
+    """
+    fetch = RETRIEVAL_MAX_K if k is None and RETRIEVAL_DYNAMIC_K else (k or RETRIEVAL_K)
+    return _choose(vector_store.similarity_search_with_score_by_vector(query_vector, k=fetch), k)
+
+def retrieve(vector_store, question, k=None):
+    """Returns the chunks most similar to a single question (see search_vector)."""
+    with metrics.time_stage("embed"):
+        query_vector = vector_store.embedding_function.embed_query(question)
+    with metrics.time_stage("search"):
+        return search_vector(vector_store, query_vector, k)
+
+def batch_retrieve(vector_store, embeddings, questions, k=None):
+    """
+    Retrieves chunks for many questions at once.
+    All questions are embedded in one model call and searched with a single
+    FAISS query matrix instead of one round trip per question.
+    """
+    fetch = RETRIEVAL_MAX_K if k is None and RETRIEVAL_DYNAMIC_K else (k or RETRIEVAL_K)
+    with metrics.time_stage("embed_batch"):
+        vectors = np.asarray(embeddings.embed_documents(list(questions)), dtype="float32")
+    with metrics.time_stage("search_batch"):
+        if isinstance(vector_store, sharding.ShardedVectorStore):
+            scored_rows = vector_store.batch_search(vectors, fetch)
+        else:
+            distances, indices = vector_store.index.search(vectors, fetch)
+            scored_rows = [
+                [(vector_store.docstore.search(vector_store.index_to_docstore_id[i]), float(d))
+                 for d, i in zip(row_distances, row_indices) if i != -1]
+                for row_distances, row_indices in zip(distances, indices)
+            ]
+    return [_choose(scored, k) for scored in scored_rows]
+
+# --- Generation ---
+def format_context(docs):
+    """Joins retrieved chunks the same way the 'stuff' documents chain does."""
+    return "\n\n".join(doc.page_content for doc in docs)
+
+def stream_answer(llm, question, docs):
+    """
+    Yields the LLM's answer to a question piece by piece as it arrives, so the UI can
+    show it immediately. Time to first token, total time and token usage are recorded
+    once the stream ends. Without any context chunks the LLM is not called and
+    NOT_FOUND_ANSWER is yielded.
+    """
+    if not docs:
+        metrics.LLM_CALLS_SKIPPED.inc(reason="no_relevant_chunks")
+        yield NOT_FOUND_ANSWER
+        return
+    with metrics.time_stage("prompt"):
+        prompt_value = qa_prompt.invoke({"context": format_context(docs), "input": question})
+    _record_prompt_tokens(prompt_value)
+    started = time.perf_counter()
+    message = None
+    for chunk in llm.stream(prompt_value):
+        if message is None:
+            metrics.STAGE_SECONDS.observe(time.perf_counter() - started, stage="llm_first_token")
+            message = chunk
+        else:
+            message += chunk
+        if chunk.content:
+            yield chunk.content
+    metrics.STAGE_SECONDS.observe(time.perf_counter() - started, stage="llm_total")
+    metrics.LLM_SECONDS.observe(time.perf_counter() - started, model=_model_name(llm))
+    answer = message.content if message is not None else ""
+    _record_token_usage(llm, prompt_value.to_string(), answer, getattr(message, "usage_metadata", None))
+
+def generate_answer(llm, question, docs):
+    """Asks the LLM to answer a question from the given context chunks and returns the whole answer."""
+    return "".join(stream_answer(llm, question, docs))
+
+def _record_prompt_tokens(prompt_value):
+    """Splits prompt tokens into the template's fixed part and the context and question."""
+    fixed = QA_PROMPT.fixed_tokens()
+    metrics.PROMPT_TOKENS.inc(fixed, prompt=QA_PROMPT.label, part="fixed")
+    metrics.PROMPT_TOKENS.inc(max(0, count_tokens(prompt_value.to_string()) - fixed), prompt=QA_PROMPT.label, part="variable")
+
+def _model_name(llm):
+    return getattr(llm, "model_name", type(llm).__name__)
+
+def _record_token_usage(llm, prompt_text, answer, usage):
+    """Counts LLM tokens and their cost, estimating at ~4 characters per token when the provider reports no usage."""
+    model = _model_name(llm)
+    if usage:
+        tokens_in, tokens_out = usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+        # Input tokens served from the provider's prompt prefix cache, when it reports them.
+        cached = (usage.get("input_token_details") or {}).get("cache_read", 0)
+        if cached:
+            metrics.LLM_TOKENS.inc(cached, model=model, direction="cached_in")
+    else:
+        tokens_in, tokens_out = len(prompt_text) // 4, len(answer) // 4
+    metrics.LLM_TOKENS.inc(tokens_in, model=model, direction="in")
+    metrics.LLM_TOKENS.inc(tokens_out, model=model, direction="out")
+    if model in MODEL_PRICES:
+        price_in, price_out = MODEL_PRICES[model]
+        metrics.LLM_COST_DOLLARS.inc((tokens_in * price_in + tokens_out * price_out) / 1_000_000, model=model)
+
+def answer_question(llm, vector_store, question, k=None):
+    """Retrieves context for a question and answers it. Returns (answer, source_docs)."""
+    docs = retrieve(vector_store, question, k=k)
+    return generate_answer(llm, question, docs), docs
+
+def describe_source(doc):
+    """
+    Returns a JSON-friendly summary of a source chunk. Other places the same text
+    was found at ingestion time are listed under 'also_in'.
+    """
+    source = os.path.basename(doc.metadata.get("source", ""))
+    page = doc.metadata.get("page", "N/A")
+    also_in = [
+        f"{os.path.basename(ref.get('source') or '')} (page {ref.get('page')})"
+        for ref in doc.metadata.get("sources", [])
+        if (os.path.basename(ref.get("source") or ""), ref.get("page")) != (source, page)
+    ]
+    summary = {"source": source, "page": page, "snippet": doc.page_content[:SOURCE_SNIPPET_CHARS]}
+    if "score" in doc.metadata:
+        summary["score"] = doc.metadata["score"]
+    if also_in:
+        summary["also_in"] = also_in
+    return summary
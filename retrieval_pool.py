@@ -0,0 +1,178 @@
+"""
+Process pool for query embedding and FAISS search.
+
+The Streamlit server runs every session in one interpreter, so embedding and
+searching for concurrent users contend on a single GIL. With RETRIEVAL_WORKERS
+set, retrieval runs in a pool of worker processes instead and the UI process
+only dispatches questions and streams the LLM reply.
+
+Workers are started with forkserver (spawn where that is unavailable), never
+forked from the threaded Streamlit server, whose other threads may hold locks
+at the moment of the fork. The forkserver is single-threaded; it imports
+retrieval_preload.py, which loads the embedding model once, and every worker
+forked from it shares those weights copy-on-write. Topic indexes are opened
+with their vectors memory-mapped read-only (qa_engine.read_index_mmap), so
+all workers share one copy in the OS page cache; only the chunk texts are
+held per worker. Under spawn each worker loads its own model.
+
+Workers report their resident (RSS) and proportional (PSS) memory with every
+result. RSS counts shared pages in every worker; PSS splits them between the
+processes sharing them, so it adds up to the real total. A worker reopens a
+topic's index when ingestion replaces it.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import metrics
+import qa_engine
+
+RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", "0"))
+# Threads each worker may use for torch and FAISS; workers x threads should not exceed the pod's cores.
+RETRIEVAL_WORKER_THREADS = int(os.getenv("RETRIEVAL_WORKER_THREADS", "1"))
+
+# --- Worker Side ---
+# Set by preload_model in the forkserver, or by _init_worker in each spawned worker.
+_embeddings = None
+_stores = {}
+PRELOAD_MODULE = "retrieval_preload"
+
+def _limit_threads(threads):
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    try:
+        import faiss
+        faiss.omp_set_num_threads(threads)
+    except ImportError:
+        pass
+
+def preload_model():
+    """Loads the embedding model in the forkserver, before any worker is forked from it."""
+    global _embeddings
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    _limit_threads(1)
+    if _embeddings is None:
+        _embeddings = qa_engine.create_embeddings()
+
+def _init_worker(threads):
+    global _embeddings
+    # One tokenizer thread per worker; the pool provides the parallelism.
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    _limit_threads(threads)
+    if _embeddings is None:
+        _embeddings = qa_engine.create_embeddings()
+
+def _pss_bytes():
+    """Proportional set size of this process (Linux): shared pages are divided by the processes sharing them."""
+    try:
+        with open("/proc/self/smaps_rollup", "r") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+def _rss_bytes():
+    """Resident set size of this process (Linux), falling back to peak RSS elsewhere."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except ImportError:
+        return 0
+
+def _get_store(topic):
+    """Returns (index for a topic, whether it had to be opened), reopening it if it was rebuilt."""
+    version = qa_engine.index_version(topic)
+    cached = _stores.get(topic)
+    if cached is not None and cached[0] == version:
+        return cached[1], False
+    _stores[topic] = (version, qa_engine.load_vector_store(topic, _embeddings, mmap=True))
+    return _stores[topic][1], True
+
+def _retrieve(topic, question, k):
+    """Runs in a worker. Returns (docs, {stage: seconds}, (pid, memory)); see _ping."""
+    timings = {}
+    started = time.perf_counter()
+    vector_store, opened = _get_store(topic)
+    if opened:
+        timings["index_load"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    query_vector = _embeddings.embed_query(question)
+    timings["embed"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    docs = qa_engine.search_vector(vector_store, query_vector, k)
+    timings["search"] = time.perf_counter() - started
+    return docs, timings, _ping()
+
+def _ping():
+    """Returns (pid, {"rss": resident bytes, "pss": proportional bytes or None})."""
+    return os.getpid(), {"rss": _rss_bytes(), "pss": _pss_bytes()}
+
+# --- UI Side ---
+class RetrievalPool:
+    """Dispatches retrieval to worker processes. Timings are recorded in this process's metrics."""
+
+    def __init__(self, workers=RETRIEVAL_WORKERS, threads=RETRIEVAL_WORKER_THREADS):
+        self.workers = workers
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        if context.get_start_method() == "forkserver":
+            # Takes effect when the forkserver starts, which is at the first worker below.
+            context.set_forkserver_preload([PRELOAD_MODULE])
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=context, initializer=_init_worker, initargs=(threads,)
+        )
+        self._worker_memory = {}
+        self._lock = threading.Lock()
+        # Start every worker now rather than on the first questions.
+        for future in [self._executor.submit(_ping) for _ in range(workers)]:
+            self._record_memory(*future.result())
+
+    def _record_memory(self, pid, memory):
+        with self._lock:
+            self._worker_memory[pid] = memory
+        metrics.RETRIEVAL_WORKER_RSS_BYTES.set(memory["rss"], worker=str(pid))
+        if memory["pss"] is not None:
+            metrics.RETRIEVAL_WORKER_PSS_BYTES.set(memory["pss"], worker=str(pid))
+
+    def worker_memory(self):
+        """Last reported {"rss", "pss"} bytes per worker process id."""
+        with self._lock:
+            return dict(self._worker_memory)
+
+    def submit(self, topic, question, k=None):
+        return self._executor.submit(_retrieve, topic, question, k)
+
+    def retrieve(self, topic, question, k=None):
+        """Returns the chunks of a topic most similar to a question (see qa_engine.search_vector)."""
+        with metrics.time_stage("pool_retrieve"):
+            docs, timings, (pid, memory) = self.submit(topic, question, k).result()
+        for stage, seconds in timings.items():
+            metrics.STAGE_SECONDS.observe(seconds, stage=stage)
+        self._record_memory(pid, memory)
+        return docs
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+def create_pool(workers=RETRIEVAL_WORKERS):
+    """Returns a RetrievalPool, or None when RETRIEVAL_WORKERS is 0 and retrieval stays in-process."""
+    if workers <= 0:
+        return None
+    return RetrievalPool(workers)
@@ -0,0 +1,15 @@
+"""
+Imported by the retrieval pool's forkserver before it forks any worker.
+
+Loads the embedding model once in the single-threaded forkserver, so the
+workers forked from it share the model weights copy-on-write instead of each
+loading a copy (see retrieval_pool.py). If loading fails here, each worker
+loads its own model in _init_worker as before.
+"""
+
+import retrieval_pool
+
+try:
+    retrieval_pool.preload_model()
+except Exception as e:
+    print(f"Retrieval workers will load their own embedding model: {e}")
@@ -0,0 +1,191 @@
+"""
+Per-session chat state kept outside st.session_state.
+
+Streamlit keeps every browser session's st.session_state in memory until the
+tab is closed, so anything heavy stored there multiplies with the number of
+sessions. The chatbot keeps only small handles in session state (a session
+id, the active topic and how many chat pages are shown); vector stores live in shared
+caches (prefetch.TopicPrefetcher, the retrieval pool) and chat messages live
+here.
+
+A session's ChatHistory saves each message to the chat store
+(chat_store.ChatStore) and holds at most SESSION_MAX_MESSAGES of each
+conversation it has loaded in memory; older messages are read back from the
+store only on demand. The SessionRegistry records when each session was last active and
+how much memory it holds. Sessions idle for longer than SESSION_IDLE_SECONDS
+are evicted from memory, and a session that comes back later reloads its
+recent messages from the store.
+"""
+
+import os
+import sys
+import threading
+import time
+
+import chat_store
+import metrics
+
+SESSION_MAX_MESSAGES = int(os.getenv("SESSION_MAX_MESSAGES", "20"))
+SESSION_IDLE_SECONDS = float(os.getenv("SESSION_IDLE_SECONDS", "1800"))
+# Messages shown per page in the chat; older pages are loaded on demand.
+CHAT_PAGE_SIZE = int(os.getenv("CHAT_PAGE_SIZE", "10"))
+EVICTION_INTERVAL_SECONDS = 60
+
+def estimate_bytes(value, _seen=None):
+    """Approximate memory held by a value and everything it contains."""
+    seen = _seen if _seen is not None else set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_bytes(k, seen) + estimate_bytes(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_bytes(item, seen) for item in value)
+    return size
+
+class ChatHistory:
+    """
+    The conversations of one session: every message is saved to the chat store
+    as it is added, and only the last max_messages of each conversation are kept
+    in memory. Every method names its conversation, so two tabs of one session
+    on different topics never write to each other's conversation.
+    """
+
+    def __init__(self, store, max_messages=SESSION_MAX_MESSAGES):
+        self.store = store
+        self.max_messages = max_messages
+        self._conversations = {}
+        self._lock = threading.Lock()
+
+    def _loaded(self, conversation):
+        """The in-memory part of a conversation, loading its most recent messages the first time. Needs the lock."""
+        entry = self._conversations.get(conversation)
+        if entry is None:
+            messages = self.store.page(conversation, self.max_messages) if self.max_messages > 0 else []
+            entry = {"messages": messages, "total": self.store.count(conversation)}
+            self._conversations[conversation] = entry
+        return entry
+
+    def total(self, conversation):
+        """Messages in the conversation, in memory or only in the store."""
+        with self._lock:
+            return self._loaded(conversation)["total"]
+
+    @property
+    def messages_in_memory(self):
+        with self._lock:
+            return sum(len(entry["messages"]) for entry in self._conversations.values())
+
+    @property
+    def spilled(self):
+        """Messages of the loaded conversations that are only in the store."""
+        with self._lock:
+            return sum(entry["total"] - len(entry["messages"]) for entry in self._conversations.values())
+
+    def append(self, conversation, role, content):
+        with self._lock:
+            entry = self._loaded(conversation)
+            record = self.store.append(conversation, role, content)
+            entry["total"] += 1
+            entry["messages"].append(record)
+            if len(entry["messages"]) > self.max_messages:
+                del entry["messages"][:len(entry["messages"]) - self.max_messages]
+
+    def older(self, conversation, limit):
+        """The last `limit` messages of the conversation that are no longer in memory, oldest first."""
+        with self._lock:
+            entry = self._loaded(conversation)
+            if entry["total"] == len(entry["messages"]):
+                return []
+            before_id = entry["messages"][0]["id"] if entry["messages"] else None
+            return self.store.page(conversation, limit, before_id)
+
+    def latest(self, conversation, count):
+        """The last `count` messages of the conversation, reading older ones from the store when needed."""
+        with self._lock:
+            messages = list(self._loaded(conversation)["messages"])
+        recent = messages[-count:] if count > 0 else []
+        if count > len(messages):
+            recent = self.older(conversation, count - len(messages)) + recent
+        return recent
+
+    def release(self):
+        """Drops the in-memory messages; they are all in the store already."""
+        with self._lock:
+            self._conversations = {}
+
+    def memory_bytes(self):
+        with self._lock:
+            return estimate_bytes(self._conversations)
+
+class SessionRegistry:
+    """Tracks live sessions, their chat histories and memory, and evicts idle ones."""
+
+    def __init__(self, idle_seconds=SESSION_IDLE_SECONDS, store=None, max_messages=SESSION_MAX_MESSAGES):
+        self.idle_seconds = idle_seconds
+        self.store = store if store is not None else chat_store.ChatStore()
+        self.max_messages = max_messages
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._last_eviction = time.monotonic()
+
+    def touch(self, session_id, state=None):
+        """
+        Marks a session active and returns its ChatHistory. state (the session's
+        st.session_state as a dict) is measured for the memory view.
+        """
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                entry = {"history": ChatHistory(self.store, self.max_messages), "state_bytes": 0}
+                self._sessions[session_id] = entry
+            entry["last_seen"] = time.monotonic()
+            # Measured for this session only, so a rerun does not walk every session's messages.
+            entry["history_bytes"] = entry["history"].memory_bytes()
+            if state is not None:
+                entry["state_bytes"] = estimate_bytes(state)
+                entry["topic"] = state.get("active_topic")
+            due = time.monotonic() - self._last_eviction >= EVICTION_INTERVAL_SECONDS
+        if due:
+            self.evict_idle()
+        self._update_metrics()
+        return entry["history"]
+
+    def evict_idle(self, idle_seconds=None):
+        """Drops sessions idle for longer than idle_seconds from memory. Returns how many were evicted."""
+        idle_seconds = self.idle_seconds if idle_seconds is None else idle_seconds
+        now = time.monotonic()
+        with self._lock:
+            self._last_eviction = now
+            idle = [sid for sid, entry in self._sessions.items() if now - entry["last_seen"] > idle_seconds]
+            evicted = [self._sessions.pop(sid) for sid in idle]
+        for entry in evicted:
+            entry["history"].release()
+        metrics.SESSIONS_EVICTED.inc(len(evicted))
+        self._update_metrics()
+        return len(evicted)
+
+    def report(self):
+        """One row per live session for the admin page, largest first."""
+        now = time.monotonic()
+        with self._lock:
+            rows = [
+                {
+                    "session": sid[:8],
+                    "topic": entry.get("topic"),
+                    "idle seconds": round(now - entry["last_seen"]),
+                    "messages in memory": entry["history"].messages_in_memory,
+                    "older messages": entry["history"].spilled,
+                    "history KB": round(entry["history_bytes"] / 1024, 1),
+                    "session state KB": round(entry["state_bytes"] / 1024, 1),
+                }
+                for sid, entry in self._sessions.items()
+            ]
+        return sorted(rows, key=lambda row: row["history KB"] + row["session state KB"], reverse=True)
+
+    def _update_metrics(self):
+        with self._lock:
+            entries = list(self._sessions.values())
+        metrics.SESSIONS_ACTIVE.set(len(entries))
+        metrics.SESSION_MEMORY_BYTES.set(sum(e["history_bytes"] + e["state_bytes"] for e in entries))
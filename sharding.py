@@ -0,0 +1,145 @@
+"""
+Sharded vector stores for large categories.
+
+A sharded category keeps several ordinary FAISS indexes under
+vector_stores/<category>/shards/<n>/ plus a shards.json manifest. Chunks are
+assigned to shards either by document (every chunk of a PDF lands in the same
+shard, chosen from a hash of the file name) or by hash of the chunk text
+(evenly sized shards). Searches fan out to all shards in parallel threads,
+which run concurrently because FAISS releases the GIL, and the per-shard
+top-k lists are merged by distance.
+
+With document sharding the manifest records which files, with which content
+hashes, went into each shard, so re-processing only rebuilds the shards whose
+files changed.
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "1"))
+SHARD_STRATEGY = os.getenv("SHARD_STRATEGY", "document")
+SHARD_STRATEGIES = ("document", "hash")
+SHARD_SEARCH_THREADS = int(os.getenv("SHARD_SEARCH_THREADS", "8"))
+MANIFEST_FILE = "shards.json"
+SHARDS_DIR = "shards"
+
+_search_executor = None
+
+def _executor():
+    global _search_executor
+    if _search_executor is None:
+        _search_executor = ThreadPoolExecutor(max_workers=SHARD_SEARCH_THREADS, thread_name_prefix="shard-search")
+    return _search_executor
+
+# --- Assignment ---
+def _bucket(text, shard_count):
+    return int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "big") % shard_count
+
+def shard_for_file(path, shard_count):
+    """Shard of a PDF under document sharding; stable across runs and replicas."""
+    return _bucket(os.path.basename(path), shard_count)
+
+def shard_for_chunk(chunk, shard_count):
+    """Shard of a chunk under hash sharding."""
+    return _bucket(chunk.page_content, shard_count)
+
+def assign_files(pdf_paths, shard_count):
+    """Groups PDF paths by shard number for document sharding."""
+    groups = {shard: [] for shard in range(shard_count)}
+    for path in pdf_paths:
+        groups[shard_for_file(path, shard_count)].append(path)
+    return groups
+
+# --- Manifest ---
+def shard_path(folder, shard):
+    return os.path.join(folder, SHARDS_DIR, str(shard))
+
+def is_sharded(folder):
+    return os.path.exists(os.path.join(folder, MANIFEST_FILE))
+
+def load_manifest(folder):
+    """Returns the shard manifest of a saved category, or None if it is not sharded."""
+    try:
+        with open(os.path.join(folder, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def save_manifest(folder, manifest):
+    with open(os.path.join(folder, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+def reusable_shards(previous, manifest):
+    """
+    Returns the shard numbers whose inputs are unchanged since the previous build.
+    Only document sharding can reuse shards, and only with the same layout and settings.
+    """
+    if not previous or manifest["strategy"] != "document":
+        return set()
+    if any(previous.get(key) != manifest[key] for key in ("strategy", "shard_count", "settings")):
+        return set()
+    old_shards = previous.get("shards", {})
+    return {
+        int(shard) for shard, entry in manifest["shards"].items()
+        if entry["files"] and old_shards.get(shard, {}).get("files") == entry["files"]
+    }
+
+# --- Search ---
+class ShardedVectorStore:
+    """
+    Read-only view over several FAISS stores that searches them in parallel.
+    Offers the parts of the FAISS store API that retrieval uses.
+    """
+
+    def __init__(self, shards, embedding_function):
+        self.shards = shards
+        self.embedding_function = embedding_function
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4):
+        futures = [_executor().submit(shard.similarity_search_with_score_by_vector, embedding, k)
+                   for shard in self.shards]
+        results = [pair for future in futures for pair in future.result()]
+        # Default FAISS stores return L2 distances, so smaller is closer.
+        results.sort(key=lambda pair: pair[1])
+        return results[:k]
+
+    def similarity_search_by_vector(self, embedding, k=4):
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def batch_search(self, vectors, k=4):
+        """
+        Searches a matrix of query vectors on every shard and merges the rows.
+        Returns one list of (doc, distance) pairs per query, closest first.
+        """
+        vectors = np.asarray(vectors, dtype="float32")
+
+        def search(shard):
+            distances, indices = shard.index.search(vectors, k)
+            return shard, distances, indices
+
+        merged = [[] for _ in range(len(vectors))]
+        for future in [_executor().submit(search, shard) for shard in self.shards]:
+            shard, distances, indices = future.result()
+            for row, (row_distances, row_indices) in enumerate(zip(distances, indices)):
+                for distance, i in zip(row_distances, row_indices):
+                    if i != -1:
+                        merged[row].append((shard.docstore.search(shard.index_to_docstore_id[i]), float(distance)))
+        return [sorted(row, key=lambda pair: pair[1])[:k] for row in merged]
+
+    def documents(self):
+        for shard in self.shards:
+            yield from shard.docstore._dict.values()
+
+def load_sharded(folder, load_shard):
+    """Opens every non-empty shard of a saved category with load_shard(path)."""
+    manifest = load_manifest(folder)
+    shards = [load_shard(shard_path(folder, shard)) for shard in sorted(manifest["shards"], key=int)
+              if manifest["shards"][shard]["chunks"]]
+    if not shards:
+        raise ValueError(f"No shard of '{folder}' contains any chunks.")
+    return ShardedVectorStore(shards, shards[0].embedding_function)
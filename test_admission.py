@@ -0,0 +1,105 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import admission
+import metrics
+
+
+class TestAdmission:
+    """Test suite for per-user rate limits and the answer-slot queue"""
+
+    def setup_method(self):
+        metrics.ADMISSION_REJECTED.reset()
+
+    def test_burst_then_rate_limited(self):
+        """A user gets a burst of questions, then must wait; other users are unaffected"""
+        limiter = admission.RateLimiter(rate_per_minute=6, burst=2)
+        limiter.acquire("student")
+        limiter.acquire("student")
+
+        with pytest.raises(admission.Busy) as busy:
+            limiter.acquire("student")
+
+        assert busy.value.reason == "rate_limited"
+        assert 0 < busy.value.retry_after <= 10
+        limiter.acquire("another")
+        assert metrics.ADMISSION_REJECTED.value(reason="rate_limited") == 1
+
+    def test_new_session_does_not_reset_the_user_limit(self):
+        """A second session of the same user draws on the same per-user bucket"""
+        limiter = admission.RateLimiter(rate_per_minute=6, burst=2, user_rate_per_minute=6, user_burst=3)
+        limiter.acquire("student:session-1", user="student")
+        limiter.acquire("student:session-1", user="student")
+        limiter.acquire("student:session-2", user="student")
+
+        with pytest.raises(admission.Busy) as busy:
+            limiter.acquire("student:session-3", user="student")
+
+        assert busy.value.reason == "rate_limited"
+        limiter.acquire("another:session-1", user="another")
+
+    def test_rejected_question_takes_no_token(self):
+        """When the user's bucket is empty, the session's bucket is left untouched"""
+        limiter = admission.RateLimiter(rate_per_minute=6, burst=2, user_rate_per_minute=6, user_burst=1)
+        limiter.acquire("student:session-1", user="student")
+        with pytest.raises(admission.Busy):
+            limiter.acquire("student:session-2", user="student")
+
+        limiter.acquire("student:session-2")
+        limiter.acquire("student:session-2")
+
+    def test_full_queue_is_rejected_immediately(self):
+        """With every slot taken and no queue, a question is turned away without waiting"""
+        slots = admission.ConcurrencyLimiter(max_concurrent=1, max_queue=0, wait_seconds=30)
+
+        with slots.slot():
+            with pytest.raises(admission.Busy) as busy:
+                with slots.slot():
+                    pass
+
+        assert busy.value.reason == "queue_full"
+        assert slots.in_flight == 0
+
+    def test_waiting_question_gets_freed_slot(self):
+        """A queued question proceeds when a running one finishes"""
+        slots = admission.ConcurrencyLimiter(max_concurrent=1, max_queue=1, wait_seconds=5)
+        queued, done = threading.Event(), []
+
+        def waiter():
+            queued.set()
+            with slots.slot():
+                done.append(True)
+
+        with slots.slot():
+            thread = threading.Thread(target=waiter)
+            thread.start()
+            queued.wait()
+            time.sleep(0.1)
+            assert not done
+        thread.join(5)
+
+        assert done == [True]
+        assert slots.waiting == 0
+
+    def test_wait_times_out(self):
+        """A queued question gives up after the wait limit"""
+        slots = admission.ConcurrencyLimiter(max_concurrent=1, max_queue=1, wait_seconds=0.05)
+
+        with slots.slot():
+            with pytest.raises(admission.Busy) as busy:
+                with slots.slot():
+                    pass
+
+        assert busy.value.reason == "timeout"
+        assert metrics.ADMISSION_REJECTED.value(reason="timeout") == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,144 @@
+import os
+import sys
+import time
+
+import pytest
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import auth
+
+
+class TestAuth:
+    """Test suite for password hashing and session tokens"""
+
+    def setup_method(self):
+        self.users = {
+            "admin": {"role": "admin", "password": auth.hash_password("admin-secret", iterations=1000)},
+            "student": {"role": "user", "password": auth.hash_password("student-secret", iterations=1000)},
+        }
+
+    def authenticator(self, tmp_path, secret="test-secret"):
+        path = str(tmp_path / "users.json")
+        auth.save_users(self.users, path)
+        return auth.Authenticator(users_file=path, secret=secret)
+
+    def test_passwords_are_salted_hashes(self):
+        """The stored value never contains the password and differs per salt"""
+        first, second = auth.hash_password("secret"), auth.hash_password("secret")
+
+        assert "secret" not in first and first != second
+        assert auth.verify_password("secret", first)
+        assert not auth.verify_password("wrong", first)
+
+    def test_login_returns_token_that_verifies(self, tmp_path):
+        """A token from login identifies the user and their role"""
+        authenticator = self.authenticator(tmp_path)
+
+        token = authenticator.login("admin", "admin-secret")
+
+        assert authenticator.verify(token) == {"username": "admin", "role": "admin"}
+        assert authenticator.login("admin", "wrong") is None
+        assert authenticator.login("nobody", "admin-secret") is None
+
+    def test_token_survives_a_new_process(self, tmp_path):
+        """Another pod with the same secret accepts the token, e.g. after a reconnect"""
+        token = self.authenticator(tmp_path).login("student", "student-secret")
+
+        assert auth.Authenticator(str(tmp_path / "users.json"), secret="test-secret").verify(token)["role"] == "user"
+        assert auth.Authenticator(str(tmp_path / "users.json"), secret="other").verify(token) is None
+
+    def test_tampered_and_expired_tokens_are_rejected(self, tmp_path):
+        """Changing the claims breaks the signature, and expired tokens are refused"""
+        authenticator = self.authenticator(tmp_path)
+        token = authenticator.issue_token("student")
+        payload, _, signature = token.partition(".")
+        forged = auth._b64encode(auth._b64decode(payload).replace(b'"user"', b'"admin"')) + "." + signature
+
+        assert authenticator.verify(forged) is None
+        assert authenticator.verify(authenticator.issue_token("student", ttl=-1)) is None
+
+    def test_verified_tokens_are_cached(self, tmp_path, monkeypatch):
+        """Checking a token again does not recompute its signature"""
+        authenticator = self.authenticator(tmp_path)
+        token = authenticator.login("student", "student-secret")
+        authenticator.verify(token)
+
+        def fail(*args, **kwargs):
+            raise AssertionError("signature recomputed")
+
+        monkeypatch.setattr(authenticator, "_sign", fail)
+
+        assert authenticator.verify(token)["username"] == "student"
+
+    def test_password_change_invalidates_tokens(self, tmp_path, monkeypatch):
+        """Tokens issued before a password change stop working once the users file is reloaded"""
+        monkeypatch.setattr(auth, "AUTH_RELOAD_SECONDS", 0)
+        authenticator = self.authenticator(tmp_path)
+        token = authenticator.login("student", "student-secret")
+        assert authenticator.verify(token)
+
+        self.users["student"]["password"] = auth.hash_password("new-secret", iterations=1000)
+        auth.save_users(self.users, authenticator.users_file)
+        os.utime(authenticator.users_file, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+
+        assert authenticator.verify(token) is None
+
+    def test_bearer_header_for_headless_apis(self, tmp_path):
+        """API callers send the token as a bearer token"""
+        authenticator = self.authenticator(tmp_path)
+        token = authenticator.login("admin", "admin-secret")
+
+        assert authenticator.verify_header(f"Bearer {token}")["username"] == "admin"
+        assert authenticator.verify_header(token) is None
+
+    def test_malformed_tokens_are_rejected(self, tmp_path):
+        """Whatever arrives in the URL, verify returns None instead of raising"""
+        authenticator = self.authenticator(tmp_path)
+
+        for token in ("é", "é.é", "abc", "a.b.c", "!!!.???", "."):
+            assert authenticator.verify(token) is None
+
+    def test_token_reveals_nothing_about_the_password(self, tmp_path):
+        """The claims carry a token version, not characters of the password hash"""
+        authenticator = self.authenticator(tmp_path)
+        payload = authenticator.login("student", "student-secret").partition(".")[0]
+
+        claims = auth._b64decode(payload).decode("utf-8")
+
+        assert "pwd" not in claims
+        assert self.users["student"]["password"][-8:] not in claims
+
+    def test_logout_revokes_the_token_everywhere(self, tmp_path, monkeypatch):
+        """A revoked token is refused by this process and, after a reload, by other pods"""
+        monkeypatch.setattr(auth, "AUTH_RELOAD_SECONDS", 0)
+        authenticator = self.authenticator(tmp_path)
+        other_pod = auth.Authenticator(users_file=authenticator.users_file, secret="test-secret")
+        token = authenticator.login("student", "student-secret")
+        other_session = authenticator.login("student", "student-secret")
+        assert other_pod.verify(token)
+
+        assert authenticator.revoke(token)
+
+        assert authenticator.verify(token) is None
+        assert other_pod.verify(token) is None
+        assert authenticator.verify(other_session)["username"] == "student"
+
+    def test_new_token_version_logs_the_user_out(self, tmp_path, monkeypatch):
+        """Bumping a user's token_version (auth.py revoke) invalidates all of their tokens"""
+        monkeypatch.setattr(auth, "AUTH_RELOAD_SECONDS", 0)
+        self.users["student"]["token_version"] = auth.new_token_version()
+        authenticator = self.authenticator(tmp_path)
+        token = authenticator.login("student", "student-secret")
+        assert authenticator.verify(token)
+
+        self.users["student"]["token_version"] = auth.new_token_version()
+        auth.save_users(self.users, authenticator.users_file)
+        os.utime(authenticator.users_file, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+
+        assert authenticator.verify(token) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
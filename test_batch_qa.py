@@ -0,0 +1,128 @@
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import batch_qa
+import qa_engine
+
+
+class FakeDocument:
+    """Minimal stand-in for a LangChain Document"""
+
+    def __init__(self, page_content, metadata=None):
+        self.page_content = page_content
+        self.metadata = metadata or {}
+
+
+class TestBatchQa:
+    """Test suite for resumable batch question answering"""
+
+    def setup_method(self):
+        self.asked = []
+
+    def fake_engine(self, monkeypatch, answer=None):
+        def generate_answer(llm, question, docs):
+            self.asked.append(question)
+            return answer(question) if answer else f"answer to {question}"
+
+        monkeypatch.setattr(qa_engine, "load_vector_store", lambda topic, embeddings: object())
+        monkeypatch.setattr(qa_engine, "batch_retrieve",
+                            lambda store, embeddings, questions, k=None: [[FakeDocument(q)] for q in questions])
+        monkeypatch.setattr(qa_engine, "generate_answer", generate_answer)
+        monkeypatch.setattr(qa_engine, "describe_source", lambda doc: {"snippet": doc.page_content})
+
+    def write_questions(self, path, count):
+        with open(path, "w", encoding="utf-8") as f:
+            for i in range(count):
+                f.write(json.dumps({"id": f"q{i}", "topic": "MCA", "question": f"question {i}"}) + "\n")
+
+    def read_output(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def test_rerun_skips_answered_ids(self, tmp_path, monkeypatch):
+        """Questions already answered successfully are not asked again; failed ones are retried"""
+        self.fake_engine(monkeypatch)
+        questions, output = str(tmp_path / "questions.jsonl"), str(tmp_path / "answers.jsonl")
+        self.write_questions(questions, 3)
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"id": "q0", "answer": "done"}) + "\n")
+            f.write(json.dumps({"id": "q1", "error": "rate limited"}) + "\n")
+
+        summary = batch_qa.run_batch(questions, output, llm=object(), embeddings=object())
+
+        assert summary == {"total": 3, "skipped": 1, "answered": 2, "failed": 0}
+        assert sorted(self.asked) == ["question 1", "question 2"]
+
+    def test_truncated_last_line_is_repaired(self, tmp_path, monkeypatch):
+        """A half-written record is ignored, retried, and does not corrupt the next record"""
+        self.fake_engine(monkeypatch)
+        questions, output = str(tmp_path / "questions.jsonl"), str(tmp_path / "answers.jsonl")
+        self.write_questions(questions, 2)
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"id": "q0", "answer": "done"}) + "\n")
+            f.write('{"id": "q1", "answ')
+
+        batch_qa.run_batch(questions, output, llm=object(), embeddings=object())
+
+        with open(output, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        assert lines[1] == '{"id": "q1", "answ'
+        assert json.loads(lines[2])["answer"] == "answer to question 1"
+        assert batch_qa.read_completed_ids(output) == {"q0", "q1"}
+
+    def test_in_flight_window_is_bounded(self, tmp_path, monkeypatch):
+        """At most two waves of LLM calls are queued ahead of the written results"""
+        self.fake_engine(monkeypatch)
+        questions, output = str(tmp_path / "questions.jsonl"), str(tmp_path / "answers.jsonl")
+        self.write_questions(questions, 20)
+        state = {"submitted": 0, "written": 0, "max_pending": 0}
+        lock = threading.Lock()
+
+        class CountingPool(ThreadPoolExecutor):
+            def submit(self, *args, **kwargs):
+                with lock:
+                    state["submitted"] += 1
+                    state["max_pending"] = max(state["max_pending"], state["submitted"] - state["written"])
+                return super().submit(*args, **kwargs)
+
+        def progress(result):
+            with lock:
+                state["written"] += 1
+
+        monkeypatch.setattr(batch_qa, "ThreadPoolExecutor", CountingPool)
+
+        summary = batch_qa.run_batch(questions, output, concurrency=2, batch_size=5,
+                                     llm=object(), embeddings=object(), progress=progress)
+
+        assert summary["answered"] == 20
+        assert state["max_pending"] <= 2 * 2
+        assert len(self.read_output(output)) == 20
+
+    def test_llm_errors_are_recorded(self, tmp_path, monkeypatch):
+        """A failed question is written with its error and counted as failed"""
+        def answer(question):
+            if question == "question 1":
+                raise RuntimeError("model overloaded")
+            return "ok"
+
+        self.fake_engine(monkeypatch, answer)
+        questions, output = str(tmp_path / "questions.jsonl"), str(tmp_path / "answers.jsonl")
+        self.write_questions(questions, 2)
+
+        summary = batch_qa.run_batch(questions, output, llm=object(), embeddings=object())
+
+        assert summary["failed"] == 1
+        errors = {r["id"]: r.get("error") for r in self.read_output(output)}
+        assert errors == {"q0": None, "q1": "model overloaded"}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,120 @@
+import json
+import os
+import sys
+
+import pytest
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+np = pytest.importorskip("numpy")
+
+import benchmark
+import ingestion
+from fake_llm import FakeChatGroq
+
+
+class FakeDocument:
+    """Minimal stand-in for a LangChain Document"""
+
+    def __init__(self, page_content, metadata=None):
+        self.page_content = page_content
+        self.metadata = metadata or {}
+
+
+class FakeEmbeddings:
+    def embed_documents(self, texts):
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+def results(parse=10.0, embed=100.0, p50=200.0, build=1.0):
+    return {
+        "ingest": {"parse_pages_per_s": parse, "embed_chunks_per_s": embed},
+        "answers": {"end_to_end": {"p50_ms": p50}},
+        "scales": [{"scale": 1, "build_s": build, "load_s": 0.5, "search": {"p99_ms": 2.0}}],
+    }
+
+
+class TestBenchmark:
+    """Test suite for the offline benchmark's measurements and result files"""
+
+    def setup_method(self):
+        self.chunks = [FakeDocument(f"chunk {i}", {"page": i}) for i in range(4)]
+        self.vectors = np.eye(4, dtype="float32")
+
+    def test_latency_stats_use_nearest_rank_percentiles(self):
+        """Samples in seconds are summarized in milliseconds"""
+        stats = benchmark._latency_stats([0.004, 0.001, 0.003, 0.002] * 25)
+
+        assert stats == {"count": 100, "mean_ms": 2.5, "p50_ms": 2.0, "p99_ms": 4.0}
+
+    def test_latency_stats_of_no_samples(self):
+        """An empty run reports zeros instead of failing"""
+        assert benchmark._latency_stats([]) == {"count": 0, "mean_ms": 0.0, "p50_ms": 0.0, "p99_ms": 0.0}
+
+    def test_synthesized_corpus_is_distinct_and_normalized(self):
+        """Each copy gets its own text and jittered unit vectors; the first copy is the original"""
+        texts, metadatas, vectors = benchmark.synthesize_corpus(self.chunks, self.vectors, scale=3)
+
+        assert len(texts) == len(set(texts)) == 12
+        assert [m["copy"] for m in metadatas[::4]] == [0, 1, 2]
+        assert np.allclose(vectors[:4], self.vectors)
+        assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-5)
+        assert not np.allclose(vectors[4:8], self.vectors)
+
+    def test_synthesized_corpus_is_reproducible(self):
+        """The same seed gives the same vectors, so runs can be compared"""
+        first = benchmark.synthesize_corpus(self.chunks, self.vectors, scale=2)[2]
+        second = benchmark.synthesize_corpus(self.chunks, self.vectors, scale=2)[2]
+
+        assert np.array_equal(first, second)
+
+    def test_ingest_reads_pages_without_the_cache(self, monkeypatch):
+        """Parsing goes through the ingestion page reader with the extraction cache bypassed"""
+        calls = []
+
+        def iter_pages(paths, stats, backend, use_ocr, use_cache):
+            calls.append((use_ocr, use_cache))
+            return iter([FakeDocument("Fees\n\nRs. 1,20,000 per year", {"page": 0})])
+
+        monkeypatch.setattr(ingestion, "iter_pages", iter_pages)
+
+        result, chunks, vectors = benchmark.bench_ingest(["brochure.pdf"], FakeEmbeddings())
+
+        assert calls == [(False, False)]
+        assert result["files"] == result["pages"] == 1
+        assert result["chunks"] == len(chunks) == len(vectors) > 0
+
+    def test_answers_are_timed_per_question(self):
+        """Every benchmark question is retrieved and answered end to end with the fake LLM"""
+        pytest.importorskip("faiss")
+        from langchain_community.embeddings import DeterministicFakeEmbedding
+        from langchain_community.vectorstores import FAISS
+
+        store = FAISS.from_texts([f"MCA fact number {i}" for i in range(20)], DeterministicFakeEmbedding(size=16))
+        llm = FakeChatGroq(first_token_latency=0, tokens_per_second=0, answer_tokens=5)
+
+        answers = benchmark.bench_answers(store, llm, k=2)
+
+        assert answers["end_to_end"]["count"] == len(benchmark.BENCHMARK_QUESTIONS)
+        assert answers["stages"]["search"]["count"] == len(benchmark.BENCHMARK_QUESTIONS)
+
+    def test_results_are_written_as_json(self, tmp_path):
+        """The result file is created with its folder and reads back unchanged"""
+        output = str(tmp_path / "runs" / "latest.json")
+
+        assert benchmark.write_results(results(), output) == output
+        with open(output, "r", encoding="utf-8") as f:
+            assert json.load(f) == results()
+
+    def test_compare_prints_relative_change(self, capsys):
+        """Headline numbers are compared with the previous run in percent"""
+        benchmark.compare(results(parse=15.0, build=0.5), results())
+
+        lines = capsys.readouterr().out.splitlines()
+        assert any(line.startswith("parse pages/s") and line.endswith("+50.0%") for line in lines)
+        assert any(line.startswith("1x build s") and line.endswith("-50.0%") for line in lines)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,95 @@
+import os
+import sys
+
+import pytest
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import blob_store
+
+
+class FakeDocument:
+    """Minimal stand-in for a LangChain Document"""
+
+    def __init__(self, page_content, metadata=None):
+        self.page_content = page_content
+        self.metadata = metadata or {}
+
+
+class CountingEmbeddings:
+    """Stand-in embedding model that records which texts it embedded"""
+
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [[float(len(text)), 0.5] for text in texts]
+
+
+class TestBlobStore:
+    """Test suite for content-addressed document storage"""
+
+    def setup_method(self):
+        self.embeddings = CountingEmbeddings()
+
+    def library(self, tmp_path, files):
+        for relative, data in files.items():
+            path = tmp_path / "library" / relative
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(data)
+        return str(tmp_path / "library"), str(tmp_path / "library" / ".blobs")
+
+    def test_migrate_stores_shared_documents_once(self, tmp_path):
+        """Identical files in several categories end up sharing one copy"""
+        root, blob_dir = self.library(tmp_path, {"IMCC/guide.pdf": b"%PDF-guide", "IMCC1/guide.pdf": b"%PDF-guide",
+                                                 "MCA/fees.pdf": b"%PDF-fees"})
+
+        report = blob_store.migrate(root, blob_dir)
+
+        assert (report["files"], report["documents"]) == (3, 2)
+        assert os.path.samefile(os.path.join(root, "IMCC", "guide.pdf"), os.path.join(root, "IMCC1", "guide.pdf"))
+        assert blob_store.usage(root)["stored_bytes"] == len(b"%PDF-guide") + len(b"%PDF-fees")
+        assert blob_store.migrate(root, blob_dir)["linked"] == 0
+
+    def test_blob_folder_is_not_a_category(self, tmp_path):
+        """The store inside the library is hidden from category listings"""
+        root, blob_dir = self.library(tmp_path, {"MCA/fees.pdf": b"%PDF-fees"})
+        blob_store.migrate(root, blob_dir)
+
+        assert blob_store.list_categories(root) == ["MCA"]
+
+    def test_unreferenced_blobs_are_collected(self, tmp_path):
+        """A blob is removed once no category links to it"""
+        root, blob_dir = self.library(tmp_path, {"MCA/fees.pdf": b"%PDF-fees", "MBA/fees.pdf": b"%PDF-fees"})
+        blob_store.migrate(root, blob_dir)
+
+        os.remove(os.path.join(root, "MCA", "fees.pdf"))
+        assert blob_store.collect_garbage(blob_dir) == (0, 0)
+
+        os.remove(os.path.join(root, "MBA", "fees.pdf"))
+        assert blob_store.collect_garbage(blob_dir) == (1, len(b"%PDF-fees"))
+
+    def test_embeddings_are_reused_across_builds(self, tmp_path):
+        """A document's chunks are embedded once, whichever category builds it next"""
+        chunks = [FakeDocument(text, {"file_hash": "ab" * 32}) for text in ("Fees: Rs. 1,00,000", "Hostel: 2 per room")]
+
+        first, reused = blob_store.EmbeddingCache("minilm", str(tmp_path)).embed(chunks, self.embeddings)
+        assert reused == 0
+        again, reused = blob_store.EmbeddingCache("minilm", str(tmp_path)).embed(chunks, self.embeddings)
+
+        assert reused == 2
+        assert again == first
+        assert self.embeddings.embedded == [chunk.page_content for chunk in chunks]
+
+    def test_other_model_does_not_reuse_vectors(self, tmp_path):
+        """Vectors are kept per embedding model"""
+        chunks = [FakeDocument("Fees: Rs. 1,00,000", {"file_hash": "ab" * 32})]
+        blob_store.EmbeddingCache("minilm", str(tmp_path)).embed(chunks, self.embeddings)
+
+        assert blob_store.EmbeddingCache("mpnet", str(tmp_path)).embed(chunks, self.embeddings)[1] == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,147 @@
+import os
+import sys
+import time
+
+import pytest
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import cache_backends
+
+
+class FakeRedis:
+    """Local stand-in for a Redis client supporting get/set(ex=)/delete"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        value, expires = self.data.get(key, (None, None))
+        if expires is not None and expires < time.time():
+            return None
+        return value
+
+    def set(self, key, value, ex=None):
+        self.data[key] = (value, time.time() + ex if ex else None)
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+class CountingEmbeddings:
+    """Embedding model stand-in that counts how often it is called"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        return [0.5, 0.25, float(len(text))]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def cache(request, tmp_path):
+    if request.param == "memory":
+        return cache_backends.MemoryCache(max_entries=100)
+    if request.param == "sqlite":
+        return cache_backends.SQLiteCache(str(tmp_path / "cache.sqlite3"))
+    return cache_backends.RedisCache(client=FakeRedis())
+
+
+class TestCacheBackends:
+    """Test suite for the pluggable cache backends"""
+
+    def test_round_trip(self, cache):
+        """Every backend stores and returns bytes values"""
+        cache.set("k", b"value")
+
+        assert cache.get("k") == b"value"
+        assert cache.get("missing") is None
+
+    def test_delete(self, cache):
+        """Deleted entries are gone"""
+        cache.set("k", b"value")
+        cache.delete("k")
+
+        assert cache.get("k") is None
+
+    def test_expired_entries_are_not_served(self, cache):
+        """Entries past their TTL are treated as missing"""
+        cache.set("k", b"value", ttl=1)
+        time.sleep(1.1)
+
+        assert cache.get("k") is None
+
+    def test_memory_cache_evicts_least_recently_used(self):
+        """The in-process LRU keeps at most max_entries"""
+        cache = cache_backends.MemoryCache(max_entries=2)
+        cache.set("a", b"1")
+        cache.set("b", b"2")
+        cache.get("a")
+        cache.set("c", b"3")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == b"1"
+
+    def test_sqlite_cache_is_shared_between_instances(self, tmp_path):
+        """Two processes on one host pointing at the same file see each other's entries"""
+        path = str(tmp_path / "shared.sqlite3")
+        cache_backends.SQLiteCache(path).set("k", b"value")
+
+        assert cache_backends.SQLiteCache(path).get("k") == b"value"
+
+    def test_sqlite_cache_prunes_expired_entries(self, tmp_path, monkeypatch):
+        """Expired rows are deleted by a later write once the prune interval has passed"""
+        monkeypatch.setattr(cache_backends, "CACHE_PRUNE_SECONDS", 0)
+        cache = cache_backends.SQLiteCache(str(tmp_path / "cache.sqlite3"))
+        cache.set("old", b"1", ttl=-1)
+
+        cache.set("new", b"2")
+
+        rows = cache._connection().execute("SELECT key FROM cache").fetchall()
+        assert rows == [("new",)]
+
+    def test_keys_are_stable_and_versioned(self):
+        """The same request gives the same key; a new index version gives a new one"""
+        answers = cache_backends.AnswerCache(cache_backends.MemoryCache())
+
+        key = answers.key("MCA", 1, "model", "What is the fee?", 3)
+
+        assert key == answers.key("MCA", 1, "model", "  what is   the FEE? ", 3)
+        assert key != answers.key("MCA", 2, "model", "What is the fee?", 3)
+
+    def test_answer_cache_round_trip(self, cache):
+        """Answers are cached with their sources and not served for a newer index"""
+        answers = cache_backends.AnswerCache(cache)
+        sources = [{"source": "a.pdf", "page": 1, "snippet": "Fees"}]
+
+        answers.put("MCA", 1, "model", "fee?", 3, "Rs. 1,00,000", sources)
+
+        assert answers.get("MCA", 1, "model", "fee?", 3) == {"answer": "Rs. 1,00,000", "sources": sources}
+        assert answers.get("MCA", 2, "model", "fee?", 3) is None
+
+    def test_query_embeddings_are_cached(self, cache):
+        """A repeated question is embedded only once"""
+        model = CountingEmbeddings()
+        embeddings = cache_backends.CachedQueryEmbeddings(model, cache, "test-model")
+
+        first = embeddings.embed_query("What is the fee?")
+        second = embeddings.embed_query("what is the fee?")
+
+        assert model.calls == 1
+        assert second == pytest.approx(first)
+
+    def test_unknown_backend(self):
+        """An unknown backend name is rejected with the available choices"""
+        with pytest.raises(ValueError, match="memory"):
+            cache_backends.create_cache("memcached")
+
+        assert cache_backends.create_cache("none") is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,89 @@
+import json
+import os
+import sys
+
+import pytest
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import catalog
+import qa_engine
+
+
+class TestCatalog:
+    """Test suite for the category and topic catalog"""
+
+    def setup_method(self):
+        self.stores = None
+
+    def layout(self, tmp_path, monkeypatch):
+        library, stores = tmp_path / "document_library", tmp_path / "vector_stores"
+        for category, count in (("MCA", 2), ("MBA", 1)):
+            (library / category).mkdir(parents=True)
+            for i in range(count):
+                (library / category / f"doc{i}.pdf").write_bytes(b"%PDF-" + b"x" * 100)
+        (stores / "MCA").mkdir(parents=True)
+        (stores / "MCA" / "index.faiss").write_bytes(b"0" * 1000)
+        (stores / "MCA" / "chunk_report.json").write_text(json.dumps({"chunks": 42}))
+        monkeypatch.setattr(qa_engine, "DOCUMENT_LIBRARY", str(library))
+        monkeypatch.setattr(qa_engine, "VECTOR_STORES", str(stores))
+        self.stores = stores
+
+    def test_first_read_scans_and_saves(self, tmp_path, monkeypatch):
+        """Without a catalog file, categories and topics are scanned once and persisted"""
+        self.layout(tmp_path, monkeypatch)
+
+        library = catalog.Catalog()
+
+        assert library.categories() == ["MBA", "MCA"]
+        assert library.topics() == ["MCA"]
+        assert library.category("MCA")["documents"] == 2
+        assert library.topic("MCA")["chunks"] == 42
+        assert library.index_version("MCA") == os.stat(self.stores / "MCA" / "index.faiss").st_mtime_ns
+        assert (self.stores / catalog.CATALOG_FILE).exists()
+
+    def test_reruns_do_not_touch_the_filesystem(self, tmp_path, monkeypatch):
+        """Within the refresh interval the catalog is served from memory"""
+        self.layout(tmp_path, monkeypatch)
+        library = catalog.Catalog(refresh_seconds=60)
+        library.topics()
+
+        def fail(*args, **kwargs):
+            raise AssertionError("filesystem accessed")
+
+        monkeypatch.setattr(os, "stat", fail)
+        monkeypatch.setattr(os, "listdir", fail)
+        monkeypatch.setattr(os, "scandir", fail)
+
+        assert library.topics() == ["MCA"]
+        assert library.categories() == ["MBA", "MCA"]
+
+    def test_build_event_updates_topic(self, tmp_path, monkeypatch):
+        """A processed category appears with its build statistics, also for other processes"""
+        self.layout(tmp_path, monkeypatch)
+        library = catalog.Catalog()
+        library.topics()
+        (self.stores / "MBA").mkdir()
+        (self.stores / "MBA" / "index.faiss").write_bytes(b"0" * 500)
+
+        library.refresh_topic("MBA", {"files": 1, "report": {"chunks": 7}})
+
+        assert library.topic("MBA")["chunks"] == 7
+        assert library.topic("MBA")["documents"] == 1
+        assert catalog.Catalog().topics() == ["MBA", "MCA"]
+
+    def test_upload_event_updates_category(self, tmp_path, monkeypatch):
+        """New documents are counted after refresh_category"""
+        self.layout(tmp_path, monkeypatch)
+        library = catalog.Catalog()
+        library.categories()
+        (tmp_path / "document_library" / "MBA" / "brochure.pdf").write_bytes(b"%PDF-")
+
+        library.refresh_category("MBA")
+
+        assert library.category("MBA")["documents"] == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,66 @@
+import os
+import sys
+
+import pytest
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import chat_store
+
+
+class TestChatStore:
+    """Test suite for the persistent chat history store"""
+
+    def setup_method(self):
+        self.conversation = "session:MCA"
+
+    def test_messages_survive_reopening(self, tmp_path):
+        """A new store on the same file (e.g. after a restart) sees earlier messages"""
+        path = str(tmp_path / "data" / "chat.sqlite3")
+        chat_store.ChatStore(path).append(self.conversation, "user", "When does admission open?")
+
+        store = chat_store.ChatStore(path)
+
+        assert store.count(self.conversation) == 1
+        assert store.page(self.conversation, 10)[0]["content"] == "When does admission open?"
+
+    def test_pages_go_back_from_newest(self, tmp_path):
+        """Each page holds the messages just before the previous one, oldest first"""
+        store = chat_store.ChatStore(str(tmp_path / "chat.sqlite3"))
+        for i in range(7):
+            store.append(self.conversation, "user", f"question {i}")
+        store.append("other:MBA", "user", "not in this conversation")
+
+        latest = store.page(self.conversation, 3)
+        earlier = store.page(self.conversation, 3, before_id=latest[0]["id"])
+
+        assert [m["content"] for m in latest] == ["question 4", "question 5", "question 6"]
+        assert [m["content"] for m in earlier] == ["question 1", "question 2", "question 3"]
+        assert store.count(self.conversation, before_id=earlier[0]["id"]) == 1
+
+    def test_session_belongs_to_its_first_user(self, tmp_path):
+        """A session link opened by another user cannot be claimed by them"""
+        store = chat_store.ChatStore(str(tmp_path / "chat.sqlite3"))
+
+        assert store.claim("session", "asha")
+        assert store.claim("session", "asha")
+        assert not store.claim("session", "ravi")
+        assert not store.claim("other", None)
+
+    def test_sessions_from_before_owners_are_not_claimable(self, tmp_path):
+        """Conversations saved before owners were recorded are not handed to whoever asks first"""
+        path = str(tmp_path / "chat.sqlite3")
+        store = chat_store.ChatStore(path)
+        store.append(self.conversation, "user", "old question")
+        with store._connection() as conn:
+            conn.execute("DROP TABLE sessions")
+
+        reopened = chat_store.ChatStore(path)
+
+        assert not reopened.claim("session", "asha")
+        assert reopened.claim("new-session", "asha")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
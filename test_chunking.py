@@ -0,0 +1,119 @@
+import os
+import sys
+
+import pytest
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import chunking
+
+
+BROCHURE_PAGE = """ADMISSION PROCEDURE
+Candidates must register on the CET cell portal. The registration fee is non refundable.
+Documents required:
+1. SSC marksheet
+2. HSC marksheet
+3. Graduation marksheet
+FEE STRUCTURE
+| Fee Head | Amount |
+| Tuition | 100000 |
+| Development | 20000 |
+"""
+
+
+class FakeDocument:
+    """Minimal stand-in for a LangChain Document"""
+
+    def __init__(self, page_content, metadata=None):
+        self.page_content = page_content
+        self.metadata = metadata or {}
+
+
+class TestChunking:
+    """Test suite for the structure-aware chunker"""
+
+    def test_parse_blocks_detects_structure(self):
+        """Headings, paragraphs, lists and tables become separate blocks"""
+        kinds = [kind for kind, _ in chunking.parse_blocks(BROCHURE_PAGE)]
+
+        assert kinds == ["heading", "paragraph", "heading", "list", "heading", "table"]
+
+    def test_list_items_are_grouped(self):
+        """Consecutive list items form one block"""
+        blocks = dict((kind, text) for kind, text in chunking.parse_blocks(BROCHURE_PAGE))
+
+        assert blocks["list"].count("\n") == 2
+
+    def test_chunks_start_with_section_heading(self):
+        """Every chunk is prefixed with the heading of its section"""
+        chunker = chunking.StructureChunker(max_tokens=40, min_tokens=0)
+
+        chunks, _ = chunker.split_text(BROCHURE_PAGE)
+
+        for text, section in chunks:
+            assert text.startswith(section)
+
+    def test_tables_are_not_cut_mid_row(self):
+        """An oversized table is split by rows and repeats its header row"""
+        chunker = chunking.StructureChunker(max_tokens=16, min_tokens=0)
+
+        chunks, _ = chunker.split_text(BROCHURE_PAGE)
+        table_chunks = [text for text, section in chunks if section == "FEE STRUCTURE"]
+
+        assert len(table_chunks) == 2
+        for text in table_chunks:
+            assert "| Fee Head | Amount |" in text
+            for line in text.split("\n")[1:]:
+                assert line.startswith("|") and line.endswith("|")
+
+    def test_chunks_respect_token_limit(self):
+        """No chunk exceeds the configured token budget"""
+        long_paragraph = " ".join(f"Sentence number {i} describes the admission rules." for i in range(60))
+        chunker = chunking.StructureChunker(max_tokens=50, overlap_tokens=10, min_tokens=0)
+
+        chunks, _ = chunker.split_text("RULES\n" + long_paragraph)
+
+        assert len(chunks) > 1
+        assert all(chunking.count_tokens(text) <= 50 for text, _ in chunks)
+
+    def test_short_sections_are_merged(self):
+        """Sections below the minimum size share a chunk with the next section"""
+        chunker = chunking.StructureChunker(max_tokens=200, min_tokens=80)
+
+        chunks, _ = chunker.split_text(BROCHURE_PAGE)
+
+        assert len(chunks) == 1
+        assert chunks[0][0].startswith("ADMISSION PROCEDURE")
+
+    def test_heading_carries_across_pages(self):
+        """A page without its own heading inherits the last heading of the same file"""
+        chunker = chunking.StructureChunker(max_tokens=200, min_tokens=0)
+        pages = [
+            FakeDocument("HOSTEL FACILITY\nRooms are shared.", {"source": "a.pdf", "page": 0}),
+            FakeDocument("Mess charges are extra.", {"source": "a.pdf", "page": 1}),
+        ]
+
+        chunks = chunker.split_documents(pages)
+
+        assert chunks[1].metadata["section"] == "HOSTEL FACILITY"
+        assert chunks[1].metadata["page"] == 1
+        assert chunks[1].page_content.startswith("HOSTEL FACILITY\n")
+        assert isinstance(chunks[1], FakeDocument)
+
+    def test_chunk_report(self):
+        """The report summarizes chunk sizes and buckets them"""
+        report = chunking.chunk_report([10, 100, 300, 2000])
+
+        assert report["chunks"] == 4
+        assert report["total_tokens"] == 2410
+        assert report["min"] == 10 and report["max"] == 2000
+        assert report["histogram"] == {"<=64": 1, "<=128": 1, "<=384": 1, ">1024": 1}
+
+    def test_empty_report(self):
+        """An empty category yields an empty report instead of failing"""
+        assert chunking.chunk_report([]) == {"chunks": 0, "total_tokens": 0}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
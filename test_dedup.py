@@ -0,0 +1,86 @@
+import os
+import sys
+
+import pytest
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import dedup
+
+
+FEE_NOTICE = (
+    "FEE STRUCTURE\nThe tuition fee for the academic year 2024-25 is Rs. 1,00,000 payable in two "
+    "installments. The development fee of Rs. 20,000 is payable at the time of admission and is "
+    "non refundable. Students availing hostel facility must pay the hostel and mess charges "
+    "separately before the commencement of the semester."
+)
+
+
+class TestDedup:
+    """Test suite for chunk deduplication"""
+
+    def setup_method(self):
+        """Start every test with an empty deduplicator"""
+        self.deduplicator = dedup.Deduplicator(threshold=0.8)
+
+    def keep(self, canonical_id, text):
+        found_id, fingerprint = self.deduplicator.find(text)
+        assert found_id is None
+        self.deduplicator.add(canonical_id, fingerprint)
+
+    def test_exact_duplicate_ignores_case_and_spacing(self):
+        """Whitespace and case differences still count as the same text"""
+        self.keep("a", FEE_NOTICE)
+
+        assert self.deduplicator.find("  " + FEE_NOTICE.upper().replace(" ", "   ")) == ("a", "exact")
+
+    def test_near_duplicate_is_detected(self):
+        """A copy with a small edit is matched to the original"""
+        self.keep("a", FEE_NOTICE)
+
+        edited = FEE_NOTICE.replace("two installments", "two equal installments")
+
+        assert self.deduplicator.find(edited) == ("a", "near")
+
+    def test_different_text_is_kept(self):
+        """Unrelated text is not reported as a duplicate"""
+        self.keep("a", FEE_NOTICE)
+
+        found_id, _ = self.deduplicator.find(
+            "HOSTEL FACILITY\nSeparate hostels for boys and girls are available on campus with "
+            "24 hour security, a gymnasium, a reading room and a mess serving vegetarian food."
+        )
+
+        assert found_id is None
+
+    def test_signatures_are_stable(self):
+        """The same text always gets the same signature, so runs are reproducible"""
+        assert dedup.minhash(dedup.shingles(FEE_NOTICE)) == dedup.minhash(dedup.shingles(FEE_NOTICE))
+
+    def test_jaccard_estimate_is_close(self):
+        """The MinHash estimate tracks the real shingle overlap"""
+        first = dedup.shingles(FEE_NOTICE)
+        second = dedup.shingles(FEE_NOTICE.replace("hostel and mess charges", "library deposit"))
+        actual = len(first & second) / len(first | second)
+
+        estimate = dedup.estimated_jaccard(dedup.minhash(first), dedup.minhash(second))
+
+        assert abs(estimate - actual) < 0.2
+
+    def test_add_source_records_locations_once(self):
+        """Repeated locations are stored once and the list stays bounded"""
+        metadata = {"source": "a.pdf", "page": 0}
+
+        dedup.add_source(metadata, {"source": "b.pdf", "page": 3})
+        dedup.add_source(metadata, {"source": "b.pdf", "page": 3})
+        for page in range(50):
+            dedup.add_source(metadata, {"source": "c.pdf", "page": page}, limit=5)
+
+        assert metadata["sources"][:2] == [{"source": "a.pdf", "page": 0}, {"source": "b.pdf", "page": 3}]
+        assert len(metadata["sources"]) == 5
+        assert metadata["duplicates"] == 52
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
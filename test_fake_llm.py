@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+
+import pytest
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+pytest.importorskip("langchain_core")
+
+from fake_llm import FakeChatGroq, fake_reply_tokens
+
+
+class TestFakeLLM:
+    """Test suite for the deterministic ChatGroq stand-in"""
+
+    def setup_method(self):
+        self.llm = FakeChatGroq(first_token_latency=0, tokens_per_second=0, answer_tokens=8)
+        self.prompt = "What is the MCA tuition fee? Context: the fee is Rs. 1,20,000 per year."
+
+    def test_reply_depends_only_on_prompt_and_seed(self):
+        """The same prompt gives the same reply; another seed or prompt gives another one"""
+        first = self.llm.invoke(self.prompt).content
+
+        assert self.llm.invoke(self.prompt).content == first
+        assert FakeChatGroq(first_token_latency=0, tokens_per_second=0, answer_tokens=8,
+                            seed=1).invoke(self.prompt).content != first
+        assert self.llm.invoke(self.prompt + " Hostel?").content != first
+
+    def test_reply_words_come_from_the_prompt(self):
+        """Replies are built from the prompt's own words, with the requested length"""
+        tokens = fake_reply_tokens(self.prompt, 8)
+
+        assert len(tokens) == 8
+        assert all(token.strip() in self.prompt for token in tokens)
+
+    def test_stream_matches_invoke(self):
+        """Streaming yields one piece per token and ends with the usage, like ChatGroq"""
+        chunks = list(self.llm.stream(self.prompt))
+        content = [c.content for c in chunks if c.content]
+
+        assert len(content) == 8
+        assert "".join(content).strip() == self.llm.invoke(self.prompt).content
+        assert chunks[-1].usage_metadata["output_tokens"] == 8
+
+    def test_latency_settings_are_applied(self):
+        """Time to first token and generation speed control how long a reply takes"""
+        llm = FakeChatGroq(first_token_latency=0.05, tokens_per_second=100, answer_tokens=6)
+
+        started = time.perf_counter()
+        llm.invoke(self.prompt)
+
+        assert time.perf_counter() - started >= 0.05 + 5 * 0.01
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
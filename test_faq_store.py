@@ -0,0 +1,115 @@
+import json
+import os
+import sys
+
+import pytest
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import faq_store
+
+
+class FakeDocument:
+    """Minimal stand-in for a LangChain Document"""
+
+    def __init__(self, page_content, metadata=None):
+        self.page_content = page_content
+        self.metadata = metadata or {}
+
+
+class FakeIndex:
+    """Returns a fixed best match and similarity score"""
+
+    def __init__(self, entry, score):
+        self.result = [(FakeDocument("stored question", {"entry": entry}), score)]
+
+    def similarity_search_with_score(self, question, k=1):
+        return self.result
+
+
+class FakeMatcher:
+    def match(self, question):
+        return None
+
+
+class TestFaqStore:
+    """Test suite for the FAQ store and its match threshold"""
+
+    def setup_method(self):
+        self.entries = [
+            {"question": "What is the MCA fee?", "answer": "Rs. 1,20,000 per year", "sources": []},
+            {"question": "Is there a hostel?", "answer": "Yes, for girls", "sources": []},
+        ]
+
+    def matcher(self, tmp_path, monkeypatch, score, threshold=faq_store.FAQ_MATCH_THRESHOLD):
+        monkeypatch.setattr(faq_store, "FAQ_STORE", str(tmp_path))
+        os.makedirs(tmp_path / "MCA")
+        (tmp_path / "MCA" / "faq.json").write_text(json.dumps(self.entries))
+        matcher = faq_store.FaqMatcher("MCA", embeddings=None, threshold=threshold)
+        matcher.index = FakeIndex(1, score)
+        return matcher
+
+    def test_default_threshold(self):
+        """Questions must be nearly identical to a stored one to skip retrieval"""
+        assert faq_store.FAQ_MATCH_THRESHOLD == 0.9
+
+    def test_match_at_threshold(self, tmp_path, monkeypatch):
+        """A similarity of exactly the threshold is served from the FAQ"""
+        entry, score = self.matcher(tmp_path, monkeypatch, 0.9, threshold=0.9).match("Hostel available?")
+
+        assert entry["answer"] == "Yes, for girls"
+        assert score == 0.9
+
+    def test_below_threshold_is_not_served(self, tmp_path, monkeypatch):
+        """A close but not confident match goes through the normal answer path"""
+        assert self.matcher(tmp_path, monkeypatch, 0.89, threshold=0.9).match("Hostel fees?") is None
+
+    def test_topic_without_faq(self, tmp_path, monkeypatch):
+        """Topics without a FAQ never match and have no version"""
+        monkeypatch.setattr(faq_store, "FAQ_STORE", str(tmp_path))
+
+        assert faq_store.FaqMatcher("MBA", embeddings=None).match("anything") is None
+        assert faq_store.faq_version("MBA") is None
+        assert faq_store.load_faqs("MBA") == []
+
+    def test_batch_results_become_entries(self, tmp_path):
+        """Successful batch_qa.py records are grouped per topic; failed and partial lines are skipped"""
+        answers = tmp_path / "answers.jsonl"
+        answers.write_text(
+            json.dumps({"topic": "MCA", "question": "Fee?", "answer": "Rs. 1,20,000", "sources": []}) + "\n"
+            + json.dumps({"topic": "MCA", "question": "Hostel?", "error": "timeout"}) + "\n"
+            + '{"topic": "MBA", "quest'
+        )
+
+        by_topic = faq_store.entries_from_batch(str(answers))
+
+        assert list(by_topic) == ["MCA"]
+        assert by_topic["MCA"][0]["origin"] == "batch"
+
+    def test_only_the_current_version_is_kept(self, tmp_path, monkeypatch):
+        """A saved FAQ gets a new matcher, which replaces the old one instead of adding to it"""
+        versions = iter([1, 1, 2])
+        created = []
+        monkeypatch.setattr(faq_store, "faq_version", lambda topic: next(versions))
+
+        def matcher(topic, embeddings):
+            created.append(topic)
+            return FakeMatcher()
+
+        matchers = faq_store.FaqMatchers(embeddings=object(), matcher=matcher)
+        for _ in range(3):
+            matchers.match("MCA", "Fee?")
+
+        assert created == ["MCA", "MCA"]
+        assert len(matchers) == 1
+
+    def test_no_match_without_embeddings(self, monkeypatch):
+        """Without an embedding model no matcher is built"""
+        monkeypatch.setattr(faq_store, "faq_version", lambda topic: 1)
+
+        assert faq_store.FaqMatchers(embeddings=None).match("MCA", "Fee?") is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,113 @@
+import os
+import sys
+
+import pytest
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+faiss = pytest.importorskip("faiss")
+np = pytest.importorskip("numpy")
+
+import index_compression
+
+
+def flat_index(count=500, dim=64, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((count, dim)).astype("float32")
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    index = faiss.IndexFlatL2(dim)
+    index.add(vectors)
+    return index
+
+
+class TestIndexCompression:
+    """Test suite for compressed index storage"""
+
+    def setup_method(self):
+        """Build a small normalized float32 index"""
+        self.index = flat_index()
+
+    def test_fp16_keeps_recall_and_halves_size(self):
+        """Half precision is practically lossless"""
+        compressed = index_compression.compress_index(self.index, "fp16", 0)
+
+        report = index_compression.recall_report(self.index, compressed)
+
+        assert report["recall@3"] >= 0.99
+        assert report["size_ratio"] < 0.6
+
+    def test_sq8_quarters_size(self):
+        """8-bit quantization stores a quarter of the bytes with good recall"""
+        compressed = index_compression.compress_index(self.index, "sq8", 0)
+
+        report = index_compression.recall_report(self.index, compressed)
+
+        assert report["size_ratio"] < 0.35
+        assert report["recall@10"] >= 0.8
+
+    def test_pca_reduces_dimensions(self):
+        """PCA output keeps the vector count and order for the docstore mapping"""
+        compressed = index_compression.compress_index(self.index, "sq8", 32)
+
+        assert compressed.ntotal == self.index.ntotal
+        _, found = compressed.search(self.index.reconstruct_n(0, 5), 1)
+        assert (found[:, 0] == np.arange(5)).sum() >= 4
+
+    def test_none_returns_the_same_index(self):
+        """No compression leaves the index untouched"""
+        assert index_compression.compress_index(self.index, "none", 0) is self.index
+
+    def test_compressed_index_is_not_compressed_again(self):
+        """Re-compressing lossy data is refused"""
+        compressed = index_compression.compress_index(self.index, "sq8", 0)
+
+        with pytest.raises(ValueError):
+            index_compression.compress_index(compressed, "fp16", 0)
+
+    def test_pca_needs_enough_vectors(self):
+        """PCA training on too few vectors is rejected with a clear error"""
+        with pytest.raises(ValueError, match="at least"):
+            index_compression.compress_index(flat_index(count=10), "sq8", 32)
+
+    def test_low_recall_keeps_float32(self):
+        """Compression at ingestion time keeps the float32 index when recall is below the threshold"""
+        store = type("Store", (), {"index": self.index})()
+
+        report = index_compression.compress_vector_store(store, "sq8", 0, threshold=1.01)
+
+        assert report["skipped"] == "recall below 1.01"
+        assert store.index is self.index
+
+    def test_sampled_queries_do_not_count_themselves(self):
+        """A stored vector finds itself in both indexes; that hit is left out of recall"""
+        compressed = index_compression.compress_index(self.index, "sq8", 32)
+        queries = self.index.reconstruct_n(0, 200)
+
+        with_self = index_compression.recall_report(self.index, compressed, queries=queries)
+        without_self = index_compression.recall_report(self.index, compressed)
+
+        assert without_self["recall@3"] < with_self["recall@3"] - 0.2
+
+    def test_lossy_pca_falls_below_the_default_threshold(self):
+        """Heavy PCA loses most neighbours and is refused at the default minimum recall"""
+        store = type("Store", (), {"index": self.index})()
+
+        report = index_compression.compress_vector_store(store, "sq8", 32)
+
+        assert index_compression.min_recall(report) < index_compression.MIN_RECALL
+        assert report["skipped"] == f"recall below {index_compression.MIN_RECALL}"
+        assert store.index is self.index
+
+    def test_good_recall_replaces_index(self):
+        """An index that keeps its recall is swapped for the compressed one"""
+        store = type("Store", (), {"index": self.index})()
+
+        report = index_compression.compress_vector_store(store, "fp16", 0, threshold=0.9)
+
+        assert "skipped" not in report
+        assert store.index is not self.index
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,196 @@
+import itertools
+import json
+import os
+import queue
+import sys
+import threading
+
+import pytest
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import ingestion
+import qa_engine
+
+
+class FakeDocument:
+    """Minimal stand-in for a LangChain Document"""
+
+    def __init__(self, page_content, metadata=None):
+        self.page_content = page_content
+        self.metadata = metadata or {}
+
+
+class FakeEmbeddings:
+    """Returns a constant vector per text and can fail on a given call"""
+
+    def __init__(self, fail_on_call=None):
+        self.calls = 0
+        self.fail_on_call = fail_on_call
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        if self.calls == self.fail_on_call:
+            raise RuntimeError("embedding model crashed")
+        return [[1.0, 0.0] for _ in texts]
+
+
+class FakeStore:
+    """Writes a marker file where FAISS would write its index"""
+
+    def __init__(self, marker):
+        self.marker = marker
+
+    def save_local(self, path):
+        os.makedirs(path)
+        with open(os.path.join(path, "index.faiss"), "w") as f:
+            f.write(self.marker)
+
+
+def new_stats():
+    return {"files": 0, "pages": 0, "chunks": 0, "chunk_tokens": [], "duplicate_files": {},
+            "duplicate_chunks": {"exact": 0, "near": 0}, "reused_embeddings": 0}
+
+
+class TestIngestion:
+    """Test suite for the streaming ingestion pipeline"""
+
+    def setup_method(self):
+        self.chunks = [FakeDocument("x" * 10, {"tokens": 3}) for _ in range(7)]
+
+    def test_batches_are_capped_by_count(self):
+        """No batch holds more than batch_size chunks"""
+        batches = list(ingestion.iter_batches(self.chunks, batch_size=3, max_bytes=10 ** 6))
+
+        assert [len(b) for b in batches] == [3, 3, 1]
+
+    def test_batches_are_capped_by_bytes(self):
+        """A batch is closed before its text would exceed max_bytes, but never left empty"""
+        chunks = [FakeDocument("a" * 10), FakeDocument("b" * 10), FakeDocument("c" * 25), FakeDocument("d" * 5)]
+
+        batches = list(ingestion.iter_batches(chunks, batch_size=10, max_bytes=20))
+
+        assert [[c.page_content[0] for c in b] for b in batches] == [["a", "b"], ["c"], ["d"]]
+
+    def test_producer_stops_when_consumer_stops(self):
+        """A producer blocked on a full queue exits once stop is set, without reading further"""
+        produced = []
+
+        def batches():
+            for i in itertools.count():
+                produced.append(i)
+                yield [i]
+
+        out_queue, stop = queue.Queue(maxsize=1), threading.Event()
+        producer = threading.Thread(target=ingestion._produce, args=(batches(), out_queue, stop))
+        producer.start()
+        out_queue.get(timeout=5)
+        stop.set()
+        producer.join(5)
+
+        assert not producer.is_alive()
+        assert len(produced) <= 3
+
+    def test_producer_errors_reach_the_caller(self):
+        """An exception while parsing is raised from build_vector_store"""
+        def batches():
+            yield self.chunks[:2]
+            raise ValueError("broken PDF")
+
+        with pytest.raises(ValueError, match="broken PDF"):
+            ingestion.build_vector_store(batches(), FakeEmbeddings(), new_stats())
+
+    def test_consumer_errors_stop_the_producer(self):
+        """When embedding fails, the producer is stopped instead of parsing the rest"""
+        produced = []
+
+        def batches():
+            for i in itertools.count():
+                produced.append(i)
+                yield self.chunks[:1]
+
+        with pytest.raises(RuntimeError, match="embedding model crashed"):
+            ingestion.build_vector_store(batches(), FakeEmbeddings(fail_on_call=2), new_stats(), queue_batches=1)
+
+        assert len(produced) < 10
+
+    def test_counts_chunks_and_tokens(self):
+        """Every embedded chunk is counted with its token size"""
+        stats = new_stats()
+
+        ingestion.build_vector_store(ingestion.iter_batches(self.chunks, batch_size=3), FakeEmbeddings(), stats)
+
+        assert stats["chunks"] == 7
+        assert stats["chunk_tokens"] == [3] * 7
+
+    def test_empty_input_builds_nothing(self):
+        """Without chunks there is no index"""
+        assert ingestion.build_vector_store(iter([]), FakeEmbeddings(), new_stats()) is None
+
+    def test_new_store_replaces_old_one(self, tmp_path, monkeypatch):
+        """The rebuilt index is swapped in with its report and no staging folders are left behind"""
+        monkeypatch.setattr(qa_engine, "VECTOR_STORES", str(tmp_path))
+        ingestion.save_vector_store(FakeStore("old"), "MCA")
+
+        ingestion.save_vector_store(FakeStore("new"), "MCA", report={"chunks": 7})
+
+        assert (tmp_path / "MCA" / "index.faiss").read_text() == "new"
+        assert json.loads((tmp_path / "MCA" / ingestion.CHUNK_REPORT_FILE).read_text()) == {"chunks": 7}
+        assert sorted(os.listdir(tmp_path)) == ["MCA"]
+
+    def test_leftover_staging_folders_are_cleared(self, tmp_path, monkeypatch):
+        """Folders left by an interrupted save do not block the next one"""
+        monkeypatch.setattr(qa_engine, "VECTOR_STORES", str(tmp_path))
+        (tmp_path / ".MCA.tmp").mkdir()
+        (tmp_path / ".MCA.old").mkdir()
+
+        ingestion.save_vector_store(FakeStore("new"), "MCA")
+
+        assert sorted(os.listdir(tmp_path)) == ["MCA"]
+
+    def test_builds_of_one_category_do_not_overlap(self, tmp_path, monkeypatch):
+        """A second build of a category waits until the first one has swapped its index in"""
+        monkeypatch.setattr(qa_engine, "VECTOR_STORES", str(tmp_path))
+        events, started, release = [], threading.Event(), threading.Event()
+
+        def build(category, *args):
+            events.append(f"start {category}")
+            if len(events) == 1:
+                started.set()
+                release.wait(5)
+            events.append(f"end {category}")
+
+        monkeypatch.setattr(ingestion, "_process_category", build)
+        first = threading.Thread(target=ingestion.process_category, args=("MCA", None))
+        first.start()
+        started.wait(5)
+        second = threading.Thread(target=ingestion.process_category, args=("MCA", None))
+        second.start()
+        second.join(0.2)
+        other = threading.Thread(target=ingestion.process_category, args=("MBA", None))
+        other.start()
+        other.join(5)
+
+        assert events == ["start MCA", "start MBA", "end MBA"]
+        release.set()
+        first.join(5)
+        second.join(5)
+        assert events[3:] == ["end MCA", "start MCA", "end MCA"]
+
+    def test_category_lock_excludes_other_processes(self, tmp_path, monkeypatch):
+        """The lock file is flocked, so a build in another process or pod on the volume waits too"""
+        fcntl = pytest.importorskip("fcntl")
+        monkeypatch.setattr(qa_engine, "VECTOR_STORES", str(tmp_path))
+
+        with ingestion.category_lock("MCA"):
+            with open(tmp_path / ".MCA.lock", "a") as other:
+                with pytest.raises(BlockingIOError):
+                    fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+        with open(tmp_path / ".MCA.lock", "a") as other:
+            fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,53 @@
+import os
+import sys
+
+import pytest
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import load_test
+
+
+def worker(pid, latencies, errors, sessions=10, rss=(100.0, 120.0, 130.0)):
+    return {"pid": pid, "sessions": sessions, "latencies": latencies, "errors": errors,
+            "rss_start_mb": rss[0], "rss_warm_mb": rss[1], "rss_end_mb": rss[2]}
+
+
+class TestLoadTest:
+    """Test suite for combining load test worker results"""
+
+    def setup_method(self):
+        self.workers = [
+            worker(1, {"ask": [0.1, 0.2, 0.3, 0.4, 0.5], "login": [0.05]}, {"ask": ["timeout"]}),
+            worker(2, {"ask": [0.6, 0.7, 0.8, 0.9, 1.0]}, {"ask": ["timeout", "HTTP 500"], "login": ["bad password"]}),
+        ]
+
+    def test_latency_percentiles_span_all_workers(self):
+        """Samples from every process are pooled before percentiles are taken"""
+        ask = load_test.summarize(self.workers, wall_s=10.0)["events"]["ask"]
+
+        assert (ask["ok"], ask["errors"]) == (10, 3)
+        assert ask["p50_ms"] == 500.0 and ask["p90_ms"] == 900.0 and ask["p99_ms"] == 1000.0
+        assert ask["max_ms"] == 1000.0
+        assert ask["throughput_per_s"] == 1.0
+        assert ask["error_rate"] == round(3 / 13, 4)
+        assert ask["sample_errors"] == ["HTTP 500", "timeout"]
+
+    def test_event_kinds_with_only_errors_are_reported(self):
+        """A kind that only failed in one worker still appears with its error rate"""
+        report = load_test.summarize(self.workers, wall_s=10.0)
+
+        assert report["sessions"] == 20
+        assert report["events"]["login"]["error_rate"] == 0.5
+
+    def test_memory_growth_is_measured_after_warm_up(self):
+        """Growth per session is counted from the warm RSS, not the cold start"""
+        process = load_test.summarize(self.workers, wall_s=10.0)["processes"][0]
+
+        assert process["rss_growth_mb"] == 10.0
+        assert process["rss_growth_per_session_mb"] == 1.0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,96 @@
+import os
+import sys
+import urllib.request
+
+import pytest
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import metrics
+
+
+class TestMetrics:
+    """Test suite for the in-process metrics registry"""
+
+    def setup_method(self):
+        """Start every test from empty application metrics"""
+        for metric in (metrics.STAGE_SECONDS, metrics.CACHE_REQUESTS, metrics.LLM_TOKENS):
+            metric.reset()
+
+    def test_counter_increments_per_label_set(self):
+        """Counters keep a separate value for each label combination"""
+        metrics.record_cache("faq", True)
+        metrics.record_cache("faq", True)
+        metrics.record_cache("faq", False)
+
+        assert metrics.CACHE_REQUESTS.value(cache="faq", result="hit") == 2
+        assert metrics.CACHE_REQUESTS.value(cache="faq", result="miss") == 1
+        assert metrics.cache_hit_ratio("faq") == pytest.approx(2 / 3)
+
+    def test_cache_hit_ratio_without_lookups(self):
+        """The hit ratio is zero before any lookup instead of dividing by zero"""
+        assert metrics.cache_hit_ratio("faq") == 0.0
+
+    def test_wrong_labels_are_rejected(self):
+        """Observing with missing or extra labels raises"""
+        with pytest.raises(ValueError):
+            metrics.STAGE_SECONDS.observe(0.1)
+        with pytest.raises(ValueError):
+            metrics.CACHE_REQUESTS.inc(cache="faq")
+
+    def test_histogram_summary_percentiles(self):
+        """Summaries report count, mean and nearest-rank percentiles"""
+        for value in range(1, 101):
+            metrics.STAGE_SECONDS.observe(value / 100.0, stage="search")
+
+        summary = metrics.STAGE_SECONDS.summary()[("search",)]
+
+        assert summary["count"] == 100
+        assert summary["mean"] == pytest.approx(0.505)
+        assert summary["p50"] == pytest.approx(0.5)
+        assert summary["p95"] == pytest.approx(0.95)
+        assert summary["p99"] == pytest.approx(0.99)
+
+    def test_time_stage_records_duration(self):
+        """The timing context manager observes one sample per block"""
+        with metrics.time_stage("embed"):
+            pass
+
+        assert metrics.STAGE_SECONDS.summary()[("embed",)]["count"] == 1
+
+    def test_prometheus_histogram_format(self):
+        """Histogram buckets are cumulative and end with +Inf, _sum and _count"""
+        metrics.STAGE_SECONDS.observe(0.004, stage="llm_total")
+        metrics.STAGE_SECONDS.observe(100.0, stage="llm_total")
+
+        text = metrics.render_prometheus()
+
+        assert "# TYPE chatbot_stage_seconds histogram" in text
+        assert 'chatbot_stage_seconds_bucket{stage="llm_total",le="0.005"} 1' in text
+        assert 'chatbot_stage_seconds_bucket{stage="llm_total",le="60"} 1' in text
+        assert 'chatbot_stage_seconds_bucket{stage="llm_total",le="+Inf"} 2' in text
+        assert 'chatbot_stage_seconds_count{stage="llm_total"} 2' in text
+
+    def test_label_values_are_escaped(self):
+        """Quotes in label values do not break the exposition format"""
+        metrics.LLM_TOKENS.inc(5, model='my"model', direction="in")
+
+        assert 'chatbot_llm_tokens_total{model="my\\"model",direction="in"} 5' in metrics.render_prometheus()
+
+    def test_metrics_server_serves_exposition(self):
+        """The HTTP endpoint returns the same text on /metrics"""
+        metrics.record_cache("faq", True)
+        server = metrics.start_metrics_server(port=0, host="127.0.0.1")
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            with urllib.request.urlopen(url) as response:
+                body = response.read().decode("utf-8")
+        finally:
+            server.shutdown()
+
+        assert 'chatbot_cache_requests_total{cache="faq",result="hit"} 1' in body
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
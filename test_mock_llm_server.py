@@ -0,0 +1,61 @@
+import os
+import sys
+
+import pytest
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+pytest.importorskip("langchain_groq")
+
+import mock_llm_server
+import qa_engine
+from fake_llm import fake_reply_tokens
+
+
+class TestMockLLMServer:
+    """Test suite for the local Groq API mock, read through the real ChatGroq client"""
+
+    def setup_method(self):
+        self.server = mock_llm_server.start_mock_server(first_token_latency=0, tokens_per_second=0, answer_tokens=6)
+        self.prompt = "When does MCA admission open?"
+
+    def teardown_method(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def llm(self, monkeypatch):
+        # The same way the app is pointed at the mock: environment variables read by the Groq client.
+        monkeypatch.setenv("GROQ_API_KEY", "mock")
+        monkeypatch.setenv("GROQ_BASE_URL", self.server.base_url)
+        return qa_engine.create_llm("mock-model")
+
+    def test_completion_is_parsed_by_chatgroq(self, monkeypatch):
+        """A non-streaming reply carries the fake text and token usage"""
+        message = self.llm(monkeypatch).invoke(self.prompt)
+
+        assert message.content == "".join(fake_reply_tokens(self.prompt, 6)).strip()
+        assert message.usage_metadata["output_tokens"] == 6
+        assert self.server.requests_served == 1
+
+    def test_stream_is_parsed_by_chatgroq(self, monkeypatch):
+        """Server-sent events arrive as one chunk per token and end with the usage"""
+        chunks = list(self.llm(monkeypatch).stream(self.prompt))
+        content = [c.content for c in chunks if c.content]
+
+        assert content == fake_reply_tokens(self.prompt, 6)
+        assert any(c.usage_metadata and c.usage_metadata["output_tokens"] == 6 for c in chunks)
+
+    def test_unknown_path_is_not_found(self):
+        """Only the chat completions endpoint is served"""
+        from urllib.error import HTTPError
+        from urllib.request import Request, urlopen
+
+        with pytest.raises(HTTPError) as error:
+            urlopen(Request(f"{self.server.base_url}/openai/v1/embeddings", data=b"{}", method="POST"), timeout=5)
+
+        assert error.value.code == 404
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
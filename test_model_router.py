@@ -0,0 +1,115 @@
+import os
+import sys
+
+import pytest
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import metrics
+import model_router
+import qa_engine
+
+
+class FakeDocument:
+    """Minimal stand-in for a LangChain Document"""
+
+    def __init__(self, page_content, metadata=None):
+        self.page_content = page_content
+        self.metadata = metadata or {}
+
+
+class FakeLLM:
+    """Stand-in model that only carries a name"""
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+
+def chunks(score=0.8, tokens=200, count=2):
+    return [FakeDocument("Tuition fee is Rs. 1,00,000.", {"score": score, "tokens": tokens}) for _ in range(count)]
+
+
+class TestModelRouter:
+    """Test suite for choosing between the small and the large model"""
+
+    def setup_method(self):
+        self.router = model_router.ModelRouter(FakeLLM("small"), FakeLLM("large"))
+
+    def test_simple_lookup_goes_to_small_model(self):
+        """Short question, short confident context: small model"""
+        assert model_router.route("What is the MCA tuition fee?", chunks()) == ("small", "simple_lookup")
+
+    def test_long_context_goes_to_large_model(self):
+        """Long context needs the large model"""
+        assert model_router.route("What is the fee?", chunks(tokens=600))[0] == "large"
+
+    def test_weak_retrieval_goes_to_large_model(self):
+        """A poorly matching best chunk needs the large model"""
+        assert model_router.route("What is the fee?", chunks(score=0.4)) == ("large", "low_confidence_retrieval")
+
+    def test_complex_question_goes_to_large_model(self):
+        """Comparisons and explanations need the large model"""
+        assert model_router.route("Compare the MBA and MCA fees", chunks()) == ("large", "complex_question")
+
+    def test_unsure_small_answer_falls_back(self, monkeypatch):
+        """An unsure answer from the small model is answered again by the large model"""
+        replies = {"small": "I cannot find this information in the provided document.",
+                   "large": "The tuition fee is Rs. 1,00,000 per year."}
+        calls = []
+
+        def fake_generate(llm, question, docs):
+            calls.append(llm.model_name)
+            return replies[llm.model_name]
+
+        monkeypatch.setattr(qa_engine, "generate_answer", fake_generate)
+
+        answer, model = self.router.answer("What is the MCA tuition fee?", chunks())
+
+        assert calls == ["small", "large"]
+        assert (answer, model) == (replies["large"], "large")
+
+    def test_confident_small_answer_is_kept(self, monkeypatch):
+        """A good answer from the small model is returned directly"""
+        monkeypatch.setattr(qa_engine, "generate_answer", lambda llm, q, d: f"{llm.model_name}: Rs. 1,00,000 per year")
+
+        assert self.router.answer("What is the MCA tuition fee?", chunks()) == ("small: Rs. 1,00,000 per year", "small")
+
+    def test_large_model_answer_is_streamed(self, monkeypatch):
+        """Questions for the large model are passed through piece by piece"""
+        monkeypatch.setattr(qa_engine, "stream_answer", lambda llm, q, d: iter([llm.model_name, ": ", "fees differ"]))
+
+        assert list(self.router.stream("Compare the MBA and MCA fees", chunks())) == ["large", ": ", "fees differ"]
+
+    def test_only_the_not_found_reply_is_unsure(self):
+        """Saying a detail is not mentioned is a valid answer; the prompt's fallback reply is not"""
+        assert model_router.looks_unsure(qa_engine.NOT_FOUND_ANSWER)
+        assert model_router.looks_unsure("  ")
+        assert not model_router.looks_unsure("The hostel fee is not mentioned, but tuition is Rs. 1,00,000.")
+        assert not model_router.looks_unsure("Rs. 1,00,000")
+
+    def test_small_model_answer_is_streamed(self, monkeypatch):
+        """Small model pieces are passed on as soon as they cannot be the "cannot find" reply"""
+        monkeypatch.setattr(qa_engine, "stream_answer", lambda llm, q, d: iter(["I", " think", " Rs. 1,00,000"]))
+
+        assert list(self.router.stream("What is the MCA tuition fee?", chunks())) == ["I think", " Rs. 1,00,000"]
+
+    def test_streamed_not_found_reply_falls_back(self, monkeypatch):
+        """A streamed "cannot find" reply from the small model is replaced by the large model's answer"""
+        replies = {"small": ["I cannot find this", " information in the provided document."],
+                   "large": ["Rs. 1,00,000", " per year"]}
+        monkeypatch.setattr(qa_engine, "stream_answer", lambda llm, q, d: iter(replies[llm.model_name]))
+
+        assert list(self.router.stream("What is the MCA tuition fee?", chunks())) == ["Rs. 1,00,000", " per year"]
+
+    def test_no_context_is_not_routed(self, monkeypatch):
+        """Without chunks no model is chosen and no decision is counted"""
+        before = metrics.ROUTER_DECISIONS.value(model="large", reason="no_context")
+
+        assert list(self.router.stream("What is the fee?", [])) == [qa_engine.NOT_FOUND_ANSWER]
+        assert self.router.answer("What is the fee?", []) == (qa_engine.NOT_FOUND_ANSWER, None)
+        assert metrics.ROUTER_DECISIONS.value(model="large", reason="no_context") == before
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,82 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import ocr
+import pdf_extraction
+
+
+class FakeDocument:
+    """Minimal stand-in for a LangChain Document"""
+
+    def __init__(self, page_content, metadata=None):
+        self.page_content = page_content
+        self.metadata = metadata or {}
+
+
+def pages(*texts):
+    return [FakeDocument(text, {"source": "scan.pdf", "file_hash": "cd" * 32, "page": i}) for i, text in enumerate(texts)]
+
+
+TEXT_PAGE = "The MCA programme is a two year course with four semesters and a final project. " * 2
+
+
+class TestOcr:
+    """Test suite for the OCR fallback"""
+
+    def setup_method(self):
+        self.ocr_calls = []
+
+    def patch(self, monkeypatch, tmp_path, available=True):
+        def fake_ocr(path, page_number):
+            self.ocr_calls.append(page_number)
+            return f"Scanned fee table from page {page_number}: tuition Rs. 1,00,000 per year", 0.01
+
+        executor = ThreadPoolExecutor(max_workers=2)
+        monkeypatch.setattr(ocr, "available", lambda: available)
+        monkeypatch.setattr(ocr, "_pool", lambda workers: executor)
+        monkeypatch.setattr(ocr, "ocr_page", fake_ocr)
+        monkeypatch.setattr(ocr, "_ocr_cache", lambda file_hash: pdf_extraction.PageCache(file_hash, "ocr", str(tmp_path)))
+
+    def test_only_low_text_pages_are_ocred(self, monkeypatch, tmp_path):
+        """Text pages pass through untouched and page order is kept"""
+        self.patch(monkeypatch, tmp_path)
+        stats = {}
+
+        result = list(ocr.fill_low_text_pages(pages(TEXT_PAGE, "", TEXT_PAGE, "  3 "), stats))
+
+        assert self.ocr_calls == [1, 3]
+        assert [page.metadata["page"] for page in result] == [0, 1, 2, 3]
+        assert result[0].page_content == TEXT_PAGE
+        assert result[1].page_content.startswith("Scanned fee table from page 1") and result[1].metadata["ocr"]
+        assert (stats["low_text_pages"], stats["ocr_pages"]) == (2, 2)
+
+    def test_ocr_results_are_cached(self, monkeypatch, tmp_path):
+        """Re-processing the same document does not OCR again"""
+        self.patch(monkeypatch, tmp_path)
+        list(ocr.fill_low_text_pages(pages("", ""), {}))
+
+        again = list(ocr.fill_low_text_pages(pages("", ""), {}))
+
+        assert self.ocr_calls == [0, 1]
+        assert again[1].page_content.startswith("Scanned fee table from page 1")
+
+    def test_without_ocr_engine_pages_are_counted(self, monkeypatch, tmp_path):
+        """Low-text pages are reported but left as they are when OCR is not installed"""
+        self.patch(monkeypatch, tmp_path, available=False)
+        stats = {}
+
+        result = list(ocr.fill_low_text_pages(pages("", TEXT_PAGE), stats))
+
+        assert [page.page_content for page in result] == ["", TEXT_PAGE]
+        assert (stats["low_text_pages"], stats["ocr_pages"]) == (1, 0)
+        assert self.ocr_calls == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,175 @@
+import functools
+import os
+import sys
+
+import pytest
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pdf_extraction
+
+
+class FakeDocument:
+    """Minimal stand-in for a LangChain Document"""
+
+    def __init__(self, page_content, metadata=None):
+        self.page_content = page_content
+        self.metadata = metadata or {}
+
+
+class FakeBackend:
+    """Serves page texts from a list and records which pages were parsed"""
+    name = "fake"
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.opened = 0
+        self.extracted = []
+
+    def open(self, path):
+        self.opened += 1
+        return self.texts
+
+    def page_count(self, doc):
+        return len(doc)
+
+    def extract(self, doc, page_number):
+        self.extracted.append(page_number)
+        return doc[page_number]
+
+    def close(self, doc):
+        pass
+
+
+class FakeTable:
+    def __init__(self, bbox, rows):
+        self.bbox = bbox
+        self.rows = rows
+
+    def extract(self):
+        return self.rows
+
+
+class FakePage:
+    """A page with one text block above a table and one inside it"""
+
+    def __init__(self, tables):
+        self.tables = tables
+
+    def find_tables(self):
+        return type("Tables", (), {"tables": self.tables})()
+
+    def get_text(self, mode, sort=False):
+        if mode == "text":
+            return "plain text"
+        return [
+            (0, 10, 100, 20, "Fee structure\n", 0, 0),
+            (0, 60, 100, 70, "MCA 120000\n", 1, 0),
+            (0, 200, 100, 210, "Subject to change\n", 2, 0),
+        ]
+
+
+class TestPdfExtraction:
+    """Test suite for extraction backends and the page cache"""
+
+    def setup_method(self):
+        self.file_hash = "ab" + "0" * 62
+
+    def use_backend(self, monkeypatch, backend, tmp_path):
+        monkeypatch.setitem(pdf_extraction.BACKENDS, backend.name, backend)
+        monkeypatch.setattr(pdf_extraction, "Document", FakeDocument)
+        monkeypatch.setattr(pdf_extraction, "PageCache", functools.partial(pdf_extraction.PageCache, cache_dir=str(tmp_path)))
+
+    def test_page_cache_round_trip(self, tmp_path):
+        """Pages and the page count survive reopening the cache"""
+        cache = pdf_extraction.PageCache(self.file_hash, "pypdf", cache_dir=str(tmp_path))
+        cache.set_page_count(2)
+        cache.add(0, "first page")
+        assert not cache.complete
+        cache.add(1, "second page")
+
+        reopened = pdf_extraction.PageCache(self.file_hash, "pypdf", cache_dir=str(tmp_path))
+
+        assert reopened.complete
+        assert reopened.pages == {0: "first page", 1: "second page"}
+
+    def test_page_cache_skips_truncated_line(self, tmp_path):
+        """A line cut short by an interrupted run only loses that page"""
+        cache = pdf_extraction.PageCache(self.file_hash, "pypdf", cache_dir=str(tmp_path))
+        cache.set_page_count(2)
+        cache.add(0, "first page")
+        with open(cache.path, "a", encoding="utf-8") as f:
+            f.write('{"page": 1, "te')
+
+        reopened = pdf_extraction.PageCache(self.file_hash, "pypdf", cache_dir=str(tmp_path))
+
+        assert reopened.pages == {0: "first page"}
+        assert not reopened.complete
+
+    def test_cache_is_per_backend(self, tmp_path):
+        """Text from one backend is never served for another"""
+        pdf_extraction.PageCache(self.file_hash, "pypdf", cache_dir=str(tmp_path)).add(0, "pypdf text")
+
+        assert pdf_extraction.PageCache(self.file_hash, "pymupdf", cache_dir=str(tmp_path)).pages == {}
+
+    def test_only_missing_pages_are_parsed(self, tmp_path, monkeypatch):
+        """A partly cached file parses the remaining pages; a complete one is not opened"""
+        backend = FakeBackend(["one", "two", "three"])
+        self.use_backend(monkeypatch, backend, tmp_path)
+        cache = pdf_extraction.PageCache(self.file_hash, "fake", cache_dir=str(tmp_path))
+        cache.set_page_count(3)
+        cache.add(0, "one")
+
+        pages = list(pdf_extraction.iter_pages("brochure.pdf", backend="fake", file_hash=self.file_hash))
+        assert [p.page_content for p in pages] == ["one", "two", "three"]
+        assert [p.metadata["page"] for p in pages] == [0, 1, 2]
+        assert backend.extracted == [1, 2]
+
+        list(pdf_extraction.iter_pages("renamed.pdf", backend="fake", file_hash=self.file_hash))
+        assert backend.opened == 1
+
+    def test_without_cache_every_page_is_parsed(self, tmp_path, monkeypatch):
+        """use_cache=False neither reads nor writes the cache"""
+        backend = FakeBackend(["one", "two"])
+        self.use_backend(monkeypatch, backend, tmp_path)
+
+        list(pdf_extraction.iter_pages("brochure.pdf", backend="fake", use_cache=False, file_hash=self.file_hash))
+
+        assert backend.extracted == [0, 1]
+        assert os.listdir(tmp_path) == []
+
+    def test_unknown_backend(self):
+        """A misspelt backend name lists the valid ones"""
+        with pytest.raises(ValueError, match="pymupdf-tables"):
+            pdf_extraction.get_backend("pdfminer")
+
+    def test_file_hash_matches_content(self, tmp_path):
+        """Copies of a file hash the same, whatever their name"""
+        (tmp_path / "a.pdf").write_bytes(b"%PDF-1.4 same bytes")
+        (tmp_path / "b.pdf").write_bytes(b"%PDF-1.4 same bytes")
+
+        assert pdf_extraction.file_sha256(str(tmp_path / "a.pdf")) == pdf_extraction.file_sha256(str(tmp_path / "b.pdf"))
+
+    def test_table_rows_are_one_line_each(self):
+        """Cells are joined with pipes, inner whitespace is collapsed and empty rows dropped"""
+        rows = [["Course", "Fee"], ["MCA", " 1,20,000\n per year"], [None, ""]]
+
+        assert pdf_extraction.format_table_rows(rows) == "| Course | Fee |\n| MCA | 1,20,000 per year |"
+
+    def test_tables_keep_reading_order(self):
+        """Text inside a table is replaced by its rows, placed where the table starts"""
+        backend = pdf_extraction.PyMuPDFTableBackend()
+        page = FakePage([FakeTable((0, 50, 100, 100), [["Course", "Fee"], ["MCA", "120000"]])])
+
+        text = backend.extract([page], 0)
+
+        assert text == "Fee structure\n\n| Course | Fee |\n| MCA | 120000 |\n\nSubject to change"
+
+    def test_page_without_tables_uses_plain_text(self):
+        """Pages without tables are extracted like the pymupdf backend"""
+        assert pdf_extraction.PyMuPDFTableBackend().extract([FakePage([])], 0) == "plain text"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
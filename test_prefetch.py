@@ -0,0 +1,87 @@
+import os
+import sys
+import threading
+
+import pytest
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import prefetch
+import qa_engine
+
+
+class FakeEmbeddings:
+    """Stand-in embedding model returning a fixed vector"""
+
+    def embed_query(self, text):
+        return [1.0, 0.0]
+
+
+class TestTopicPrefetcher:
+    """Test suite for background index loading"""
+
+    def setup_method(self):
+        self.versions = {"MCA": 1, "MBA": 1}
+        self.loads = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def patch(self, monkeypatch):
+        def fake_load(topic, embeddings):
+            self.release.wait(5)
+            self.loads.append(topic)
+            return f"store:{topic}"
+
+        monkeypatch.setattr(qa_engine, "index_version", lambda topic: self.versions[topic])
+        monkeypatch.setattr(qa_engine, "load_vector_store", fake_load)
+        monkeypatch.setattr(qa_engine, "search_vector", lambda store, vector, k=None: [store])
+
+    def test_prefetch_does_not_block(self, monkeypatch):
+        """Selecting a topic returns before its index has loaded"""
+        self.patch(monkeypatch)
+        self.release.clear()
+        prefetcher = prefetch.TopicPrefetcher(FakeEmbeddings())
+
+        _, load = prefetcher.prefetch("MCA")
+        assert not load.done()
+
+        self.release.set()
+        assert prefetcher.retrieve("MCA", "What is the fee?") == (["store:MCA"], 1)
+
+    def test_index_is_loaded_once(self, monkeypatch):
+        """Repeated selections and questions reuse the same load"""
+        self.patch(monkeypatch)
+        prefetcher = prefetch.TopicPrefetcher(FakeEmbeddings())
+
+        prefetcher.prefetch("MCA")
+        prefetcher.retrieve("MCA", "What is the fee?")
+        prefetcher.retrieve("MCA", "Is there a hostel?")
+
+        assert self.loads == ["MCA"]
+
+    def test_rebuilt_index_is_reloaded(self, monkeypatch):
+        """A new index version is loaded again and reported with the answer"""
+        self.patch(monkeypatch)
+        prefetcher = prefetch.TopicPrefetcher(FakeEmbeddings())
+        prefetcher.retrieve("MCA", "What is the fee?")
+
+        self.versions["MCA"] = 2
+
+        assert prefetcher.retrieve("MCA", "What is the fee?")[1] == 2
+        assert self.loads == ["MCA", "MCA"]
+
+    def test_least_recently_used_topic_is_dropped(self, monkeypatch):
+        """Only max_topics indexes are kept"""
+        self.patch(monkeypatch)
+        prefetcher = prefetch.TopicPrefetcher(FakeEmbeddings(), max_topics=1)
+
+        prefetcher.retrieve("MCA", "What is the fee?")
+        prefetcher.retrieve("MBA", "What is the fee?")
+        prefetcher.retrieve("MCA", "What is the fee?")
+
+        assert self.loads == ["MCA", "MBA", "MCA"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
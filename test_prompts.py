@@ -0,0 +1,54 @@
+import os
+import sys
+
+import pytest
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import prompts
+
+
+class TestPrompts:
+    """Test suite for the prompt registry"""
+
+    def test_qa_prompt_takes_context_and_input(self):
+        """Every registered QA version accepts the same variables"""
+        for version in ("1", "2"):
+            assert set(prompts.get_prompt("qa", version).template.input_variables) == {"context", "input"}
+
+    def test_system_prefix_is_identical_across_requests(self):
+        """The system message does not depend on the context or the question"""
+        template = prompts.get_prompt("qa", "2").template
+
+        first = template.format_messages(context="Fees: Rs. 1,00,000", input="What is the fee?")
+        second = template.format_messages(context="Hostel: 2 per room", input="How many per room?")
+
+        assert first[0].type == "system"
+        assert first[0].content.encode("utf-8") == second[0].content.encode("utf-8")
+        assert first[0].content == prompts.get_prompt("qa", "2").prefix()
+
+    def test_new_layout_is_slimmer(self):
+        """The chat layout sends fewer fixed tokens than the original prompt"""
+        assert prompts.get_prompt("qa", "2").fixed_tokens() < prompts.get_prompt("qa", "1").fixed_tokens()
+
+    def test_prefix_hash_is_stable(self):
+        """The fingerprint of the stable prefix only changes with the template"""
+        assert prompts.get_prompt("qa", "2").prefix_hash() == prompts.get_prompt("qa", "2").prefix_hash()
+        assert prompts.get_prompt("qa", "2").prefix_hash() != prompts.get_prompt("qa", "1").prefix_hash()
+
+    def test_unknown_version_lists_registered_ones(self):
+        """Asking for a missing version names the available versions"""
+        with pytest.raises(ValueError, match="1, 2"):
+            prompts.get_prompt("qa", "9")
+
+    def test_report_covers_every_template(self):
+        """The report lists each registered template once and marks the active QA version"""
+        report = {row["prompt"]: row for row in prompts.prompt_report()}
+
+        assert {"qa/v1", "qa/v2", "faq_generation/v1"} <= set(report)
+        assert report[f"qa/v{prompts.ACTIVE_VERSIONS['qa']}"]["active"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,114 @@
+import os
+import sys
+
+import pytest
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import qa_engine
+
+
+class FakeDocument:
+    """Minimal stand-in for a LangChain Document"""
+
+    def __init__(self, page_content, metadata=None):
+        self.page_content = page_content
+        self.metadata = metadata or {}
+
+
+def scored(*similarities, tokens=100):
+    """Builds (doc, squared L2 distance) pairs from cosine similarities, best first"""
+    return [(FakeDocument(f"chunk{i}", {"tokens": tokens}), 2.0 * (1.0 - s)) for i, s in enumerate(similarities)]
+
+
+def names(docs):
+    return [doc.page_content for doc in docs]
+
+
+class TestDynamicK:
+    """Test suite for score-aware chunk selection"""
+
+    def test_similarity_from_distance(self):
+        """Squared L2 distance of unit vectors converts back to cosine similarity"""
+        assert qa_engine.similarity(0.0) == 1.0
+        assert qa_engine.similarity(2.0) == 0.0
+
+    def test_nothing_relevant_returns_no_chunks(self):
+        """If the best chunk is below the threshold, nothing is returned"""
+        docs = qa_engine.select_chunks(scored(0.2, 0.1), min_similarity=0.35)
+
+        assert docs == []
+
+    def test_stops_at_score_gap(self):
+        """A sharp drop in similarity ends the selection"""
+        docs = qa_engine.select_chunks(scored(0.8, 0.78, 0.5, 0.49), min_k=1, gap=0.1, min_similarity=0.3)
+
+        assert names(docs) == ["chunk0", "chunk1"]
+
+    def test_stops_below_threshold(self):
+        """Chunks below the similarity floor are left out"""
+        docs = qa_engine.select_chunks(scored(0.6, 0.55, 0.5, 0.3), min_k=1, gap=1.0, min_similarity=0.45)
+
+        assert names(docs) == ["chunk0", "chunk1", "chunk2"]
+
+    def test_min_k_is_kept_when_the_best_chunk_is_relevant(self):
+        """Up to min_k chunks are kept even past the gap and threshold"""
+        docs = qa_engine.select_chunks(scored(0.8, 0.3, 0.2), min_k=2, gap=0.1, min_similarity=0.35)
+
+        assert names(docs) == ["chunk0", "chunk1"]
+
+    def test_max_k_and_token_budget(self):
+        """Selection never exceeds max_k chunks or the token budget"""
+        many = scored(0.9, 0.89, 0.88, 0.87, 0.86, 0.85, 0.84)
+
+        assert len(qa_engine.select_chunks(many, max_k=4, gap=1.0, token_budget=10000)) == 4
+        assert len(qa_engine.select_chunks(many, max_k=10, gap=1.0, token_budget=250)) == 2
+
+    def test_generate_answer_skips_llm_without_context(self):
+        """With no chunks the fixed answer is returned and the LLM is never called"""
+        class ExplodingLLM:
+            def stream(self, prompt):
+                raise AssertionError("LLM must not be called")
+
+        assert qa_engine.generate_answer(ExplodingLLM(), "What is the hostel fee?", []) == qa_engine.NOT_FOUND_ANSWER
+
+
+
+class TestMemoryMappedIndex:
+    """Test suite for opening indexes with their vectors mapped from the file"""
+
+    def write_index(self, folder, factory):
+        faiss = pytest.importorskip("faiss")
+        np = pytest.importorskip("numpy")
+        vectors = np.random.default_rng(0).standard_normal((2000, 64)).astype("float32")
+        index = faiss.index_factory(64, factory)
+        index.train(vectors)
+        index.add(vectors)
+        path = str(folder / "index.faiss")
+        faiss.write_index(index, path)
+        return path, index, vectors[:5]
+
+    @pytest.mark.parametrize("factory", ["Flat", "SQ8", "PCA32,SQ8"])
+    def test_mmap_search_matches_a_normal_load(self, tmp_path, factory):
+        """A mapped index returns the same neighbours as one read into memory"""
+        path, index, queries = self.write_index(tmp_path, factory)
+
+        mapped = qa_engine.read_index_mmap(path)
+
+        assert (mapped.search(queries, 5)[1] == index.search(queries, 5)[1]).all()
+
+    @pytest.mark.skipif(not os.path.exists("/proc/self/maps"), reason="needs /proc")
+    def test_flat_vectors_are_mapped_from_the_file(self, tmp_path):
+        """The vectors stay in the file's pages, which every worker shares, instead of a private copy"""
+        path, _, _ = self.write_index(tmp_path, "Flat")
+
+        mapped = qa_engine.read_index_mmap(path)
+
+        with open("/proc/self/maps") as f:
+            assert path in f.read()
+        assert mapped.ntotal == 2000
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,156 @@
+import multiprocessing
+import os
+import sys
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import pytest
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import metrics
+import qa_engine
+import retrieval_pool
+
+
+class FakeExecutor:
+    """Runs submitted calls in this process and records how the pool was created"""
+    created = []
+
+    def __init__(self, max_workers, mp_context, initializer, initargs):
+        self.mp_context = mp_context
+        self.initargs = initargs
+        FakeExecutor.created.append(self)
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+class FakeEmbeddings:
+    def embed_query(self, text):
+        return [1.0, 0.0]
+
+
+class TestRetrievalPool:
+    """Test suite for the retrieval worker pool"""
+
+    def setup_method(self):
+        FakeExecutor.created = []
+        self.loads = []
+
+    def patch(self, monkeypatch, version=1):
+        state = {"version": version}
+
+        def load_vector_store(topic, embeddings, mmap=False):
+            self.loads.append((topic, mmap))
+            return f"{topic} index v{state['version']}"
+
+        monkeypatch.setattr(retrieval_pool, "ProcessPoolExecutor", FakeExecutor)
+        monkeypatch.setattr(retrieval_pool, "_embeddings", FakeEmbeddings())
+        monkeypatch.setattr(retrieval_pool, "_stores", {})
+        monkeypatch.setattr(qa_engine, "index_version", lambda topic: state["version"])
+        monkeypatch.setattr(qa_engine, "load_vector_store", load_vector_store)
+        monkeypatch.setattr(qa_engine, "search_vector", lambda store, vector, k: [f"chunk from {store}"])
+        return state
+
+    def test_workers_are_not_forked(self, monkeypatch):
+        """Workers start from forkserver or spawn, never a fork of the threaded server"""
+        self.patch(monkeypatch)
+
+        retrieval_pool.RetrievalPool(workers=2, threads=1)
+
+        assert FakeExecutor.created[0].mp_context.get_start_method() in ("forkserver", "spawn")
+
+    @pytest.mark.skipif("forkserver" not in multiprocessing.get_all_start_methods(), reason="needs forkserver")
+    def test_forkserver_preloads_the_model(self, monkeypatch):
+        """The forkserver imports the preload module, so workers fork with the model already loaded"""
+        from multiprocessing import forkserver
+        self.patch(monkeypatch)
+        monkeypatch.setattr(forkserver._forkserver, "_preload_modules", [])
+
+        retrieval_pool.RetrievalPool(workers=1)
+
+        assert forkserver._forkserver._preload_modules == ["retrieval_preload"]
+
+    def test_preloaded_model_is_not_loaded_again(self, monkeypatch):
+        """A worker forked with the model already in memory keeps it"""
+        model = FakeEmbeddings()
+        monkeypatch.setattr(retrieval_pool, "_embeddings", model)
+        monkeypatch.setattr(retrieval_pool, "_limit_threads", lambda threads: None)
+        monkeypatch.setattr(qa_engine, "create_embeddings", lambda: pytest.fail("model loaded twice"))
+
+        retrieval_pool.preload_model()
+        retrieval_pool._init_worker(1)
+
+        assert retrieval_pool._embeddings is model
+
+    def test_worker_memory_is_reported(self, monkeypatch):
+        """Each worker's resident and proportional memory is recorded at start-up and after every question"""
+        self.patch(monkeypatch)
+        pool = retrieval_pool.RetrievalPool(workers=1)
+
+        pool.retrieve("MCA", "What is the fee?")
+
+        memory = pool.worker_memory()
+        assert list(memory) == [os.getpid()]
+        assert memory[os.getpid()]["rss"] > 0
+        assert metrics.RETRIEVAL_WORKER_RSS_BYTES.value(worker=str(os.getpid())) == memory[os.getpid()]["rss"]
+        if memory[os.getpid()]["pss"] is not None:
+            assert metrics.RETRIEVAL_WORKER_PSS_BYTES.value(worker=str(os.getpid())) == memory[os.getpid()]["pss"]
+
+    def test_retrieve_records_worker_timings(self, monkeypatch):
+        """Stages timed in the worker are recorded in this process's metrics"""
+        self.patch(monkeypatch)
+        pool = retrieval_pool.RetrievalPool(workers=1)
+        before = metrics.STAGE_SECONDS.summary().get(("search",), {}).get("count", 0)
+
+        docs = pool.retrieve("MCA", "What is the fee?")
+
+        assert docs == ["chunk from MCA index v1"]
+        assert metrics.STAGE_SECONDS.summary()[("search",)]["count"] == before + 1
+
+    def test_index_is_reopened_after_rebuild(self, monkeypatch):
+        """A worker keeps a topic's index until its version changes"""
+        state = self.patch(monkeypatch)
+        pool = retrieval_pool.RetrievalPool(workers=1)
+        pool.retrieve("MCA", "first")
+        pool.retrieve("MCA", "second")
+        assert self.loads == [("MCA", True)]
+
+        state["version"] = 2
+
+        assert pool.retrieve("MCA", "third") == ["chunk from MCA index v2"]
+        assert self.loads == [("MCA", True), ("MCA", True)]
+
+    def test_no_workers_means_no_pool(self):
+        """RETRIEVAL_WORKERS=0 keeps retrieval in the Streamlit process"""
+        assert retrieval_pool.create_pool(workers=0) is None
+
+    def test_worker_functions_run_in_a_started_process(self):
+        """The pool's start method can run the worker functions in a separate process"""
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            pid, memory = executor.submit(retrieval_pool._ping).result(timeout=60)
+
+        assert pid != os.getpid() and memory["rss"] > 0
+
+    def test_rss_is_measured(self):
+        """The worker's resident memory is read from the OS"""
+        assert retrieval_pool._rss_bytes() > 1024 * 1024
+
+    @pytest.mark.skipif(not os.path.exists("/proc/self/smaps_rollup"), reason="needs Linux smaps_rollup")
+    def test_pss_is_measured(self):
+        """Proportional memory is read from smaps_rollup and never exceeds resident memory"""
+        pss = retrieval_pool._pss_bytes()
+
+        assert 0 < pss <= retrieval_pool._rss_bytes()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,82 @@
+import os
+import sys
+
+import pytest
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import chat_store
+import sessions
+
+
+class TestSessions:
+    """Test suite for bounded chat histories and idle-session eviction"""
+
+    def setup_method(self):
+        self.session_id = "a" * 32
+        self.conversation = f"{self.session_id}:MCA"
+
+    def test_history_keeps_only_recent_messages_in_memory(self, tmp_path):
+        """Older messages stay in the store and can be read back"""
+        history = sessions.ChatHistory(chat_store.ChatStore(str(tmp_path / "chat.sqlite3")), max_messages=4)
+
+        for i in range(10):
+            history.append(self.conversation, "user", f"question {i}")
+
+        assert [m["content"] for m in history.latest(self.conversation, 4)] == [f"question {i}" for i in range(6, 10)]
+        assert history.messages_in_memory == 4 and history.spilled == 6
+        assert [m["content"] for m in history.older(self.conversation, limit=2)] == ["question 4", "question 5"]
+        assert [m["content"] for m in history.latest(self.conversation, 7)] == [f"question {i}" for i in range(3, 10)]
+
+    def test_evicted_session_resumes_from_store(self, tmp_path):
+        """A session dropped from memory gets its recent messages back when it returns"""
+        store = chat_store.ChatStore(str(tmp_path / "chat.sqlite3"))
+        registry = sessions.SessionRegistry(idle_seconds=0, store=store, max_messages=3)
+        history = registry.touch(self.session_id)
+        for i in range(5):
+            history.append(self.conversation, "user", f"question {i}")
+
+        assert registry.evict_idle(idle_seconds=-1) == 1
+        assert history.messages_in_memory == 0
+
+        resumed = registry.touch(self.session_id)
+        assert [m["content"] for m in resumed.latest(self.conversation, 3)] == ["question 2", "question 3", "question 4"]
+        assert resumed.messages_in_memory == 3 and resumed.spilled == 2
+
+    def test_topics_have_separate_conversations(self, tmp_path):
+        """Two tabs of one session on different topics each write to their own conversation"""
+        history = sessions.ChatHistory(chat_store.ChatStore(str(tmp_path / "chat.sqlite3")))
+        mba = f"{self.session_id}:MBA"
+        history.latest(self.conversation, 10)
+        history.latest(mba, 10)
+
+        history.append(self.conversation, "user", "question about MCA")
+        history.append(mba, "user", "question about MBA")
+
+        assert [m["content"] for m in history.latest(self.conversation, 10)] == ["question about MCA"]
+        assert [m["content"] for m in history.latest(mba, 10)] == ["question about MBA"]
+        assert history.total(mba) == 1
+
+    def test_active_sessions_are_not_evicted(self, tmp_path):
+        """Only sessions idle for longer than the limit are dropped"""
+        registry = sessions.SessionRegistry(idle_seconds=3600, store=chat_store.ChatStore(str(tmp_path / "c.db")))
+        registry.touch(self.session_id)
+
+        assert registry.evict_idle() == 0
+        assert len(registry.report()) == 1
+
+    def test_report_accounts_session_memory(self, tmp_path):
+        """The memory view measures both chat history and session state"""
+        registry = sessions.SessionRegistry(store=chat_store.ChatStore(str(tmp_path / "chat.sqlite3")))
+        history = registry.touch(self.session_id)
+        history.append(self.conversation, "assistant", "x" * 5000)
+        registry.touch(self.session_id, {"active_topic": "MCA", "session_id": self.session_id})
+
+        row, = registry.report()
+        assert row["history KB"] > 4 and row["session state KB"] > 0
+        assert row["topic"] == "MCA"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
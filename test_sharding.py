@@ -0,0 +1,78 @@
+import os
+import sys
+
+import pytest
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import sharding
+
+
+class FakeShard:
+    """Stand-in for a FAISS store returning fixed (doc, distance) pairs"""
+
+    def __init__(self, pairs):
+        self.pairs = pairs
+        self.embedding_function = None
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4):
+        return sorted(self.pairs, key=lambda pair: pair[1])[:k]
+
+
+def manifest(files_by_shard, strategy="document"):
+    return {
+        "strategy": strategy,
+        "shard_count": len(files_by_shard),
+        "settings": {"extraction": "pypdf", "chunking": "structure", "dedup": True},
+        "shards": {str(i): {"files": files, "chunks": 10} for i, files in enumerate(files_by_shard)},
+    }
+
+
+class TestSharding:
+    """Test suite for index sharding"""
+
+    def test_fan_out_merges_top_k_by_distance(self):
+        """Results from all shards are merged and the closest k are kept"""
+        store = sharding.ShardedVectorStore([
+            FakeShard([("a1", 0.9), ("a2", 0.1)]),
+            FakeShard([("b1", 0.5), ("b2", 0.05)]),
+        ], embedding_function=None)
+
+        assert store.similarity_search_by_vector([0.0], k=3) == ["b2", "a2", "b1"]
+
+    def test_file_assignment_is_stable(self):
+        """The same file always lands in the same shard, wherever it is stored"""
+        paths = [f"document_library/MCA/notice_{i}.pdf" for i in range(20)]
+
+        first = sharding.assign_files(paths, 4)
+        second = sharding.assign_files([p.replace("document_library", "/mnt/other") for p in paths], 4)
+
+        assert [len(v) for v in first.values()] == [len(v) for v in second.values()]
+        assert sum(len(v) for v in first.values()) == 20
+        assert sharding.shard_for_file(paths[0], 4) == sharding.shard_for_file("x/notice_0.pdf", 4)
+
+    def test_only_changed_shards_are_rebuilt(self):
+        """Shards whose files and hashes are unchanged are reused"""
+        previous = manifest([{"a.pdf": "h1"}, {"b.pdf": "h2"}, {"c.pdf": "h3"}])
+        current = manifest([{"a.pdf": "h1"}, {"b.pdf": "changed"}, {"c.pdf": "h3", "d.pdf": "h4"}])
+
+        assert sharding.reusable_shards(previous, current) == {0}
+
+    def test_changed_settings_rebuild_everything(self):
+        """A different chunking strategy invalidates every shard"""
+        previous = manifest([{"a.pdf": "h1"}, {"b.pdf": "h2"}])
+        current = manifest([{"a.pdf": "h1"}, {"b.pdf": "h2"}])
+        current["settings"]["chunking"] = "recursive"
+
+        assert sharding.reusable_shards(previous, current) == set()
+
+    def test_hash_sharding_never_reuses(self):
+        """Hash sharding spreads every file over all shards, so nothing can be reused"""
+        previous = manifest([{}, {}], strategy="hash")
+
+        assert sharding.reusable_shards(previous, manifest([{}, {}], strategy="hash")) == set()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,162 @@
+import io
+import os
+import sys
+
+import pytest
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import index_compression
+import ingestion
+import qa_engine
+import uploads
+
+PDF = b"%PDF-1.4\n1 0 obj\n<< /Type /Catalog >>\nendobj\ntrailer\n<< /Root 1 0 R >>\n%%EOF\n"
+
+
+class FakeUpload(io.BytesIO):
+    """Stand-in for Streamlit's UploadedFile"""
+
+    def __init__(self, name, data):
+        super().__init__(data)
+        self.name = name
+
+
+class TestUploads:
+    """Test suite for streaming uploads into the document library"""
+
+    def setup_method(self):
+        self.calls = []
+
+    def library(self, tmp_path, *categories):
+        for category in categories:
+            (tmp_path / category).mkdir()
+        self.blob_dir = str(tmp_path / ".blobs")
+        return str(tmp_path)
+
+    def test_valid_pdf_is_saved(self, tmp_path):
+        """A new PDF is written to the category and nothing temporary is left behind"""
+        root = self.library(tmp_path, "MCA")
+
+        result, = uploads.save_uploads([FakeUpload("fees.pdf", PDF)], "MCA", root=root, blob_dir=self.blob_dir)
+
+        assert result["status"] == "saved" and result["bytes"] == len(PDF)
+        assert os.listdir(os.path.join(root, "MCA")) == ["fees.pdf"]
+        assert (tmp_path / "MCA" / "fees.pdf").read_bytes() == PDF
+
+    def test_document_in_other_category_is_linked(self, tmp_path):
+        """The same content in another category is added as a reference to the stored copy"""
+        root = self.library(tmp_path, "MCA", "MBA")
+        uploads.save_uploads([FakeUpload("fees.pdf", PDF)], "MCA", root=root, blob_dir=self.blob_dir)
+
+        result, = uploads.save_uploads([FakeUpload("copy.pdf", PDF)], "MBA", root=root, blob_dir=self.blob_dir)
+
+        assert result["status"] == "linked"
+        assert result["duplicate_of"] == "MCA/fees.pdf"
+        assert os.path.samefile(tmp_path / "MCA" / "fees.pdf", tmp_path / "MBA" / "copy.pdf")
+
+    def test_duplicate_in_same_category_is_skipped(self, tmp_path):
+        """Uploading a document the category already has adds nothing"""
+        root = self.library(tmp_path, "MCA")
+        uploads.save_uploads([FakeUpload("fees.pdf", PDF)], "MCA", root=root, blob_dir=self.blob_dir)
+
+        result, = uploads.save_uploads([FakeUpload("fees (1).pdf", PDF)], "MCA", root=root, blob_dir=self.blob_dir)
+
+        assert result["status"] == "duplicate"
+        assert os.listdir(os.path.join(root, "MCA")) == ["fees.pdf"]
+
+    def test_non_pdf_is_rejected(self, tmp_path):
+        """Files without a PDF header or end-of-file marker are rejected"""
+        root = self.library(tmp_path, "MCA")
+
+        bad_header, truncated = uploads.save_uploads(
+            [FakeUpload("notes.pdf", b"hello"), FakeUpload("cut.pdf", PDF[:40])], "MCA", root=root,
+            blob_dir=self.blob_dir)
+
+        assert bad_header["status"] == truncated["status"] == "rejected"
+        assert "truncated" in truncated["error"]
+        assert os.listdir(os.path.join(root, "MCA")) == []
+
+    def test_oversized_upload_is_rejected(self, tmp_path):
+        """Writing stops once the size limit is passed"""
+        root = self.library(tmp_path, "MCA")
+        data = PDF + b"0" * (2 * 1024 * 1024)
+
+        result, = uploads.save_uploads([FakeUpload("scan.pdf", data)], "MCA", root=root, max_mb=1,
+                                       blob_dir=self.blob_dir)
+
+        assert result["status"] == "rejected" and "limit" in result["error"]
+        assert os.listdir(os.path.join(root, "MCA")) == []
+
+    def test_different_file_with_same_name_is_rejected(self, tmp_path):
+        """An upload never replaces a different document of the same name"""
+        root = self.library(tmp_path, "MCA")
+        uploads.save_uploads([FakeUpload("fees.pdf", PDF)], "MCA", root=root, blob_dir=self.blob_dir)
+        updated = PDF.replace(b"Catalog", b"Catalog /Version 2")
+
+        result, = uploads.save_uploads([FakeUpload("fees.pdf", updated)], "MCA", root=root, blob_dir=self.blob_dir)
+
+        assert result["status"] == "rejected" and "already in this category" in result["error"]
+        assert (tmp_path / "MCA" / "fees.pdf").read_bytes() == PDF
+        assert os.listdir(os.path.join(root, "MCA")) == ["fees.pdf"]
+
+    def test_missing_category_folder_is_rejected(self, tmp_path):
+        """A category whose folder was removed rejects uploads instead of raising"""
+        root = self.library(tmp_path)
+
+        result, = uploads.save_uploads([FakeUpload("fees.pdf", PDF)], "MCA", root=root, blob_dir=self.blob_dir)
+
+        assert result["status"] == "rejected" and "no longer exists" in result["error"]
+        assert not os.path.exists(os.path.join(root, "MCA"))
+
+    def test_queue_coalesces_repeated_categories(self, monkeypatch):
+        """A category queued several times while waiting is indexed once"""
+        monkeypatch.setattr(uploads, "previous_settings", lambda category: {})
+
+        def process(category, embeddings):
+            self.calls.append(category)
+            return {"chunks": 3, "seconds": 0.1}
+
+        queue = uploads.IndexQueue(embeddings=None, process=process)
+        with queue._condition:
+            for category in ("MCA", "MCA", "MBA"):
+                queue.enqueue(category)
+        assert queue.wait(timeout=5)
+
+        assert self.calls == ["MCA", "MBA"]
+        assert queue.status()["MCA"]["state"] == "done"
+
+
+    def test_rebuild_repeats_the_last_build_settings(self, tmp_path, monkeypatch):
+        """An automatic rebuild receives every argument of the category's last build"""
+        class FakeStore:
+            def save_local(self, path):
+                os.makedirs(path)
+
+        def build_vector_store(batches, embeddings, stats, **kwargs):
+            stats["chunk_tokens"].append(3)
+            return FakeStore()
+
+        monkeypatch.setattr(qa_engine, "VECTOR_STORES", str(tmp_path))
+        monkeypatch.setattr(ingestion, "list_pdfs", lambda category: ["fees.pdf"])
+        monkeypatch.setattr(ingestion, "build_vector_store", build_vector_store)
+        monkeypatch.setattr(index_compression, "compress_vector_store", lambda store, compression, pca_dim: None)
+        settings = {"extraction_backend": "pymupdf", "chunking_strategy": "recursive", "deduplicate": False,
+                    "shard_count": 1, "shard_strategy": "hash", "compression": "sq8", "pca_dim": 32,
+                    "reuse_embeddings": False, "use_ocr": True}
+        ingestion.process_category("MCA", None, **settings)
+
+        def process(category, embeddings, **kwargs):
+            self.calls.append(kwargs)
+            return {"chunks": 3, "seconds": 0.1}
+
+        queue = uploads.IndexQueue(embeddings=None, process=process)
+        queue.enqueue("MCA")
+        assert queue.wait(timeout=5)
+
+        assert self.calls == [settings]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,230 @@
+"""
+Streaming PDF uploads into the document library.
+
+Uploaded files are copied to a temporary file next to their destination in
+UPLOAD_CHUNK_BYTES pieces, hashing the content as it is written, so no second
+full copy of a large scan is held in memory. A file is rejected when it grows
+beyond UPLOAD_MAX_MB or does not look like a PDF (a "%PDF-" header near the
+start and an "%%EOF" marker near the end; neither check parses the file).
+Each document is stored once in the blob store (see blob_store.py): a file
+already in another category is only linked into this one, a file the
+category already has is skipped, and a valid new file is stored and linked
+into place atomically. A different document with the name of one the
+category already has is rejected rather than replacing it.
+
+Streamlit holds each uploaded file in memory before this module sees it, so
+server.maxUploadSize in .streamlit/config.toml is kept at UPLOAD_MAX_MB.
+
+Content hashes of library files are kept in LIBRARY_HASHES_FILE and only
+recomputed for files whose size or modification time changed.
+
+Categories that received new files are queued on an IndexQueue, which
+re-processes them one at a time in a background thread with the settings of
+their previous build. Unchanged pages come from the extraction cache and,
+under document sharding, only shards with new files are rebuilt.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+import blob_store
+import ingestion
+import metrics
+import pdf_extraction
+
+DOCUMENT_LIBRARY = "document_library"
+UPLOAD_MAX_MB = float(os.getenv("UPLOAD_MAX_MB", "200"))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+UPLOAD_AUTO_INDEX = os.getenv("UPLOAD_AUTO_INDEX", "1") == "1"
+LIBRARY_HASHES_FILE = ".content_hashes.json"
+# The PDF specification allows the header and the end-of-file marker to sit within 1 KB of either end.
+PDF_MARKER_WINDOW = 1024
+
+_hashes_lock = threading.Lock()
+
+class UploadError(ValueError):
+    """An upload that was rejected; the message says why."""
+
+# --- Validation ---
+def check_pdf(path):
+    """Raises UploadError unless the file starts with a PDF header and ends with an end-of-file marker."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        head = f.read(PDF_MARKER_WINDOW)
+        f.seek(max(0, size - PDF_MARKER_WINDOW))
+        tail = f.read()
+    if b"%PDF-" not in head:
+        raise UploadError("not a PDF file")
+    if b"%%EOF" not in tail:
+        raise UploadError("the PDF is truncated or damaged (no end-of-file marker)")
+
+def stream_to_file(source, path, max_bytes, chunk_bytes=UPLOAD_CHUNK_BYTES):
+    """
+    Copies a readable file object to path in chunks and returns (sha256, size).
+    Raises UploadError, leaving the partial file behind, once max_bytes is exceeded.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "wb") as out:
+        for block in iter(lambda: source.read(chunk_bytes), b""):
+            size += len(block)
+            if size > max_bytes:
+                raise UploadError(f"larger than the {max_bytes / (1024 * 1024):.0f} MB upload limit")
+            digest.update(block)
+            out.write(block)
+    return digest.hexdigest(), size
+
+# --- Library Hashes ---
+def library_hashes(root=DOCUMENT_LIBRARY):
+    """Returns {content sha256: ["category/file.pdf", ...]} for every PDF in the library."""
+    with _hashes_lock:
+        hashes_path = os.path.join(root, LIBRARY_HASHES_FILE)
+        try:
+            with open(hashes_path, encoding="utf-8") as f:
+                known = json.load(f)
+        except (FileNotFoundError, ValueError):
+            known = {}
+        current = {}
+        for relative, path in blob_store.library_files(root):
+            stat = os.stat(path)
+            entry = known.get(relative)
+            if entry is None or entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+                entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                         "sha256": pdf_extraction.file_sha256(path)}
+            current[relative] = entry
+        if current != known and os.path.isdir(root):
+            with open(hashes_path, "w", encoding="utf-8") as f:
+                json.dump(current, f)
+    hashes = {}
+    for relative, entry in sorted(current.items()):
+        hashes.setdefault(entry["sha256"], []).append(relative)
+    return hashes
+
+# --- Uploads ---
+def save_upload(source, name, category, root=DOCUMENT_LIBRARY, known_hashes=None, max_mb=UPLOAD_MAX_MB,
+                blob_dir=blob_store.BLOB_DIR):
+    """
+    Streams one uploaded file into a category. Returns a result dict with name,
+    status, sha256 and bytes. status is "saved" for a new document, "linked" when
+    the document is already stored for another category ("duplicate_of" names it)
+    and only a reference is added, "duplicate" when the category already has it,
+    or "rejected" with the reason in "error".
+    known_hashes (from library_hashes) is updated with a saved or linked file.
+    """
+    name = os.path.basename(name)
+    result = {"name": name, "status": "rejected", "sha256": None, "bytes": 0}
+    folder = os.path.join(root, category)
+    if known_hashes is None:
+        known_hashes = library_hashes(root)
+    tmp_path = None
+    try:
+        if not name.lower().endswith(".pdf"):
+            raise UploadError("only .pdf files can be uploaded")
+        if not os.path.isdir(folder):
+            raise UploadError(f"the category folder '{category}' no longer exists")
+        fd, tmp_path = tempfile.mkstemp(prefix=".upload-", suffix=".part", dir=folder)
+        os.close(fd)
+        result["sha256"], result["bytes"] = stream_to_file(source, tmp_path, int(max_mb * 1024 * 1024))
+        locations = known_hashes.get(result["sha256"], [])
+        in_category = [location for location in locations if location.startswith(f"{category}/")]
+        if in_category:
+            result["status"] = "duplicate"
+            result["duplicate_of"] = in_category[0]
+        elif os.path.exists(os.path.join(folder, name)):
+            raise UploadError(f"a different file named '{name}' is already in this category; "
+                              "rename the upload or delete the old file first")
+        else:
+            if locations:
+                result["status"] = "linked"
+                result["duplicate_of"] = locations[0]
+            else:
+                check_pdf(tmp_path)
+                result["status"] = "saved"
+            blob_store.add_to_category(tmp_path, result["sha256"], category, name, root, blob_dir)
+            known_hashes[result["sha256"]] = locations + [f"{category}/{name}"]
+    except UploadError as e:
+        result["error"] = str(e)
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    metrics.UPLOADS.inc(status=result["status"])
+    if result["status"] == "saved":
+        metrics.UPLOAD_BYTES.inc(result["bytes"])
+    return result
+
+def save_uploads(files, category, root=DOCUMENT_LIBRARY, max_mb=UPLOAD_MAX_MB, blob_dir=blob_store.BLOB_DIR):
+    """Saves several uploaded file objects (each with a .name) and returns one result per file."""
+    known_hashes = library_hashes(root)
+    results = []
+    for uploaded in files:
+        if hasattr(uploaded, "seek"):
+            uploaded.seek(0)
+        results.append(save_upload(uploaded, uploaded.name, category, root, known_hashes, max_mb, blob_dir))
+    return results
+
+# --- Incremental Indexing ---
+def previous_settings(category):
+    """Build settings of a category's last index, so an automatic rebuild keeps them."""
+    report = ingestion.load_chunk_report(category) or {}
+    if "settings" in report:
+        return dict(report["settings"])
+    # Reports written before the settings were saved only record these
+    return {
+        "chunking_strategy": report.get("strategy"),
+        "shard_count": report.get("shards"),
+        "compression": report.get("compression"),
+    }
+
+class IndexQueue:
+    """
+    Re-processes categories in a background thread, one at a time. A category queued
+    again while it is waiting is processed once; queued while it is being processed,
+    it is processed again afterwards so the newest files are included.
+    """
+
+    def __init__(self, embeddings, process=None):
+        self.embeddings = embeddings
+        self._process = process or ingestion.process_category
+        self._pending = []
+        self._status = {}
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="index-queue", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, category):
+        with self._condition:
+            if category not in self._pending:
+                self._pending.append(category)
+            self._status[category] = dict(self._status.get(category, {}), state="queued", queued_at=time.time())
+            self._condition.notify()
+
+    def status(self):
+        """Returns {category: {state, ...}} with state queued, indexing, done or failed."""
+        with self._condition:
+            return {category: dict(status) for category, status in self._status.items()}
+
+    def wait(self, timeout=None):
+        """Blocks until nothing is queued or being indexed; returns False on timeout."""
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: not self._pending and all(s["state"] != "indexing" for s in self._status.values()), timeout)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending)
+                category = self._pending.pop(0)
+                self._status[category] = {"state": "indexing", "started_at": time.time()}
+            try:
+                stats = self._process(category, self.embeddings, **previous_settings(category))
+                status = {"state": "done", "chunks": stats["chunks"], "seconds": round(stats["seconds"], 1)}
+            except Exception as e:
+                status = {"state": "failed", "error": str(e)}
+            with self._condition:
+                if category not in self._pending:
+                    self._status[category] = dict(status, finished_at=time.time())
+                self._condition.notify_all()